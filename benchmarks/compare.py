@@ -0,0 +1,61 @@
+"""
+Сравнение двух результатов benchmarks.run.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+from typing import Any, Dict
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def ratio(old: float, new: float) -> str:
+    """Отношение new/old в виде строки (меньше 1 — для задержек лучше)"""
+    return f"{new / old:.2f}x" if old else "—"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение двух результатов бенчмарка")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+    old, new = load(args.old), load(args.new)
+
+    print(f"{old['meta']['commit'][:12]} -> {new['meta']['commit'][:12]}")
+    if old["meta"]["vacancies"] != new["meta"]["vacancies"]:
+        print(f"Внимание: разный объём данных ({old['meta']['vacancies']} и {new['meta']['vacancies']} вакансий)")
+    # Результаты зависят от машины и сервера: сравнивать имеет смысл только прогоны в одном окружении
+    for key, title in (("platform", "платформа"), ("postgres", "версия PostgreSQL")):
+        if old["meta"].get(key) != new["meta"].get(key):
+            print(f"Внимание: разная {title} ({old['meta'].get(key)} и {new['meta'].get(key)})")
+
+    print(f"\n{'Пропускная способность':<45}{'было':>14}{'стало':>14}{'отношение':>12}")
+    throughput = (
+        ("parse", "items_per_sec"),
+        ("parse_batch", "items_per_sec"),
+        ("ingest", "rows_per_sec"),
+        ("ingest_incremental", "rows_per_sec"),
+    )
+    for section, key in throughput:
+        if section in old and section in new:
+            before, after = old[section][key], new[section][key]
+            print(f"{section + ' ' + key:<45}{before:>14.0f}{after:>14.0f}{ratio(before, after):>12}")
+
+    print(f"\n{'Запрос (p50 / p99, мс)':<45}{'было':>14}{'стало':>14}{'отношение':>12}")
+    for name, after in new.get("queries", {}).items():
+        before = old.get("queries", {}).get(name)
+        if before is None:
+            print(f"{name:<45}{'—':>14}{after['p50_ms']:>14.2f}")
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            label = name if key == "p50_ms" else ""
+            print(f"{label:<45}{before[key]:>14.2f}{after[key]:>14.2f}{ratio(before[key], after[key]):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from typing import Any, Dict, Optional
+
+import psycopg2
+from psycopg2.extensions import parse_dsn
+
+
+def _free_port() -> int:
+    """Свободный TCP-порт на localhost"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class DisposablePostgres:
+    """
+    Временный кластер PostgreSQL для бенчмарков.
+
+    Если задана строка подключения dsn (или переменная окружения BENCH_DSN), используется
+    существующая база — её таблицы будут удалены и созданы заново. Иначе во временном
+    каталоге создаётся кластер (initdb), запускается на свободном порту (pg_ctl)
+    и удаляется при выходе. Каталог с initdb/pg_ctl можно указать в PG_BIN.
+    """
+
+    def __init__(self, dsn: Optional[str] = None, pg_bin: Optional[str] = None, dbname: str = "hh_bench"):
+        """
+        :param dsn: Строка подключения к существующей базе (по умолчанию BENCH_DSN)
+        :param pg_bin: Каталог с исполняемыми файлами PostgreSQL (по умолчанию PG_BIN или PATH)
+        :param dbname: Имя создаваемой базы во временном кластере
+        """
+        self.dsn = dsn or os.getenv("BENCH_DSN")
+        self.pg_bin = pg_bin or os.getenv("PG_BIN")
+        self.dbname = dbname
+        self.__directory: Optional[str] = None
+        self.__config: Dict[str, Any] = {}
+
+    def __enter__(self) -> "DisposablePostgres":
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Параметры подключения в формате аргументов DBManager"""
+        return dict(self.__config)
+
+    def __binary(self, name: str) -> str:
+        path = os.path.join(self.pg_bin, name) if self.pg_bin else shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"Не найден {name}: установите PostgreSQL, задайте PG_BIN или BENCH_DSN")
+        return path
+
+    def start(self) -> None:
+        """Подключается к BENCH_DSN или поднимает временный кластер"""
+        if self.dsn:
+            params = parse_dsn(self.dsn)
+            self.__config = {
+                "dbname": params.get("dbname", ""),
+                "user": params.get("user", ""),
+                "password": params.get("password", ""),
+                "host": params.get("host", "localhost"),
+                "port": params.get("port", "5432"),
+            }
+            return
+
+        self.__directory = tempfile.mkdtemp(prefix="hh_bench_pg_")
+        try:
+            self.__start_cluster(self.__directory)
+        except BaseException:
+            self.stop()
+            raise
+
+    def __start_cluster(self, directory: str) -> None:
+        """Создаёт кластер в каталоге directory, запускает его и создаёт базу dbname"""
+        data_dir = os.path.join(directory, "data")
+        port = str(_free_port())
+        subprocess.run(
+            [self.__binary("initdb"), "-D", data_dir, "-U", "bench", "-A", "trust", "-E", "UTF8", "--no-sync"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        # Только unix-сокет во временном каталоге: кластер не виден снаружи
+        subprocess.run(
+            [
+                self.__binary("pg_ctl"),
+                "-D",
+                data_dir,
+                "-l",
+                os.path.join(directory, "postgres.log"),
+                "-o",
+                f"-p {port} -k {directory} -c listen_addresses=''",
+                "-w",
+                "start",
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        self.__config = {"dbname": self.dbname, "user": "bench", "password": "", "host": directory, "port": port}
+
+        conn = psycopg2.connect(dbname="postgres", user="bench", host=directory, port=port)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'CREATE DATABASE "{self.dbname}"')
+        finally:
+            conn.close()
+
+    def stop(self) -> None:
+        """Останавливает и удаляет временный кластер"""
+        if self.__directory is None:
+            return
+        data_dir = os.path.join(self.__directory, "data")
+        if os.path.exists(os.path.join(data_dir, "postmaster.pid")):
+            subprocess.run(
+                [self.__binary("pg_ctl"), "-D", data_dir, "-m", "immediate", "-w", "stop"],
+                check=False,
+                stdout=subprocess.DEVNULL,
+            )
+        shutil.rmtree(self.__directory, ignore_errors=True)
+        self.__directory = None
+
+    def server_version(self) -> str:
+        """Версия сервера PostgreSQL"""
+        conn = psycopg2.connect(**self.__config)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SHOW server_version")
+                return str(cursor.fetchone()[0])
+        finally:
+            conn.close()
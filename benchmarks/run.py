@@ -0,0 +1,230 @@
+"""
+Бенчмарк загрузки и запросов на синтетических данных hh.ru.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.run --vacancies 100k
+    BENCH_DSN="dbname=bench user=postgres" python -m benchmarks.run --vacancies 1m --runs 50
+
+Без BENCH_DSN поднимается временный кластер PostgreSQL (нужны initdb и pg_ctl в PATH или PG_BIN).
+С BENCH_DSN таблицы указанной базы удаляются и создаются заново.
+Результаты записываются в JSON (по умолчанию benchmarks/results/<коммит>-<число вакансий>.json)
+и сравниваются скриптом benchmarks.compare. Они зависят от машины и версии PostgreSQL
+(записываются в meta), поэтому в репозиторий не добавляются: базовую линию для сравнения
+снимают на той же машине, запустив бенчмарк на коммите до изменений.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.postgres import DisposablePostgres
+from benchmarks.stub_server import StubHHServer
+from benchmarks.synthetic import CURRENCY_RATES, SyntheticHH
+from src.db_manager import DBManager
+from src.hh_api import HeadHunterAPI
+from src.ingest import IngestPipeline
+from src.rate_limiter import TokenBucket
+from src.vacancy import Vacancy
+from src.vacancy_batch import VacancyBatch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_count(value: str) -> int:
+    """Число вакансий: 1000, 10k, 1m и т.п."""
+    value = value.strip().lower()
+    multiplier = _SUFFIXES.get(value[-1:], 1)
+    number = int(value[:-1] if value[-1:] in _SUFFIXES else value) * multiplier
+    if number < 1:
+        raise argparse.ArgumentTypeError("Число вакансий должно быть положительным")
+    return number
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль q (0..100) методом ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(timings: Sequence[float]) -> Dict[str, float]:
+    """Сводка по замерам в миллисекундах"""
+    return {
+        "runs": len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p99_ms": percentile(timings, 99),
+        "mean_ms": sum(timings) / len(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+    }
+
+
+def git_commit() -> Tuple[str, bool]:
+    """Текущий коммит и признак незакоммиченных изменений"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+            ).stdout.strip()
+        )
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def bench_parse(
+    data: SyntheticHH, limit: Optional[int], parse: Callable[[List[Dict[str, Any]]], Any]
+) -> Dict[str, Any]:
+    """Скорость разбора страниц вакансий функцией parse; генерация данных в замер не входит"""
+    items = 0
+    elapsed = 0.0
+    for page in data.iter_items():
+        started_at = time.perf_counter()
+        parse(page)
+        elapsed += time.perf_counter() - started_at
+        items += len(page)
+        if limit is not None and items >= limit:
+            break
+    return {"items": items, "elapsed": elapsed, "items_per_sec": items / elapsed if elapsed else 0.0}
+
+
+def bench_ingest(
+    db: DBManager, server: StubHHServer, workers: int, batch_size: int, incremental: bool
+) -> Dict[str, Any]:
+    """Полный цикл загрузки через HeadHunterAPI и IngestPipeline со стаб-сервера"""
+    requests_before = server.requests
+    # Ограничитель частоты не должен влиять на замер
+    rate_limiter = TokenBucket(rate=1e9, capacity=1e9)
+    with HeadHunterAPI(max_concurrency=workers, base_url=server.base_url, rate_limiter=rate_limiter) as hh_api:
+        summary = IngestPipeline(
+            db, hh_api, fetch_workers=workers, batch_size=batch_size, incremental=incremental
+        ).run(server.data.employer_ids())
+    summary["http_requests"] = server.requests - requests_before
+    summary["rows_per_sec"] = summary["vacancies_per_sec"]
+    return summary
+
+
+def query_cases(data: SyntheticHH) -> List[Tuple[str, Callable[[DBManager], Any], bool]]:
+    """
+    Методы чтения DBManager с аргументами.
+
+    :return: (имя, вызов, признак полного прохода по таблице)
+    """
+    middle = data.vacancies // 2
+    return [
+        ("get_analytics_refreshed_at", lambda db: db.get_analytics_refreshed_at(), False),
+        ("get_companies_and_vacancies_count", lambda db: db.get_companies_and_vacancies_count(), False),
+        ("get_companies_and_vacancies_count[live]", lambda db: db.get_companies_and_vacancies_count(live=True), True),
+        ("get_avg_salary", lambda db: db.get_avg_salary(), False),
+        ("get_avg_salary[live]", lambda db: db.get_avg_salary(live=True), True),
+        ("get_salary_stats", lambda db: db.get_salary_stats(), False),
+        ("get_salary_stats[live]", lambda db: db.get_salary_stats(live=True), True),
+        ("get_salary_percentiles", lambda db: db.get_salary_percentiles(), True),
+        ("get_salary_histogram", lambda db: db.get_salary_histogram(), True),
+        ("get_salary_coverage", lambda db: db.get_salary_coverage(), True),
+        ("get_vacancies_page[first]", lambda db: db.get_vacancies_page(limit=100), False),
+        ("get_vacancies_page[middle]", lambda db: db.get_vacancies_page(after_vacancy_id=middle, limit=100), False),
+        ("get_vacancies_with_higher_salary[limit=100]", lambda db: db.get_vacancies_with_higher_salary(100), False),
+        ("get_vacancies_with_higher_salary", lambda db: db.get_vacancies_with_higher_salary(), True),
+        ("iter_vacancies_with_higher_salary", lambda db: sum(1 for _ in db.iter_vacancies_with_higher_salary()), True),
+        ("get_vacancies_with_keyword_page", lambda db: db.get_vacancies_with_keyword_page("Python", limit=100), False),
+        ("get_vacancies_with_keyword", lambda db: db.get_vacancies_with_keyword("Python"), True),
+        ("iter_vacancies_with_keyword", lambda db: sum(1 for _ in db.iter_vacancies_with_keyword("Python")), True),
+        ("search_vacancies", lambda db: db.search_vacancies("python разработчик"), False),
+        ("search_vacancies[substring]", lambda db: db.search_vacancies("ython", substring=True), False),
+        ("get_all_vacancies", lambda db: db.get_all_vacancies(), True),
+        ("iter_all_vacancies", lambda db: sum(1 for _ in db.iter_all_vacancies()), True),
+    ]
+
+
+def bench_queries(
+    db: DBManager, data: SyntheticHH, runs: int, scan_runs: int, skip: Sequence[str]
+) -> Dict[str, Dict[str, float]]:
+    """p50/p99 задержки методов чтения; первый вызов каждого метода — прогрев, в замер не входит"""
+    results = {}
+    for name, call, full_scan in query_cases(data):
+        if name in skip or name.split("[")[0] in skip:
+            continue
+        call(db)
+        timings = []
+        for _ in range(scan_runs if full_scan else runs):
+            started_at = time.perf_counter()
+            call(db)
+            timings.append((time.perf_counter() - started_at) * 1000)
+        results[name] = summarize(timings)
+        print(f"{name}: p50 {results[name]['p50_ms']:.2f} мс, p99 {results[name]['p99_ms']:.2f} мс")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк загрузки и запросов на синтетических данных hh.ru")
+    parser.add_argument("--vacancies", type=parse_count, default=parse_count("10k"), help="1k … 10m")
+    parser.add_argument("--per-employer", type=int, default=2000, help="вакансий на работодателя (не более 2000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4, help="потоков загрузки страниц")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=30, help="повторов точечных запросов")
+    parser.add_argument("--scan-runs", type=int, default=5, help="повторов запросов с полным проходом")
+    parser.add_argument("--parse-limit", type=parse_count, default=None, help="вакансий для замера разбора")
+    parser.add_argument("--skip", action="append", default=[], help="пропустить метод (можно несколько раз)")
+    parser.add_argument("--output", help="файл результатов JSON")
+    args = parser.parse_args()
+
+    data = SyntheticHH(args.vacancies, per_employer=args.per_employer, seed=args.seed)
+    commit, dirty = git_commit()
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "vacancies": data.vacancies,
+            "employers": data.employer_count,
+            "seed": args.seed,
+            "workers": args.workers,
+            "batch_size": args.batch_size,
+        }
+    }
+
+    print("Разбор вакансий...")
+    report["parse"] = bench_parse(data, args.parse_limit, Vacancy.cast_to_object_list)
+    print(f"Разбор в Vacancy: {report['parse']['items_per_sec']:.0f} вакансий/с")
+    report["parse_batch"] = bench_parse(data, args.parse_limit, VacancyBatch.from_api)
+    print(f"Разбор в VacancyBatch: {report['parse_batch']['items_per_sec']:.0f} вакансий/с")
+
+    with DisposablePostgres() as postgres, StubHHServer(data) as server:
+        report["meta"]["postgres"] = postgres.server_version()
+        db = DBManager(**postgres.config, max_connections=args.workers + 2)
+        try:
+            db.reset_database()
+            db.load_exchange_rates(CURRENCY_RATES)
+            print("Первичная загрузка...")
+            report["ingest"] = bench_ingest(db, server, args.workers, args.batch_size, incremental=False)
+            print("Повторная инкрементальная загрузка (данные не изменились)...")
+            report["ingest_incremental"] = bench_ingest(db, server, args.workers, args.batch_size, incremental=True)
+            print("Запросы...")
+            report["queries"] = bench_queries(db, data, args.runs, args.scan_runs, args.skip)
+        finally:
+            db.close()
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{commit[:12]}-{data.vacancies}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.synthetic import PER_PAGE, SyntheticHH
+
+
+class StubHHServer:
+    """
+    Локальный HTTP-сервер, отвечающий как API hh.ru на данных SyntheticHH.
+
+    Поддерживаются эндпоинты, которые использует HeadHunterAPI:
+    /employers/{id}, /vacancies?employer_id=...&page=...&per_page=... и /dictionaries.
+    Сервер работает в фоновом потоке; его адрес передаётся в HeadHunterAPI(base_url=...).
+    """
+
+    def __init__(self, data: SyntheticHH, host: str = "127.0.0.1", port: int = 0):
+        """
+        :param data: Генератор ответов
+        :param host: Адрес прослушивания
+        :param port: Порт (0 — любой свободный)
+        """
+        self.data = data
+        self.host = host
+        self.requests = 0
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+        self.__server.daemon_threads = True
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес сервера для HeadHunterAPI"""
+        return f"http://{self.host}:{self.__server.server_port}"
+
+    def __enter__(self) -> "StubHHServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Запускает сервер в фоновом потоке"""
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Останавливает сервер и освобождает порт"""
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def _count_request(self) -> None:
+        with self.__lock:
+            self.requests += 1
+
+    def __handler_class(self) -> Any:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                stub._count_request()
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                try:
+                    if parts.path == "/vacancies":
+                        body = stub.data.vacancies_page(
+                            int(query["employer_id"][0]),
+                            int(query.get("page", ["0"])[0]),
+                            int(query.get("per_page", [str(PER_PAGE)])[0]),
+                        )
+                    elif parts.path.startswith("/employers/"):
+                        body = stub.data.employer(int(parts.path.rsplit("/", 1)[1]))
+                    elif parts.path == "/dictionaries":
+                        body = stub.data.dictionaries()
+                    else:
+                        raise KeyError(parts.path)
+                except (KeyError, ValueError):
+                    self.__send(404, {"errors": [{"type": "not_found"}]})
+                    return
+                self.__send(200, body)
+
+            def __send(self, status: int, body: Any) -> None:
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                """Не засоряет вывод бенчмарка журналом запросов"""
+
+        return Handler
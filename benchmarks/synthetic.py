@@ -0,0 +1,146 @@
+import random
+from typing import Any, Dict, Iterator, List
+
+# Словари для названий и описаний: в них есть слова, по которым ищут запросы бенчмарка
+_LEVELS = ["Junior", "Middle", "Senior", "Lead", "Ведущий", "Старший", "Младший"]
+_ROLES = [
+    "Python-разработчик",
+    "Java developer",
+    "Аналитик данных",
+    "DevOps-инженер",
+    "Frontend-разработчик",
+    "Тестировщик",
+    "Менеджер проектов",
+    "Data Scientist",
+    "Системный администратор",
+    "Backend developer",
+]
+_SKILLS = ["Python", "SQL", "PostgreSQL", "Django", "Kafka", "Docker", "Kubernetes", "Java", "Go", "React", "Linux"]
+_CURRENCIES = ["RUR", "RUR", "RUR", "RUR", "USD", "EUR", "KZT"]
+
+# Курсы валют в формате справочника hh.ru: сколько единиц валюты стоит один рубль
+CURRENCY_RATES = {"RUR": 1.0, "USD": 0.0112, "EUR": 0.0103, "KZT": 5.6}
+
+PER_PAGE = 100
+
+
+class SyntheticHH:
+    """
+    Детерминированный генератор данных в формате API hh.ru.
+
+    Вакансии распределяются по работодателям не более чем по per_employer штук
+    (hh.ru отдаёт не больше 2000 вакансий на поиск), поэтому 10 млн вакансий —
+    это 5000 работодателей. Страницы генерируются по запросу и не хранятся в памяти;
+    одна и та же страница при одном seed всегда одинакова.
+    """
+
+    def __init__(self, vacancies: int, per_employer: int = 2000, seed: int = 42):
+        """
+        :param vacancies: Общее число вакансий
+        :param per_employer: Максимум вакансий у одного работодателя
+        :param seed: Зерно генератора случайных чисел
+        """
+        if vacancies < 1 or not 1 <= per_employer <= 20 * PER_PAGE:
+            raise ValueError("Некорректные параметры генератора")
+        self.vacancies = vacancies
+        self.per_employer = per_employer
+        self.seed = seed
+        self.employer_count = -(-vacancies // per_employer)
+
+    def employer_ids(self) -> Dict[str, int]:
+        """Работодатели в формате EMPLOYERS из main: название -> id"""
+        return {f"Компания {index + 1}": self.employer_id(index) for index in range(self.employer_count)}
+
+    @staticmethod
+    def employer_id(index: int) -> int:
+        """id работодателя по его порядковому номеру"""
+        return 1_000_000 + index
+
+    def __employer_index(self, employer_id: int) -> int:
+        index = employer_id - 1_000_000
+        if not 0 <= index < self.employer_count:
+            raise KeyError(employer_id)
+        return index
+
+    def vacancy_count(self, employer_id: int) -> int:
+        """Число вакансий работодателя"""
+        index = self.__employer_index(employer_id)
+        return min(self.per_employer, self.vacancies - index * self.per_employer)
+
+    def employer(self, employer_id: int) -> Dict[str, Any]:
+        """Ответ /employers/{id}"""
+        index = self.__employer_index(employer_id)
+        rng = random.Random(self.seed * 1_000_003 + index)
+        return {
+            "id": str(employer_id),
+            "name": f"Компания {index + 1}",
+            "description": " ".join(rng.choices(_SKILLS + _ROLES, k=40)),
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "site_url": f"https://company{index + 1}.example",
+            "open_vacancies": self.vacancy_count(employer_id),
+        }
+
+    def vacancies_page(self, employer_id: int, page: int, per_page: int = PER_PAGE) -> Dict[str, Any]:
+        """Ответ /vacancies?employer_id=...&page=...&per_page=..."""
+        index = self.__employer_index(employer_id)
+        found = self.vacancy_count(employer_id)
+        start = page * per_page
+        items = [self.vacancy(index, number) for number in range(start, min(start + per_page, found))]
+        return {
+            "items": items,
+            "found": found,
+            "pages": -(-found // per_page),
+            "page": page,
+            "per_page": per_page,
+        }
+
+    def vacancy(self, employer_index: int, number: int) -> Dict[str, Any]:
+        """Одна вакансия в формате элемента items ответа /vacancies"""
+        vacancy_id = employer_index * self.per_employer + number + 1
+        rng = random.Random(self.seed * 7_919 + vacancy_id)
+        salary = None
+        if rng.random() < 0.7:
+            base = rng.randrange(40_000, 400_000, 5_000)
+            currency = rng.choice(_CURRENCIES)
+            if currency != "RUR":
+                base = max(500, int(base * CURRENCY_RATES[currency]) // 100 * 100)
+            salary = {
+                "from": base if rng.random() < 0.85 else None,
+                "to": base + base // rng.choice([4, 2, 1]) if rng.random() < 0.6 else None,
+                "currency": currency,
+                "gross": rng.random() < 0.5,
+            }
+            if salary["from"] is None and salary["to"] is None:
+                salary["from"] = base
+        employer_id = self.employer_id(employer_index)
+        return {
+            "id": str(vacancy_id),
+            "name": f"{rng.choice(_LEVELS)} {rng.choice(_ROLES)}",
+            "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+            "salary": salary,
+            "employer": {"id": str(employer_id), "name": f"Компания {employer_index + 1}"},
+            "area": {"id": "1", "name": "Москва"},
+            "published_at": "2026-01-15T10:00:00+0300",
+            "snippet": {
+                "requirement": "Опыт работы с " + ", ".join(rng.sample(_SKILLS, 3)) + ".",
+                "responsibility": "Разработка и поддержка сервисов.",
+            },
+        }
+
+    def iter_items(self) -> Iterator[List[Dict[str, Any]]]:
+        """Все вакансии постранично, в порядке работодателей и страниц"""
+        for index in range(self.employer_count):
+            employer_id = self.employer_id(index)
+            pages = -(-self.vacancy_count(employer_id) // PER_PAGE)
+            for page in range(pages):
+                yield self.vacancies_page(employer_id, page)["items"]
+
+    @staticmethod
+    def dictionaries() -> Dict[str, Any]:
+        """Ответ /dictionaries (только справочник валют)"""
+        return {
+            "currency": [
+                {"code": code, "abbr": code, "name": code, "rate": rate, "default": code == "RUR", "in_use": True}
+                for code, rate in CURRENCY_RATES.items()
+            ]
+        }
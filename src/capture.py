@@ -0,0 +1,124 @@
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Union
+
+# Расширение файлов сегментов
+SEGMENT_SUFFIX = ".ndjson.gz"
+
+
+class CaptureWriter:
+    """
+    Запись сырых ответов API hh.ru в сжатые NDJSON-сегменты.
+
+    Каждый ответ — одна строка JSON {"url": ..., "params": ..., "ts": ..., "body": ...};
+    URL записывается первым, чтобы при воспроизведении строку можно было
+    отфильтровать без разбора JSON. Сегмент закрывается и начинается новый,
+    когда объём несжатых данных превышает max_segment_bytes. Запись потокобезопасна.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 64 * 1024 * 1024, compresslevel: int = 6):
+        """
+        :param directory: Каталог для сегментов
+        :param max_segment_bytes: Объём несжатых данных в одном сегменте
+        :param compresslevel: Степень сжатия gzip (1 — быстрее, 9 — компактнее)
+        """
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compresslevel = compresslevel
+        self.records = 0
+        self.segments: List[str] = []
+        self.__lock = threading.Lock()
+        self.__file: Optional[gzip.GzipFile] = None
+        self.__segment_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __open_segment(self) -> gzip.GzipFile:
+        """Открывает новый сегмент; имя сортируется по времени создания"""
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"capture-{stamp}-{os.getpid()}-{len(self.segments):05d}{SEGMENT_SUFFIX}")
+        self.segments.append(path)
+        self.__segment_bytes = 0
+        return gzip.GzipFile(path, "wb", compresslevel=self.compresslevel)
+
+    def write(self, url: str, params: Mapping[str, Any], body: Any) -> None:
+        """
+        Дописывает ответ в текущий сегмент.
+
+        :param url: URL запроса без параметров
+        :param params: Параметры запроса
+        :param body: Разобранное JSON-тело ответа
+        """
+        line = (
+            json.dumps({"url": url, "params": dict(params), "ts": time.time(), "body": body}, ensure_ascii=False)
+            + "\n"
+        ).encode("utf-8")
+        with self.__lock:
+            if self.__file is None or self.__segment_bytes >= self.max_segment_bytes:
+                if self.__file is not None:
+                    self.__file.close()
+                self.__file = self.__open_segment()
+            self.__file.write(line)
+            self.__segment_bytes += len(line)
+            self.records += 1
+
+    def close(self) -> None:
+        """Закрывает текущий сегмент"""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+
+def segment_paths(sources: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Файлы сегментов в порядке записи.
+
+    :param sources: Каталог с сегментами, файл сегмента или их список
+    """
+    paths: List[str] = []
+    for source in [sources] if isinstance(sources, str) else sources:
+        if os.path.isdir(source):
+            paths.extend(sorted(glob.glob(os.path.join(source, f"*{SEGMENT_SUFFIX}"))))
+        else:
+            paths.append(source)
+    return paths
+
+
+def iter_lines(sources: Union[str, Iterable[str]]) -> Iterator[bytes]:
+    """
+    Потоково читает строки сегментов без разбора JSON.
+
+    Память ограничена буфером распаковки и одной строкой. Оборванный конец
+    сегмента (запись прервана аварийно) пропускается с предупреждением.
+    """
+    for path in segment_paths(sources):
+        with gzip.open(path, "rb") as file:
+            try:
+                for line in file:
+                    if line.endswith(b"\n"):
+                        yield line
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                print(f"Сегмент {path} оборван, остаток пропущен: {e}")
+
+
+def record_url(line: bytes) -> str:
+    """URL записи, извлечённый из начала строки без разбора всего JSON"""
+    prefix = b'{"url": "'
+    start = len(prefix)
+    if line.startswith(prefix):
+        end = line.find(b'"', start)
+        if end != -1:
+            return line[start:end].decode("utf-8")
+    return str(json.loads(line)["url"])
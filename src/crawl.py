@@ -0,0 +1,196 @@
+"""
+Обход большого списка работодателей hh.ru с контрольными точками.
+
+    python -m src.main crawl --file employers.txt --shards 4
+    python -m src.main crawl --table crawl_targets --crawl-id nightly --resume
+
+Работодатели делятся на шарды, каждый шард обрабатывает отдельный процесс
+со своими HeadHunterAPI и DBManager. Загруженные работодатели отмечаются
+в crawl_checkpoints в одной транзакции с их вакансиями. Каждый запуск
+начинает новый обход со своим crawl_id; прерванный обход продолжается
+с первого незаписанного работодателя только явно — запуском с его crawl_id и resume.
+"""
+
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.db_manager import DBManager
+from src.hh_api import HeadHunterAPI
+from src.ingest import IngestPipeline
+from src.rate_limiter import TokenBucket
+
+
+def read_employer_ids(path: str) -> List[int]:
+    """
+    Читает id работодателей из текстового файла.
+
+    Одна строка — один id (первое поле строки); пустые строки и строки,
+    начинающиеся с #, пропускаются. Повторы удаляются с сохранением порядка.
+
+    :param path: Путь к файлу
+    :return: id работодателей
+    """
+    employer_ids: Dict[int, None] = {}
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                employer_ids[int(line.replace(",", " ").split()[0])] = None
+            except ValueError as e:
+                raise ValueError(f"Строка {number} файла {path}: ожидается id работодателя, получено {line!r}") from e
+    return list(employer_ids)
+
+
+def new_crawl_id() -> str:
+    """Идентификатор нового обхода: время запуска и случайный суффикс"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def crawl_shard(
+    shard: int,
+    employer_ids: List[int],
+    db_config: Dict[str, Any],
+    crawl_id: str,
+    fetch_workers: int = 2,
+    rate: float = 2.5,
+    batch_size: int = 2000,
+    base_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Загружает работодателей одного шарда; выполняется в отдельном процессе.
+
+    :param shard: Номер шарда
+    :param employer_ids: Работодатели шарда
+    :param db_config: Параметры подключения DBManager
+    :param crawl_id: Идентификатор обхода
+    :param fetch_workers: Потоков загрузки в шарде
+    :param rate: Запросов к API в секунду для шарда
+    :param batch_size: Число вакансий, после которого пакет записывается вместе с контрольными точками
+    :param base_url: Адрес API (по умолчанию https://api.hh.ru)
+    :return: Итоги IngestPipeline.run с номером шарда
+    """
+    db = DBManager(**db_config, max_connections=2)
+    try:
+        rate_limiter = TokenBucket(rate=rate, capacity=max(1.0, rate))
+        with HeadHunterAPI(max_concurrency=fetch_workers, base_url=base_url, rate_limiter=rate_limiter) as hh_api:
+            summary = IngestPipeline(
+                db,
+                hh_api,
+                fetch_workers=fetch_workers,
+                batch_size=batch_size,
+                incremental=True,
+                refresh_views=False,
+                crawl_id=crawl_id,
+            ).run({str(employer_id): employer_id for employer_id in employer_ids})
+    finally:
+        db.close()
+    summary["shard"] = shard
+    return summary
+
+
+def run_crawl(
+    db: DBManager,
+    db_config: Dict[str, Any],
+    employer_ids: Iterable[int],
+    crawl_id: Optional[str] = None,
+    resume: bool = False,
+    shards: int = 4,
+    fetch_workers: int = 2,
+    rate: float = 10.0,
+    batch_size: int = 2000,
+    restart: bool = False,
+    base_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Обходит работодателей; при resume пропускает уже загруженных в обходе crawl_id.
+
+    :param db: Менеджер базы данных для контрольных точек и обновления аналитики
+    :param db_config: Параметры подключения для DBManager процессов-шардов
+    :param employer_ids: id работодателей на hh.ru
+    :param crawl_id: Идентификатор обхода (по умолчанию новый, см. new_crawl_id)
+    :param resume: Продолжить начатый обход crawl_id; без него обход с контрольными точками не запускается
+    :param shards: Число процессов
+    :param fetch_workers: Потоков загрузки в каждом процессе
+    :param rate: Общий предел запросов к API в секунду, делится между шардами поровну
+    :param batch_size: Число вакансий в пакете записи
+    :param restart: Удалить контрольные точки и начать обход заново
+    :param base_url: Адрес API (по умолчанию https://api.hh.ru)
+    :return: Итоги: работодатели, вакансии, ошибки, время и итоги по шардам
+    """
+    if crawl_id is None:
+        if resume:
+            raise ValueError("Для продолжения обхода нужно указать его crawl_id")
+        crawl_id = new_crawl_id()
+    if restart:
+        print(f"Контрольных точек удалено: {db.reset_crawl(crawl_id)}")
+    employer_ids = list(dict.fromkeys(int(employer_id) for employer_id in employer_ids))
+    done = db.get_crawl_checkpoints(crawl_id)
+    if done and not resume:
+        raise ValueError(
+            f"Обход {crawl_id} уже начат (загружено работодателей: {len(done)}): "
+            "продолжите его с resume или начните заново с restart"
+        )
+    pending = [employer_id for employer_id in employer_ids if employer_id not in done]
+    print(
+        f"Обход {crawl_id}: работодателей {len(employer_ids)}, уже загружено {len(employer_ids) - len(pending)}, "
+        f"осталось {len(pending)}"
+    )
+
+    started_at = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    failed_shards = 0
+    if pending:
+        shards = max(1, min(shards, len(pending)))
+        with ProcessPoolExecutor(shards) as pool:
+            futures = [
+                pool.submit(
+                    crawl_shard,
+                    shard,
+                    pending[shard::shards],
+                    db_config,
+                    crawl_id,
+                    fetch_workers,
+                    rate / shards,
+                    batch_size,
+                    base_url,
+                )
+                for shard in range(shards)
+            ]
+            for shard, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failed_shards += 1
+                    print(f"Шард {shard} завершился с ошибкой: {e}")
+        db.try_refresh_analytics_views()
+
+    elapsed = time.perf_counter() - started_at
+    summary: Dict[str, Any] = {
+        "crawl_id": crawl_id,
+        "employers_total": len(employer_ids),
+        "employers_skipped": len(employer_ids) - len(pending),
+        "employers": sum(result["employers"] for result in results),
+        "vacancies": sum(result["vacancies"] for result in results),
+        "errors": sum(result["errors"] for result in results),
+        "failed_shards": failed_shards,
+        "remaining": len(pending) - sum(result["employers"] for result in results),
+        "elapsed": elapsed,
+        "shards": results,
+    }
+    print()
+    for result in results:
+        print(
+            f"Шард {result['shard']}: работодателей {result['employers']}, вакансий {result['vacancies']}, "
+            f"ошибок {result['errors']}, {result['employers_per_sec']:.2f} работодателей/с, "
+            f"{result['vacancies_per_sec']:.1f} вакансий/с"
+        )
+    print(
+        f"Обход {crawl_id}: загружено работодателей {summary['employers']}, вакансий {summary['vacancies']}, "
+        f"осталось {summary['remaining']} (продолжить — crawl --crawl-id {crawl_id} --resume). "
+        f"Время: {elapsed:.2f} с"
+    )
+    return summary
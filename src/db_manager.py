@@ -1,60 +1,588 @@
-from typing import Any, Dict, List
+import functools
+import itertools
+import re
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar, Union
 
 import psycopg2
+from psycopg2 import errors, extensions, sql
+from psycopg2.extras import NamedTupleCursor
+
+from src.db_pool import ConnectionPool
+from src.metrics import Metrics, timed_cursor_factory
+from src.migrations import MIGRATIONS, Migration
+from src.query_cache import QueryCache
+from src.vacancy_batch import VacancyBatch
+
+# Экранирование значений для текстового формата COPY
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+EMPLOYER_COLUMNS = ("employer_id", "company", "description", "url")
+VACANCY_COLUMNS = ("vacancy_id", "employer_id", "title", "salary_from", "salary_to", "currency", "url", "description")
+
+# Колонки вакансии в выборках (без служебных content_hash и search_vector)
+_VACANCY_SELECT = ", ".join(f"v.{column}" for column in VACANCY_COLUMNS)
+
+# Материализованные представления аналитики в порядке обновления
+ANALYTICS_VIEWS = ("mv_company_vacancy_counts", "mv_salary_stats")
+
+# Запросы, общие для списковых, потоковых и постраничных методов
+_ALL_VACANCIES_SQL = """
+    SELECT
+        v.vacancy_id,
+        v.title,
+        v.salary_from,
+        v.salary_to,
+        v.currency,
+        v.url,
+        e.company AS employer_name
+    FROM vacancies v
+    JOIN employers e ON v.employer_id = e.employer_id
+"""
+# Средняя зарплата в рублях считается в том же запросе; сортировка и LIMIT идут по индексу salary_mid_rub.
+# Вакансии без зарплаты (salary_mid_rub — NULL) в среднее не входят
+_HIGHER_SALARY_SQL = f"""
+    WITH avg_salary AS (
+        SELECT AVG(salary_mid_rub) AS value FROM vacancies WHERE salary_mid_rub > 0
+    )
+    SELECT {_VACANCY_SELECT}, v.salary_mid, v.salary_mid_rub, e.company as employer_name
+    FROM vacancies v
+    JOIN employers e ON v.employer_id = e.employer_id
+    WHERE v.salary_mid_rub > (SELECT value FROM avg_salary)
+    ORDER BY v.salary_mid_rub DESC, v.vacancy_id
+    LIMIT %s OFFSET %s
+"""
+_KEYWORD_SQL = f"""
+    SELECT {_VACANCY_SELECT}, e.company as employer_name
+    FROM vacancies v
+    JOIN employers e ON v.employer_id = e.employer_id
+    WHERE (v.title ILIKE %s OR v.description ILIKE %s)
+"""
+
+# Середина вилки зарплаты строки s. Не указанная граница хранится как 0 (см. validate_salary):
+# при одной указанной границе берётся она, при обеих — среднее, без зарплаты — NULL
+_SALARY_MID_SQL = """
+    CASE
+        WHEN NULLIF(s.salary_from, 0) IS NULL THEN NULLIF(s.salary_to, 0)
+        WHEN NULLIF(s.salary_to, 0) IS NULL THEN s.salary_from
+        ELSE (s.salary_from + s.salary_to) / 2
+    END
+"""
+# Поисковый вектор строки s: русская и английская морфология, название весомее описания
+_SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian'::regconfig, COALESCE(s.title, '')), 'A') ||
+    setweight(to_tsvector('english'::regconfig, COALESCE(s.title, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, COALESCE(s.description, '')), 'B') ||
+    setweight(to_tsvector('english'::regconfig, COALESCE(s.description, '')), 'B')
+"""
+
+# Середина вилки зарплаты строки s, пересчитанная в рубли по курсу r (курс — единиц валюты за рубль).
+# Без зарплаты или при неизвестном курсе — NULL
+_SALARY_MID_RUB_SQL = f"""
+    round(({_SALARY_MID_SQL}) / NULLIF(r.rate, 0), 2)
+"""
+
+# Квантили зарплаты по умолчанию для get_salary_percentiles
+SALARY_PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Ключ рекомендательной блокировки, под которой применяются миграции схемы
+_MIGRATION_LOCK_ID = 7_460_391_105
+# Пауза между попытками взять блокировку миграций, в секундах
+_MIGRATION_LOCK_POLL_INTERVAL = 0.5
+
+# Экранирование спецсимволов шаблона LIKE
+_LIKE_ESCAPES = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+
+# Частые запросы, которые выполняются как серверные подготовленные операторы (PREPARE/EXECUTE).
+# Параметры записываются как %s и при подготовке заменяются на $1, $2, ...
+_PREPARED_SQL = {
+    "hh_insert_employer": """
+        INSERT INTO employers (employer_id, company, description, url)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (employer_id) DO UPDATE SET
+            company = EXCLUDED.company,
+            description = EXCLUDED.description,
+            url = EXCLUDED.url
+        RETURNING employer_id
+    """,
+    "hh_insert_vacancy": f"""
+        INSERT INTO vacancies
+        (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description,
+         salary_mid, salary_mid_rub, search_vector)
+        SELECT s.*, {_SALARY_MID_SQL}, {_SALARY_MID_RUB_SQL}, {_SEARCH_VECTOR_SQL}
+        FROM (
+            VALUES (%s::bigint, %s::bigint, %s::varchar, %s::integer, %s::integer, %s::varchar, %s::varchar, %s::text)
+        )
+            AS s (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description)
+        LEFT JOIN exchange_rates r ON r.currency = s.currency
+        ON CONFLICT (vacancy_id) DO UPDATE SET
+            employer_id = EXCLUDED.employer_id,
+            title = EXCLUDED.title,
+            salary_from = EXCLUDED.salary_from,
+            salary_to = EXCLUDED.salary_to,
+            currency = EXCLUDED.currency,
+            url = EXCLUDED.url,
+            description = EXCLUDED.description,
+            salary_mid = EXCLUDED.salary_mid,
+            salary_mid_rub = EXCLUDED.salary_mid_rub,
+            search_vector = EXCLUDED.search_vector
+        RETURNING vacancy_id
+    """,
+    "hh_company_counts": """
+        SELECT company, SUM(vacancies_count)::bigint as vacancies_count
+        FROM mv_company_vacancy_counts
+        GROUP BY company
+        ORDER BY vacancies_count DESC
+    """,
+    "hh_company_counts_live": """
+        SELECT e.company, COUNT(v.vacancy_id) as vacancies_count
+        FROM employers e
+        LEFT JOIN vacancies v ON e.employer_id = v.employer_id
+        GROUP BY e.company
+        ORDER BY vacancies_count DESC
+    """,
+    "hh_avg_salary": """
+        SELECT SUM(salary_rub_sum) / NULLIF(SUM(salary_rub_count), 0) as avg_salary
+        FROM mv_salary_stats
+    """,
+    "hh_avg_salary_live": """
+        SELECT AVG(salary_mid_rub) as avg_salary
+        FROM vacancies
+        WHERE salary_mid_rub > 0
+    """,
+    "hh_higher_salary": _HIGHER_SALARY_SQL,
+}
+
+# Параметры чтения для сравнения задержек в compare_prepared_latency
+_PREPARED_READS: Dict[str, Tuple[Any, ...]] = {
+    "hh_company_counts": (),
+    "hh_company_counts_live": (),
+    "hh_avg_salary": (),
+    "hh_avg_salary_live": (),
+    "hh_higher_salary": (None, 0),
+}
+
+
+def _to_positional(query: str) -> str:
+    """Заменяет плейсхолдеры %s на позиционные параметры $1, $2, ... для PREPARE"""
+    counter = itertools.count(1)
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+
+_PREPARED_POSITIONAL = {name: _to_positional(query) for name, query in _PREPARED_SQL.items()}
+
+
+# Вакансии для пакетной записи: словари (формат Vacancy.to_dict) или колоночный VacancyBatch
+VacanciesData = Union[Iterable[Dict[str, Any]], VacancyBatch]
+
+# Выгрузки export: имя -> запрос (keyword принимает шаблон LIKE дважды)
+EXPORTS = {
+    "vacancies": _ALL_VACANCIES_SQL,
+    "keyword": _KEYWORD_SQL,
+    "companies": _PREPARED_SQL["hh_company_counts"],
+    "companies_live": _PREPARED_SQL["hh_company_counts_live"],
+}
+# Форматы COPY TO для export. NDJSON — это row_to_json в CSV с управляющими символами
+# вместо кавычки и разделителя: в JSON они всегда экранированы, поэтому строки выводятся как есть
+EXPORT_FORMATS = {
+    "csv": "COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)",
+    "ndjson": (
+        "COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT "
+        "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+    ),
+}
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _freeze(value: Any) -> Any:
+    """Хешируемое представление аргумента для ключа кэша: списки — кортежи, словари — отсортированные пары"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def _cached(method: _F) -> _F:
+    """
+    Кэширует результат метода чтения в query_cache экземпляра DBManager.
+
+    Ключ — имя метода, аргументы и текущее поколение записи, поэтому после
+    любой записи через этот DBManager старые результаты больше не используются.
+    Списки и словари в аргументах приводятся к кортежам; вызов с другим
+    нехешируемым аргументом выполняется без кэша.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: "DBManager", *args: Any, **kwargs: Any) -> Any:
+        if self.query_cache is None:
+            return method(self, *args, **kwargs)
+        try:
+            key = (method.__name__, self.write_generation, _freeze(args), _freeze(kwargs))
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        hit, value = self.query_cache.get(key)
+        if not hit:
+            value = method(self, *args, **kwargs)
+            self.query_cache.put(key, value)
+        return value
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _writes(method: _F) -> _F:
+    """Увеличивает поколение записи DBManager после метода, изменяющего данные"""
+
+    @functools.wraps(method)
+    def wrapper(self: "DBManager", *args: Any, **kwargs: Any) -> Any:
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._bump_write_generation()
+
+    return wrapper  # type: ignore[return-value]
+
+
+class _CopyStream:
+    """
+    Файлоподобный объект для COPY FROM STDIN.
+
+    Строки сериализуются лениво, по мере чтения их psycopg2,
+    поэтому весь пакет не собирается в памяти целиком. Исключение источника строк
+    psycopg2 превращает в QueryCanceled, поэтому оно сохраняется в error.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        """
+        :param rows: Итерируемый набор кортежей значений в порядке колонок COPY
+        """
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.error: Optional[Exception] = None
+
+    @staticmethod
+    def _format_row(row: Sequence[Any]) -> str:
+        """Сериализует строку в текстовый формат COPY (NULL -> \\N)"""
+        return "\t".join("\\N" if value is None else str(value).translate(_COPY_ESCAPES) for value in row) + "\n"
+
+    def read(self, size: int = -1) -> str:
+        """Возвращает очередной фрагмент данных размером не более size символов"""
+        try:
+            return self._read(size)
+        except Exception as e:
+            self.error = e
+            raise
+
+    def _read(self, size: int) -> str:
+        if size < 0:
+            chunk = self._buffer + "".join(self._format_row(row) for row in self._rows)
+            self._buffer = ""
+            return chunk
+        parts = [self._buffer]
+        length = len(self._buffer)
+        for row in self._rows:
+            line = self._format_row(row)
+            parts.append(line)
+            length += len(line)
+            if length >= size:
+                break
+        data = "".join(parts)
+        chunk, self._buffer = data[:size], data[size:]
+        return chunk
 
 
 class DBManager:
     """Класс для управления базой данных PostgreSQL"""
 
-    def __init__(self, dbname: str, user: str, password: str, host: str = "localhost", port: str = "5432"):
+    def __init__(
+        self,
+        dbname: str,
+        user: str,
+        password: str,
+        host: str = "localhost",
+        port: str = "5432",
+        min_connections: int = 1,
+        max_connections: int = 4,
+        pool_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        query_cache: Optional[QueryCache] = None,
+        use_prepared: bool = True,
+        metrics: Optional[Metrics] = None,
+    ):
         """
         Инициализация подключения к базе данных
 
+        Каждая операция берёт соединение из пула и открывает на нём свой курсор,
+        поэтому один экземпляр DBManager можно использовать из нескольких потоков.
+
         Args:
             dbname: Имя базы данных
             user: Имя пользователя
             password: Пароль
             host: Хост (по умолчанию localhost)
             port: Порт (по умолчанию 5432)
+            min_connections: Число соединений, открываемых сразу
+            max_connections: Максимальное число одновременно открытых соединений
+            pool_timeout: Максимальное время ожидания свободного соединения в секундах
+            health_check_interval: Время простоя, после которого соединение проверяется перед выдачей
+            query_cache: Кэш результатов методов чтения (по умолчанию не используется).
+                Сбрасывается любой записью через этот экземпляр; изменения из других
+                процессов становятся видны по истечении TTL кэша. Результаты из кэша
+                общие для всех вызовов, изменять их нельзя.
+            use_prepared: Выполнять частые запросы как серверные подготовленные операторы
+                (PREPARE один раз на соединение, затем EXECUTE), экономя разбор и планирование
+            metrics: Реестр метрик: время и число строк каждого SQL-оператора,
+                журнал медленных запросов (по умолчанию не используется)
+        """
+        self.pool = ConnectionPool(
+            min_connections=min_connections,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            health_check_interval=health_check_interval,
+            dbname=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port,
+        )
+        self.query_cache = query_cache
+        self.write_generation = 0
+        self.__generation_lock = threading.Lock()
+        self.use_prepared = use_prepared
+        # Увеличивается при изменении схемы: подготовленные ранее операторы сбрасываются
+        self.__schema_epoch = 0
+        self.__schema_lock = threading.Lock()
+        self.metrics = metrics
+        if metrics is not None:
+            for name, query in _PREPARED_SQL.items():
+                metrics.register_prepared(name, query, analyze=name in _PREPARED_READS)
+
+    def _bump_write_generation(self) -> None:
+        """Отмечает изменение данных: закэшированные результаты чтения становятся недействительными"""
+        with self.__generation_lock:
+            self.write_generation += 1
+
+    def _bump_schema_epoch(self) -> None:
+        """Отмечает изменение схемы: операторы, подготовленные на соединениях пула, будут подготовлены заново"""
+        with self.__schema_lock:
+            self.__schema_epoch += 1
+
+    @property
+    def pool_stats(self) -> Dict[str, Any]:
+        """Статистика пула соединений: занятые, свободные, время ожидания"""
+        return self.pool.stats
+
+    @contextmanager
+    def _cursor(self, cursor_factory: Any = None) -> Iterator[Any]:
+        """
+        Берёт соединение из пула и открывает на нём новый курсор (режим autocommit).
+
+        :param cursor_factory: Класс курсора psycopg2
+        :return: Курсор; соединение возвращается в пул при выходе из блока
+        """
+        with self.pool.connection() as conn:
+            with self._open_cursor(conn, cursor_factory=cursor_factory) as cursor:
+                yield cursor
+
+    def _open_cursor(self, conn: Any, name: Optional[str] = None, cursor_factory: Any = None) -> Any:
+        """Открывает курсор на соединении; при включённых метриках — курсор с замером операторов"""
+        if self.metrics is None:
+            return conn.cursor(name=name, cursor_factory=cursor_factory)
+        cursor = conn.cursor(name=name, cursor_factory=timed_cursor_factory(cursor_factory))
+        cursor.metrics = self.metrics
+        return cursor
+
+    def _execute(
+        self, cursor: Any, name: str, params: Sequence[Any] = (), use_prepared: Optional[bool] = None
+    ) -> None:
         """
-        self.conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
-        self.conn.autocommit = True
-        self.cursor = self.conn.cursor()
+        Выполняет запрос из _PREPARED_SQL как подготовленный оператор соединения курсора.
 
+        Оператор подготавливается при первом использовании на соединении; список
+        подготовленных операторов хранится в служебных данных соединения пула.
+        Если оператор пропал на сервере или его план устарел после изменения схемы
+        другим клиентом, он подготавливается заново и запрос повторяется один раз.
+
+        :param cursor: Курсор соединения из пула
+        :param name: Имя запроса в _PREPARED_SQL
+        :param params: Значения параметров в порядке плейсхолдеров
+        :param use_prepared: Выполнить через PREPARE/EXECUTE или обычным execute (по умолчанию self.use_prepared)
+        """
+        if not (self.use_prepared if use_prepared is None else use_prepared):
+            cursor.execute(_PREPARED_SQL[name], tuple(params) or None)
+            return
+        state = self.pool.state(cursor.connection)
+        prepared = state.setdefault("prepared", set())
+        if state.get("schema_epoch") != self.__schema_epoch:
+            if prepared:
+                cursor.execute("DEALLOCATE ALL")
+                prepared.clear()
+            state["schema_epoch"] = self.__schema_epoch
+
+        execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+        for attempt in range(2):
+            if name not in prepared:
+                try:
+                    cursor.execute(f"PREPARE {name} AS {_PREPARED_POSITIONAL[name]}")
+                except errors.DuplicatePreparedStatement:
+                    cursor.execute(f"DEALLOCATE {name}")
+                    cursor.execute(f"PREPARE {name} AS {_PREPARED_POSITIONAL[name]}")
+                prepared.add(name)
+            try:
+                cursor.execute(execute_sql, tuple(params))
+                return
+            except (errors.InvalidSqlStatementName, errors.FeatureNotSupported):
+                # Оператор пропал (DISCARD ALL) или план не совпадает с новой схемой
+                prepared.discard(name)
+                if attempt or cursor.connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    raise
+                try:
+                    cursor.execute(f"DEALLOCATE {name}")
+                except errors.InvalidSqlStatementName:
+                    pass
+
+    @_writes
     def reset_database(self) -> None:
         """Удаляет таблицы и создаёт их заново"""
         print("Сбрасываем базу данных...")
-        self.cursor.execute("DROP TABLE IF EXISTS vacancies CASCADE;")
-        self.cursor.execute("DROP TABLE IF EXISTS employers CASCADE;")
+        with self._cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS vacancies_archive CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS crawl_checkpoints CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS crawl_targets CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS exchange_rates CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS analytics_refresh CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS employer_sync_state CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS vacancies CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS employers CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS schema_migrations CASCADE;")
+        self._bump_schema_epoch()
         print("Таблицы удалены.")
         self.create_tables()
 
+    @_writes
     def create_tables(self) -> None:
-        """Создание таблиц employers и vacancies"""
-        # Таблица работодателей
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employers (
-                employer_id SERIAL PRIMARY KEY,
-                company VARCHAR(255) NOT NULL,
-                url VARCHAR(255),
-                description TEXT
+        """Создание таблиц и обновление схемы до последней версии (см. migrate)"""
+        self.migrate()
+
+    @_writes
+    def migrate(self, migrations: Sequence[Migration] = MIGRATIONS, lock_timeout: Optional[float] = None) -> List[int]:
+        """
+        Применяет ещё не применённые версионированные миграции схемы.
+
+        Применённые версии хранятся в таблице schema_migrations. Обычный шаг выполняется
+        в одной транзакции вместе с записью своей версии. Шаг с concurrent=True выполняется
+        вне транзакции, чтобы CREATE INDEX CONCURRENTLY и пакетное заполнение колонок
+        не блокировали запись в таблицу; невалидный индекс, оставшийся от прерванной попытки,
+        перед повтором удаляется.
+        Одновременные запуски из разных процессов сериализуются рекомендательной блокировкой.
+        Блокировка берётся опросом pg_try_advisory_lock короткими транзакциями autocommit:
+        ожидание в pg_advisory_lock держало бы снимок, и CREATE INDEX CONCURRENTLY
+        у владельца блокировки ждал бы его завершения — взаимоблокировка.
+
+        :param migrations: Шаги миграции (по умолчанию MIGRATIONS)
+        :param lock_timeout: Сколько секунд ждать блокировку (None — без ограничения)
+        :return: Версии, применённые при этом вызове
+        """
+        applied = []
+        with self.pool.connection() as conn:
+            with self._open_cursor(conn) as cursor:
+                self._acquire_migration_lock(cursor, lock_timeout)
+                try:
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS schema_migrations (
+                            version INTEGER PRIMARY KEY,
+                            description TEXT NOT NULL,
+                            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                        )
+                    """)
+                    cursor.execute("SELECT version FROM schema_migrations")
+                    done = {row[0] for row in cursor.fetchall()}
+                    for migration in sorted(migrations, key=lambda item: item.version):
+                        if migration.version in done:
+                            continue
+                        try:
+                            if migration.concurrent:
+                                self._apply_concurrent_migration(cursor, migration)
+                            else:
+                                self._apply_migration(conn, cursor, migration)
+                        except psycopg2.Error as e:
+                            if not migration.optional:
+                                raise
+                            print(f"Миграция {migration.version} пропущена до следующего запуска: {e}")
+                            continue
+                        applied.append(migration.version)
+                        print(f"Применена миграция {migration.version}: {migration.description}")
+                finally:
+                    if not conn.closed:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", (_MIGRATION_LOCK_ID,))
+        if applied:
+            self._bump_schema_epoch()
+        return applied
+
+    @staticmethod
+    def _acquire_migration_lock(cursor: Any, timeout: Optional[float] = None) -> None:
+        """Ждёт рекомендательную блокировку миграций, опрашивая pg_try_advisory_lock"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (_MIGRATION_LOCK_ID,))
+            if cursor.fetchone()[0]:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Блокировка миграций не получена за {timeout} с: миграции применяет другой процесс"
+                )
+            time.sleep(_MIGRATION_LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    def _apply_migration(conn: Any, cursor: Any, migration: Migration) -> None:
+        """Выполняет шаг миграции и запись его версии в одной транзакции"""
+        conn.autocommit = False
+        try:
+            for statement in migration.statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (migration.version, migration.description),
             )
-        """)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
 
-        # Таблица вакансий
-        self.cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vacancies (
-            vacancy_id BIGINT PRIMARY KEY,
-            employer_id BIGINT REFERENCES employers(employer_id) ON DELETE CASCADE,
-            title VARCHAR(255) NOT NULL,
-            salary_from INTEGER,
-            salary_to INTEGER,
-            currency VARCHAR(10),
-            url VARCHAR(255) NOT NULL,
-            description TEXT
+    @staticmethod
+    def _apply_concurrent_migration(cursor: Any, migration: Migration) -> None:
+        """Выполняет шаг миграции в режиме autocommit: каждый оператор в своей транзакции"""
+        for index in migration.concurrent_indexes:
+            # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс, а IF NOT EXISTS его не пересоздаст
+            cursor.execute(
+                """
+                SELECT 1 FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid
+                """,
+                (index,),
             )
-            """)
+            if cursor.fetchone():
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+        for statement in migration.statements:
+            cursor.execute(statement)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s) ON CONFLICT (version) DO NOTHING",
+            (migration.version, migration.description),
+        )
 
+    @_writes
     def insert_employer(self, employer_data: Dict[str, Any]) -> int:
         """
         Вставка данных о работодателе
@@ -65,29 +593,23 @@ class DBManager:
         Returns:
             ID вставленной записи
         """
-        query = """
-                INSERT INTO employers (employer_id, company, description, url)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (employer_id) DO UPDATE SET
-                    company = EXCLUDED.company,
-                    description = EXCLUDED.description,
-                    url = EXCLUDED.url
-                RETURNING employer_id
-            """
-        self.cursor.execute(
-            query,
-            (
-                int(employer_data["employer_id"]),
-                employer_data["company"],
-                employer_data.get("description", ""),
-                employer_data.get("url", ""),
-            ),
-        )
-        result = self.cursor.fetchone()
-        if not result:
-            raise ValueError("Не удалось вставить работодателя")
-        return int(result[0])
+        with self._cursor() as cursor:
+            self._execute(
+                cursor,
+                "hh_insert_employer",
+                (
+                    int(employer_data["employer_id"]),
+                    employer_data["company"],
+                    employer_data.get("description", ""),
+                    employer_data.get("url", ""),
+                ),
+            )
+            result = cursor.fetchone()
+            if not result:
+                raise ValueError("Не удалось вставить работодателя")
+            return int(result[0])
 
+    @_writes
     def insert_vacancy(self, employer_id: int, vacancy_data: Dict[str, Any]) -> int:
         """
         Вставка данных о вакансиях
@@ -96,109 +618,910 @@ class DBManager:
         :return:
         """
 
-        query = """
-               INSERT INTO vacancies
-               (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-               ON CONFLICT (vacancy_id) DO UPDATE SET
-                   employer_id = EXCLUDED.employer_id,
-                   title = EXCLUDED.title,
-                   salary_from = EXCLUDED.salary_from,
-                   salary_to = EXCLUDED.salary_to,
-                   currency = EXCLUDED.currency,
-                   url = EXCLUDED.url,
-                   description = EXCLUDED.description
-               RETURNING vacancy_id
-               """
-
-        self.cursor.execute(
-            query,
+        with self._cursor() as cursor:
+            self._execute(
+                cursor,
+                "hh_insert_vacancy",
+                (
+                    int(vacancy_data["vacancy_id"]),
+                    int(employer_id),
+                    vacancy_data["title"],
+                    vacancy_data.get("salary_from"),
+                    vacancy_data.get("salary_to"),
+                    vacancy_data.get("currency"),
+                    vacancy_data["url"],
+                    vacancy_data.get("description", ""),
+                ),
+            )
+            result = cursor.fetchone()
+            if not result:
+                raise ValueError("Не удалось вставить вакансию")
+            return int(result[0])
+
+    @contextmanager
+    def _transaction(self, cursor_name: Optional[str] = None, cursor_factory: Any = None) -> Iterator[Any]:
+        """
+        Выполняет блок операций в одной транзакции.
+
+        Соединение берётся из пула на всё время блока, autocommit на нём отключается;
+        при ошибке (в том числе при досрочном закрытии генератора) транзакция откатывается.
+        :param cursor_name: Имя серверного (именованного) курсора
+        :param cursor_factory: Класс курсора psycopg2
+        :return: Курсор, открытый внутри транзакции
+        """
+        with self.pool.connection() as conn:
+            conn.autocommit = False
+            try:
+                with self._open_cursor(conn, cursor_name, cursor_factory) as cursor:
+                    yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def _iter_query(self, query: str, params: Sequence[Any] = (), itersize: int = 1000) -> Iterator[Any]:
+        """
+        Потоково выполняет запрос через серверный курсор.
+
+        Строки забираются с сервера пачками по itersize, поэтому в памяти
+        клиента никогда не находится весь результат.
+        :return: Строки результата в виде namedtuple
+        """
+        with self._transaction(f"stream_{uuid.uuid4().hex}", NamedTupleCursor) as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            yield from cursor
+
+    def _fetch_tuples(self, query: str, params: Sequence[Any] = ()) -> List[Any]:
+        """Выполняет запрос и возвращает строки в виде namedtuple"""
+        with self._cursor(NamedTupleCursor) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _copy_rows(cursor: Any, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+        """
+        Потоково загружает строки в таблицу через COPY FROM STDIN.
+
+        :param cursor: Курсор текущей транзакции
+        :param table: Имя таблицы
+        :param columns: Колонки в порядке значений в строках
+        :param rows: Кортежи значений
+        """
+        stream = _CopyStream(rows)
+        try:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream)
+        except psycopg2.Error as e:
+            # Ошибка в данных (например, вакансия без работодателя) важнее отменённого COPY
+            if stream.error is not None:
+                raise stream.error from e
+            raise
+
+    @_writes
+    def insert_employers_bulk(self, employers_data: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Пакетная вставка работодателей.
+
+        Данные загружаются через COPY во временную таблицу и переносятся
+        в employers одним INSERT ... ON CONFLICT в рамках одной транзакции.
+
+        :param employers_data: Словари с данными работодателей (формат Employer.to_dict)
+        :return: Количество добавленных и обновлённых записей: {"inserted": ..., "updated": ...}
+        """
+        rows = (
             (
-                int(vacancy_data["vacancy_id"]),
-                int(employer_id),
-                vacancy_data["title"],
-                vacancy_data.get("salary_from"),
-                vacancy_data.get("salary_to"),
-                vacancy_data.get("currency"),
-                vacancy_data["url"],
-                vacancy_data.get("description", ""),
-            ),
+                int(employer["employer_id"]),
+                employer["company"],
+                employer.get("description", ""),
+                employer.get("url", ""),
+            )
+            for employer in employers_data
         )
-        result = self.cursor.fetchone()
-        if not result:
-            raise ValueError("Не удалось вставить вакансию")
-        return int(result[0])
-
-    def get_companies_and_vacancies_count(self) -> List[Dict[str, Any]]:
-        """Получение количества вакансий по компаниям"""
-        query = """
-            SELECT e.company, COUNT(v.vacancy_id) as vacancies_count
-            FROM employers e
-            LEFT JOIN vacancies v ON e.employer_id = v.employer_id
-            GROUP BY e.company
-            ORDER BY vacancies_count DESC
-        """
-        self.cursor.execute(query)
-        columns = [desc[0] for desc in self.cursor.description]
-        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+        with self._transaction() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE employers_staging (
+                    ordinal BIGINT GENERATED ALWAYS AS IDENTITY,
+                    employer_id BIGINT,
+                    company VARCHAR(255),
+                    description TEXT,
+                    url VARCHAR(255)
+                ) ON COMMIT DROP
+            """)
+            self._copy_rows(cursor, "employers_staging", EMPLOYER_COLUMNS, rows)
+            cursor.execute("""
+                WITH merged AS (
+                    INSERT INTO employers (employer_id, company, description, url)
+                    SELECT DISTINCT ON (employer_id) employer_id, company, description, url
+                    FROM employers_staging
+                    ORDER BY employer_id, ordinal DESC
+                    ON CONFLICT (employer_id) DO UPDATE SET
+                        company = EXCLUDED.company,
+                        description = EXCLUDED.description,
+                        url = EXCLUDED.url
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+                FROM merged
+            """)
+            inserted, updated = cursor.fetchone()
+        return {"inserted": int(inserted), "updated": int(updated)}
+
+    @staticmethod
+    def _vacancy_rows(vacancies_data: VacanciesData, employer_id: Optional[int] = None) -> Iterator[Tuple[Any, ...]]:
+        """Кортежи значений вакансий в порядке VACANCY_COLUMNS"""
+        if isinstance(vacancies_data, VacancyBatch):
+            yield from vacancies_data.rows(employer_id)
+            return
+        for vacancy in vacancies_data:
+            vacancy_employer_id = vacancy.get("employer_id", employer_id)
+            if vacancy_employer_id is None:
+                raise ValueError(f"Не указан работодатель вакансии {vacancy['vacancy_id']}")
+            yield (
+                int(vacancy["vacancy_id"]),
+                int(vacancy_employer_id),
+                vacancy["title"],
+                vacancy.get("salary_from"),
+                vacancy.get("salary_to"),
+                vacancy.get("currency"),
+                vacancy["url"],
+                vacancy.get("description", ""),
+            )
+
+    def _merge_vacancies(self, cursor: Any, rows: Iterable[Sequence[Any]], skip_unchanged: bool) -> Dict[str, int]:
+        """
+        Загружает вакансии во временную таблицу vacancies_staging и переносит их в vacancies.
+
+        Временная таблица живёт до конца транзакции, поэтому после слияния
+        её можно использовать для поиска удалённых вакансий.
+
+        :param cursor: Курсор текущей транзакции
+        :param rows: Кортежи значений в порядке VACANCY_COLUMNS
+        :param skip_unchanged: Не обновлять строки, у которых не изменился хэш содержимого
+        :return: {"inserted": ..., "updated": ..., "unchanged": ...}
+        """
+        # ordinal нумерует строки в порядке COPY: из повторов одной вакансии остаётся последняя
+        cursor.execute("""
+            CREATE TEMP TABLE vacancies_staging (
+                ordinal BIGINT GENERATED ALWAYS AS IDENTITY,
+                vacancy_id BIGINT,
+                employer_id BIGINT,
+                title VARCHAR(255),
+                salary_from INTEGER,
+                salary_to INTEGER,
+                currency VARCHAR(10),
+                url VARCHAR(255),
+                description TEXT
+            ) ON COMMIT DROP
+        """)
+        self._copy_rows(cursor, "vacancies_staging", VACANCY_COLUMNS, rows)
+        update_condition = ""
+        if skip_unchanged:
+            update_condition = "WHERE vacancies.content_hash IS DISTINCT FROM EXCLUDED.content_hash"
+        cursor.execute(f"""
+            WITH merged AS (
+                INSERT INTO vacancies
+                (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description,
+                 content_hash, salary_mid, salary_mid_rub, search_vector)
+                SELECT DISTINCT ON (s.vacancy_id)
+                    s.vacancy_id, s.employer_id, s.title, s.salary_from, s.salary_to, s.currency, s.url, s.description,
+                    md5(
+                        ROW(s.employer_id, s.title, s.salary_from, s.salary_to, s.currency, s.url, s.description)::text
+                    ),
+                    {_SALARY_MID_SQL},
+                    {_SALARY_MID_RUB_SQL},
+                    {_SEARCH_VECTOR_SQL}
+                FROM vacancies_staging s
+                LEFT JOIN exchange_rates r ON r.currency = s.currency
+                ORDER BY s.vacancy_id, s.ordinal DESC
+                ON CONFLICT (vacancy_id) DO UPDATE SET
+                    employer_id = EXCLUDED.employer_id,
+                    title = EXCLUDED.title,
+                    salary_from = EXCLUDED.salary_from,
+                    salary_to = EXCLUDED.salary_to,
+                    currency = EXCLUDED.currency,
+                    url = EXCLUDED.url,
+                    description = EXCLUDED.description,
+                    content_hash = EXCLUDED.content_hash,
+                    salary_mid = EXCLUDED.salary_mid,
+                    salary_mid_rub = EXCLUDED.salary_mid_rub,
+                    search_vector = EXCLUDED.search_vector
+                {update_condition}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE inserted),
+                COUNT(*) FILTER (WHERE NOT inserted),
+                (SELECT COUNT(DISTINCT vacancy_id) FROM vacancies_staging)
+            FROM merged
+        """)
+        inserted, updated, staged = cursor.fetchone()
+        return {"inserted": int(inserted), "updated": int(updated), "unchanged": int(staged - inserted - updated)}
 
+    @_writes
+    def insert_vacancies_bulk(
+        self, vacancies_data: VacanciesData, employer_id: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Пакетная вставка вакансий.
+
+        Данные загружаются через COPY во временную таблицу и переносятся
+        в vacancies одним INSERT ... ON CONFLICT в рамках одной транзакции.
+        Из повторов одной вакансии в пакете записывается последний.
+
+        :param vacancies_data: Словари с данными вакансий (формат Vacancy.to_dict), которые
+            могут содержать ключ employer_id, или VacancyBatch — он пишется без промежуточных словарей
+        :param employer_id: id работодателя для вакансий без ключа employer_id
+        :return: Количество добавленных и обновлённых записей: {"inserted": ..., "updated": ...}
+        """
+        with self._transaction() as cursor:
+            result = self._merge_vacancies(cursor, self._vacancy_rows(vacancies_data, employer_id), False)
+        return {"inserted": result["inserted"], "updated": result["updated"]}
+
+    @_writes
+    def sync_vacancies(
+        self,
+        vacancies_data: VacanciesData,
+        employer_ids: Iterable[int],
+        archive: bool = False,
+        crawl_id: Optional[str] = None,
+        crawled_ids: Iterable[int] = (),
+    ) -> Dict[str, int]:
+        """
+        Инкрементальная синхронизация вакансий работодателей.
+
+        В одной транзакции:
+        - добавляются новые вакансии и обновляются только те, у которых изменился хэш содержимого;
+        - вакансии работодателей из employer_ids, которых нет в пакете, удаляются
+          (или переносятся в vacancies_archive);
+        - для этих работодателей обновляется время последней синхронизации;
+        - с crawl_id работодатели crawled_ids отмечаются в crawl_checkpoints как загруженные,
+          поэтому контрольная точка фиксируется только вместе с данными.
+
+        :param vacancies_data: Словари с данными вакансий, содержащие ключ employer_id, или VacancyBatch
+        :param employer_ids: Работодатели, для которых пакет содержит полный список вакансий
+        :param archive: Переносить удалённые вакансии в архив вместо удаления
+        :param crawl_id: Идентификатор обхода (src.crawl) для контрольных точек
+        :param crawled_ids: Работодатели, полностью обработанные в этом пакете
+        :return: {"inserted": ..., "updated": ..., "unchanged": ..., "removed": ...}
+        """
+        employer_ids = [int(employer_id) for employer_id in employer_ids]
+        crawled_ids = [int(employer_id) for employer_id in crawled_ids]
+        with self._transaction() as cursor:
+            result = self._merge_vacancies(cursor, self._vacancy_rows(vacancies_data), True)
+
+            stale_vacancies = """
+                DELETE FROM vacancies v
+                WHERE v.employer_id = ANY(%s)
+                  AND NOT EXISTS (SELECT 1 FROM vacancies_staging s WHERE s.vacancy_id = v.vacancy_id)
+            """
+            if archive:
+                cursor.execute(
+                    f"""
+                    WITH removed AS (
+                        {stale_vacancies}
+                        RETURNING v.vacancy_id, v.employer_id, v.title, v.salary_from, v.salary_to,
+                                  v.currency, v.url, v.description
+                    )
+                    INSERT INTO vacancies_archive
+                    (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description)
+                    SELECT * FROM removed
+                    ON CONFLICT (vacancy_id) DO UPDATE SET
+                        employer_id = EXCLUDED.employer_id,
+                        title = EXCLUDED.title,
+                        salary_from = EXCLUDED.salary_from,
+                        salary_to = EXCLUDED.salary_to,
+                        currency = EXCLUDED.currency,
+                        url = EXCLUDED.url,
+                        description = EXCLUDED.description,
+                        archived_at = now()
+                    """,
+                    (employer_ids,),
+                )
+            else:
+                cursor.execute(stale_vacancies, (employer_ids,))
+            result["removed"] = cursor.rowcount
+
+            cursor.execute(
+                """
+                INSERT INTO employer_sync_state (employer_id, last_synced_at)
+                SELECT employer_id, now() FROM unnest(%s::bigint[]) AS employer_id
+                ON CONFLICT (employer_id) DO UPDATE SET last_synced_at = EXCLUDED.last_synced_at
+                """,
+                (employer_ids,),
+            )
+
+            if crawl_id is not None and crawled_ids:
+                cursor.execute(
+                    """
+                    INSERT INTO crawl_checkpoints (crawl_id, employer_id, vacancies_count, completed_at)
+                    SELECT %s, c.employer_id, COUNT(DISTINCT s.vacancy_id), now()
+                    FROM unnest(%s::bigint[]) AS c (employer_id)
+                    LEFT JOIN vacancies_staging s ON s.employer_id = c.employer_id
+                    GROUP BY c.employer_id
+                    ON CONFLICT (crawl_id, employer_id) DO UPDATE SET
+                        vacancies_count = EXCLUDED.vacancies_count,
+                        completed_at = EXCLUDED.completed_at
+                    """,
+                    (crawl_id, crawled_ids),
+                )
+        return result
+
+    def get_crawl_checkpoints(self, crawl_id: str) -> Set[int]:
+        """Работодатели, уже загруженные обходом crawl_id"""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT employer_id FROM crawl_checkpoints WHERE crawl_id = %s", (crawl_id,))
+            return {employer_id for (employer_id,) in cursor.fetchall()}
+
+    def reset_crawl(self, crawl_id: str) -> int:
+        """
+        Удаляет контрольные точки обхода, чтобы начать его заново.
+
+        :return: Число удалённых контрольных точек
+        """
+        with self._cursor() as cursor:
+            cursor.execute("DELETE FROM crawl_checkpoints WHERE crawl_id = %s", (crawl_id,))
+            return cursor.rowcount
+
+    def get_crawl_targets(self, table: str = "crawl_targets", column: str = "employer_id") -> List[int]:
+        """
+        id работодателей для обхода из таблицы базы данных.
+
+        :param table: Имя таблицы (можно со схемой: schema.table)
+        :param column: Колонка с id работодателя на hh.ru
+        :return: id в порядке возрастания, без повторов
+        """
+        query = sql.SQL("SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY 1").format(
+            column=sql.Identifier(column), table=sql.Identifier(*table.split("."))
+        )
+        with self._cursor() as cursor:
+            cursor.execute(query.as_string(cursor))
+            return [int(employer_id) for (employer_id,) in cursor.fetchall()]
+
+    @_writes
+    def load_exchange_rates(self, rates: Dict[str, float]) -> int:
+        """
+        Загружает курсы валют и пересчитывает зарплаты в рублях.
+
+        :param rates: Курсы в формате справочника hh.ru: код валюты -> единиц валюты за рубль
+        :return: Число вакансий, у которых изменилась зарплата в рублях
+        """
+        currencies = list(rates)
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO exchange_rates (currency, rate, updated_at)
+                SELECT currency, rate, now() FROM unnest(%s::varchar[], %s::numeric[]) AS t (currency, rate)
+                ON CONFLICT (currency) DO UPDATE SET rate = EXCLUDED.rate, updated_at = EXCLUDED.updated_at
+                """,
+                (currencies, [rates[currency] for currency in currencies]),
+            )
+            return self._refresh_salary_rub(cursor)
+
+    @_writes
+    def refresh_salary_rub(self) -> int:
+        """
+        Пакетно пересчитывает salary_mid_rub по текущим курсам.
+
+        :return: Число вакансий, у которых изменилась зарплата в рублях
+        """
+        with self._transaction() as cursor:
+            return self._refresh_salary_rub(cursor)
+
+    @staticmethod
+    def _refresh_salary_rub(cursor: Any) -> int:
+        """Пересчитывает salary_mid_rub одним UPDATE, не трогая строки без изменений"""
+        cursor.execute(f"""
+            UPDATE vacancies v
+            SET salary_mid_rub = recalculated.value
+            FROM (
+                SELECT s.vacancy_id, {_SALARY_MID_RUB_SQL} AS value
+                FROM vacancies s
+                LEFT JOIN exchange_rates r ON r.currency = s.currency
+            ) recalculated
+            WHERE recalculated.vacancy_id = v.vacancy_id
+              AND v.salary_mid_rub IS DISTINCT FROM recalculated.value
+        """)
+        return cursor.rowcount
+
+    @_writes
+    def refresh_analytics_views(self) -> None:
+        """
+        Обновляет материализованные представления аналитики.
+
+        Обновление идёт в режиме CONCURRENTLY, поэтому чтение представлений
+        во время обновления не блокируется. Время обновления сохраняется в analytics_refresh.
+        """
+        with self._cursor() as cursor:
+            for view_name in ANALYTICS_VIEWS:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}")
+                cursor.execute(
+                    """
+                    INSERT INTO analytics_refresh (view_name, refreshed_at) VALUES (%s, now())
+                    ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at
+                    """,
+                    (view_name,),
+                )
+
+    def try_refresh_analytics_views(self) -> bool:
+        """
+        Обновляет представления аналитики после загрузки данных.
+
+        Ошибка обновления печатается и не прерывает загрузку: записанные данные
+        остаются в базе, а представления обновит следующая загрузка.
+        :return: True, если представления обновлены
+        """
+        try:
+            self.refresh_analytics_views()
+        except Exception as e:
+            print(f"Не удалось обновить представления аналитики: {e}")
+            return False
+        return True
+
+    @_cached
+    def get_analytics_refreshed_at(self) -> Optional[datetime]:
+        """
+        Время последнего обновления аналитики.
+
+        :return: Время обновления самого старого из представлений или None, если они не обновлялись
+        """
+        with self._cursor() as cursor:
+            cursor.execute(
+                "SELECT MIN(refreshed_at), COUNT(*) FROM analytics_refresh WHERE view_name = ANY(%s)",
+                (list(ANALYTICS_VIEWS),),
+            )
+            refreshed_at, count = cursor.fetchone()
+            return refreshed_at if count == len(ANALYTICS_VIEWS) else None
+
+    @_cached
+    def get_companies_and_vacancies_count(self, live: bool = False) -> List[Dict[str, Any]]:
+        """
+        Получение количества вакансий по компаниям
+
+        :param live: Посчитать по таблицам, а не по материализованному представлению
+        """
+        with self._cursor() as cursor:
+            self._execute(cursor, "hh_company_counts_live" if live else "hh_company_counts")
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @_cached
     def get_all_vacancies(self) -> List[Dict[str, Any]]:
         """Получение всех вакансий"""
-        query = """
-            SELECT
-            v.title,
-            v.salary_from,
-            v.salary_to,
-            v.currency,
-            v.url,
-            e.company AS employer_name
-        FROM vacancies v
-        JOIN employers e ON v.employer_id = e.employer_id
-        """
-        self.cursor.execute(query)
-        columns = [desc[0] for desc in self.cursor.description]
-        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
-
-    def get_avg_salary(self) -> float:
-        """Получение средней зарплаты по всем вакансиям"""
-        query = """
-            SELECT AVG((COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2) as avg_salary
-            FROM vacancies
-            WHERE salary_from IS NOT NULL OR salary_to IS NOT NULL
-        """
-        self.cursor.execute(query)
-        result = self.cursor.fetchone()
-        return float(result[0]) if result[0] else 0.0
-
-    def get_vacancies_with_higher_salary(self) -> List[Dict[str, Any]]:
-        """Получение вакансий с зарплатой выше средней"""
-        avg_salary = self.get_avg_salary()
-        query = """
-            SELECT v.*, e.company as employer_name
-            FROM vacancies v
-            JOIN employers e ON v.employer_id = e.employer_id
-            WHERE (COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2 > %s
-            ORDER BY (COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2 DESC
-        """
-        self.cursor.execute(query, (avg_salary,))
-        columns = [desc[0] for desc in self.cursor.description]
-        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+        with self._cursor() as cursor:
+            cursor.execute(_ALL_VACANCIES_SQL)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def iter_all_vacancies(self, itersize: int = 1000) -> Iterator[Any]:
+        """
+        Потоковое получение всех вакансий через серверный курсор.
+
+        :param itersize: Число строк, забираемых с сервера за один раз
+        :return: Генератор namedtuple с полями get_all_vacancies
+        """
+        return self._iter_query(_ALL_VACANCIES_SQL, (), itersize)
+
+    @_cached
+    def get_vacancies_page(self, after_vacancy_id: Optional[int] = None, limit: int = 100) -> List[Any]:
+        """
+        Страница всех вакансий в порядке vacancy_id (keyset-пагинация).
+
+        :param after_vacancy_id: vacancy_id последней вакансии предыдущей страницы
+        :param limit: Размер страницы
+        :return: Список namedtuple с полями get_all_vacancies
+        """
+        if after_vacancy_id is None:
+            return self._fetch_tuples(f"{_ALL_VACANCIES_SQL} ORDER BY v.vacancy_id LIMIT %s", (limit,))
+        return self._fetch_tuples(
+            f"{_ALL_VACANCIES_SQL} WHERE v.vacancy_id > %s ORDER BY v.vacancy_id LIMIT %s", (after_vacancy_id, limit)
+        )
+
+    @_cached
+    def get_avg_salary(self, live: bool = False) -> float:
+        """
+        Получение средней зарплаты по всем вакансиям (в рублях)
 
+        :param live: Посчитать по таблице vacancies, а не по материализованному представлению
+        """
+        with self._cursor() as cursor:
+            self._execute(cursor, "hh_avg_salary_live" if live else "hh_avg_salary")
+            result = cursor.fetchone()
+            return float(result[0]) if result[0] else 0.0
+
+    @_cached
+    def get_salary_stats(self, live: bool = False) -> List[Dict[str, Any]]:
+        """
+        Статистика зарплат по компаниям и валютам: число вакансий, минимум, максимум, среднее.
+
+        Минимум, максимум и среднее считаются только по вакансиям с указанной зарплатой
+        (salary_mid > 0); у группы без зарплат они NULL.
+
+        :param live: Посчитать по таблицам, а не по материализованному представлению
+        """
+        source = "mv_salary_stats"
+        if live:
+            source = """(
+                SELECT
+                    e.employer_id,
+                    e.company,
+                    COALESCE(v.currency, '') AS currency,
+                    COUNT(*) AS vacancies_count,
+                    COUNT(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_count,
+                    MIN(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_min,
+                    MAX(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_max,
+                    AVG(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_avg
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                GROUP BY e.employer_id, e.company, COALESCE(v.currency, '')
+            ) stats"""
+        query = f"""
+            SELECT company, currency, vacancies_count, salary_count, salary_min, salary_max, salary_avg
+            FROM {source}
+            ORDER BY company, currency
+        """
+        with self._cursor() as cursor:
+            cursor.execute(query)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @_cached
+    def get_salary_percentiles(
+        self, percentiles: Tuple[float, ...] = SALARY_PERCENTILES, min_count: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Квантили зарплаты (середины вилки) по компаниям и валютам.
+
+        Квантили считаются на сервере через percentile_cont, клиенту приходит
+        по одной строке на компанию и валюту. Вакансии без зарплаты не учитываются.
+
+        :param percentiles: Доли от 0 до 1, например (0.25, 0.5, 0.75)
+        :param min_count: Минимальное число вакансий с зарплатой в группе
+        :return: [{"company", "currency", "salary_count", "percentiles": {доля: значение}}]
+        """
+        percentiles = tuple(float(p) for p in percentiles)
+        if not percentiles or any(not 0 <= p <= 1 for p in percentiles):
+            raise ValueError("Квантили должны быть долями от 0 до 1")
+        with self._cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    e.company,
+                    v.currency,
+                    COUNT(*) AS salary_count,
+                    percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY v.salary_mid) AS quantiles
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                WHERE v.salary_mid > 0
+                GROUP BY e.employer_id, e.company, v.currency
+                HAVING COUNT(*) >= %s
+                ORDER BY e.company, v.currency
+                """,
+                (list(percentiles), min_count),
+            )
+            return [
+                {
+                    "company": company,
+                    "currency": currency,
+                    "salary_count": salary_count,
+                    "percentiles": dict(zip(percentiles, quantiles)),
+                }
+                for company, currency, salary_count, quantiles in cursor.fetchall()
+            ]
+
+    @_cached
+    def get_salary_histogram(
+        self,
+        buckets: int = 20,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        currency: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Гистограмма зарплат с корзинами равной ширины (width_bucket на сервере).
+
+        Без currency строится по зарплате в рублях (salary_mid_rub), с currency —
+        по середине вилки в этой валюте. Верхняя граница входит в последнюю корзину;
+        значения вне заданных границ попадают в открытые корзины 0 и buckets + 1.
+        Если задана одна граница и она оказалась по другую сторону от всех зарплат
+        (low не меньше максимума или high не больше минимума), гистограмма пуста.
+
+        :param buckets: Число корзин между low и high
+        :param low: Нижняя граница (по умолчанию — минимальная зарплата)
+        :param high: Верхняя граница (по умолчанию — максимальная зарплата)
+        :param currency: Код валюты (например, USD) или None для рублей
+        :return: [{"bucket", "salary_from", "salary_to", "vacancies_count"}] по всем корзинам 1..buckets
+            и непустым открытым корзинам; salary_from/salary_to открытых корзин — None
+        """
+        if buckets < 1:
+            raise ValueError("Число корзин должно быть положительным")
+        if low is not None and high is not None and high <= low:
+            raise ValueError("Верхняя граница гистограммы должна быть больше нижней")
+        column = "salary_mid" if currency else "salary_mid_rub"
+        condition = "AND v.currency = %(currency)s" if currency else ""
+        with self._cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH bounds AS (
+                    SELECT
+                        COALESCE(%(low)s::numeric, MIN(v.{column})) AS low,
+                        COALESCE(%(high)s::numeric, MAX(v.{column})) AS high
+                    FROM vacancies v
+                    WHERE v.{column} > 0 {condition}
+                )
+                SELECT
+                    CASE
+                        WHEN b.high <= b.low THEN 1
+                        WHEN v.{column} = b.high THEN %(buckets)s
+                        ELSE width_bucket(v.{column}, b.low, b.high, %(buckets)s)
+                    END AS bucket,
+                    COUNT(*) AS vacancies_count,
+                    MIN(b.low) AS low,
+                    MIN(b.high) AS high
+                FROM vacancies v
+                CROSS JOIN bounds b
+                WHERE v.{column} > 0 {condition}
+                  -- Вырожденный диапазон допустим только у границ из данных (все зарплаты равны)
+                  AND (b.high > b.low OR (%(low)s IS NULL AND %(high)s IS NULL))
+                GROUP BY bucket
+                ORDER BY bucket
+                """,
+                {"low": low, "high": high, "buckets": buckets, "currency": currency},
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return []
+        counts = {bucket: count for bucket, count, _, _ in rows}
+        range_low, range_high = float(rows[0][2]), float(rows[0][3])
+        width = (range_high - range_low) / buckets
+        result = []
+        if counts.get(0):
+            result.append({"bucket": 0, "salary_from": None, "salary_to": range_low, "vacancies_count": counts[0]})
+        for bucket in range(1, buckets + 1):
+            result.append(
+                {
+                    "bucket": bucket,
+                    "salary_from": range_low + width * (bucket - 1),
+                    "salary_to": range_low + width * bucket,
+                    "vacancies_count": counts.get(bucket, 0),
+                }
+            )
+        if counts.get(buckets + 1):
+            result.append(
+                {
+                    "bucket": buckets + 1,
+                    "salary_from": range_high,
+                    "salary_to": None,
+                    "vacancies_count": counts[buckets + 1],
+                }
+            )
+        return result
+
+    @_cached
+    def get_salary_coverage(self) -> List[Dict[str, Any]]:
+        """
+        Число вакансий с указанной зарплатой и без неё по компаниям.
+
+        Итог по всем компаниям считается в том же запросе (GROUPING SETS)
+        и возвращается первой строкой с company = None.
+
+        :return: [{"company", "vacancies_count", "with_salary", "without_salary"}]
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    e.company,
+                    COUNT(*) AS vacancies_count,
+                    COUNT(NULLIF(v.salary_mid, 0)) AS with_salary,
+                    COUNT(*) - COUNT(NULLIF(v.salary_mid, 0)) AS without_salary
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                GROUP BY GROUPING SETS ((e.employer_id, e.company), ())
+                ORDER BY GROUPING(e.employer_id) DESC, vacancies_count DESC, e.company
+            """)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @_cached
+    def get_vacancies_with_higher_salary(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Получение вакансий с зарплатой выше средней (одним запросом).
+
+        :param limit: Максимальное число вакансий (None — все)
+        :param offset: Сколько вакансий с наибольшей зарплатой пропустить
+        :return: Вакансии от больших зарплат к меньшим
+        """
+        with self._cursor() as cursor:
+            self._execute(cursor, "hh_higher_salary", (limit, offset))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def iter_vacancies_with_higher_salary(
+        self, itersize: int = 1000, limit: Optional[int] = None, offset: int = 0
+    ) -> Iterator[Any]:
+        """
+        Потоковое получение вакансий с зарплатой выше средней.
+
+        :param itersize: Число строк, забираемых с сервера за один раз
+        :param limit: Максимальное число вакансий (None — все)
+        :param offset: Сколько вакансий с наибольшей зарплатой пропустить
+        :return: Генератор namedtuple, от больших зарплат к меньшим
+        """
+        return self._iter_query(_HIGHER_SALARY_SQL, (limit, offset), itersize)
+
+    @_cached
     def get_vacancies_with_keyword(self, keyword: str) -> List[Dict[str, Any]]:
-        """Поиск вакансий по ключевому слову в названии"""
-        query = """
-            SELECT v.*, e.company as employer_name
-            FROM vacancies v
-            JOIN employers e ON v.employer_id = e.employer_id
-            WHERE LOWER(v.title) LIKE %s OR LOWER(v.description) LIKE %s
+        """Поиск вакансий по ключевому слову (подстроке) в названии или описании"""
+        search_pattern = f"%{keyword.translate(_LIKE_ESCAPES)}%"
+        with self._cursor() as cursor:
+            cursor.execute(_KEYWORD_SQL, (search_pattern, search_pattern))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def iter_vacancies_with_keyword(self, keyword: str, itersize: int = 1000) -> Iterator[Any]:
         """
-        search_pattern = f"%{keyword.lower()}%"
-        self.cursor.execute(query, (search_pattern, search_pattern))
-        columns = [desc[0] for desc in self.cursor.description]
-        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+        Потоковый поиск вакансий по ключевому слову (подстроке).
 
+        :param keyword: Ключевое слово
+        :param itersize: Число строк, забираемых с сервера за один раз
+        :return: Генератор namedtuple
+        """
+        search_pattern = f"%{keyword.translate(_LIKE_ESCAPES)}%"
+        return self._iter_query(_KEYWORD_SQL, (search_pattern, search_pattern), itersize)
+
+    @_cached
+    def get_vacancies_with_keyword_page(
+        self, keyword: str, after_vacancy_id: Optional[int] = None, limit: int = 100
+    ) -> List[Any]:
+        """
+        Страница результатов поиска по ключевому слову в порядке vacancy_id (keyset-пагинация).
+
+        :param keyword: Ключевое слово
+        :param after_vacancy_id: vacancy_id последней вакансии предыдущей страницы
+        :param limit: Размер страницы
+        :return: Список namedtuple
+        """
+        search_pattern = f"%{keyword.translate(_LIKE_ESCAPES)}%"
+        if after_vacancy_id is None:
+            return self._fetch_tuples(
+                f"{_KEYWORD_SQL} ORDER BY v.vacancy_id LIMIT %s", (search_pattern, search_pattern, limit)
+            )
+        return self._fetch_tuples(
+            f"{_KEYWORD_SQL} AND v.vacancy_id > %s ORDER BY v.vacancy_id LIMIT %s",
+            (search_pattern, search_pattern, after_vacancy_id, limit),
+        )
+
+    @staticmethod
+    def _build_tsquery(text: str, prefix: bool = True) -> str:
+        """
+        Строит запрос to_tsquery из произвольной строки пользователя.
+
+        Все слова должны встретиться в вакансии; при prefix=True каждое слово
+        ищется и как начало более длинного слова ("разраб" -> "разработчик").
+        """
+        words = re.findall(r"\w+", text.lower())
+        return " & ".join(f"{word}:*" if prefix else word for word in words)
+
+    @_cached
+    def search_vacancies(
+        self,
+        text: str,
+        limit: int = 50,
+        after: Optional[Tuple[float, int]] = None,
+        substring: bool = False,
+        prefix: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск вакансий с ранжированием по релевантности и keyset-пагинацией.
+
+        По умолчанию используется полнотекстовый поиск по индексу search_vector
+        (русская и английская морфология, несколько слов, поиск по префиксу).
+        В режиме substring ищется подстрока в названии или описании
+        (триграммный индекс); совпадения в названии ранжируются выше.
+
+        :param text: Строка поиска
+        :param limit: Максимальное число вакансий на странице
+        :param after: (rank, vacancy_id) последней вакансии предыдущей страницы
+        :param substring: Искать подстроку вместо слов
+        :param prefix: Искать слова по префиксу (только для полнотекстового режима)
+        :return: Вакансии страницы, отсортированные по убыванию rank
+        """
+        if substring:
+            pattern = f"%{text.translate(_LIKE_ESCAPES)}%"
+            rank_sql = "(v.title ILIKE %(pattern)s)::int::real"
+            match_sql = "v.title ILIKE %(pattern)s OR v.description ILIKE %(pattern)s"
+            params: Dict[str, Any] = {"pattern": pattern}
+        else:
+            tsquery = self._build_tsquery(text, prefix)
+            if not tsquery:
+                return []
+            rank_sql = "ts_rank_cd(v.search_vector, q.query)"
+            match_sql = "v.search_vector @@ q.query"
+            params = {"tsquery": tsquery}
+
+        keyset_sql = ""
+        if after is not None:
+            keyset_sql = "WHERE (rank, vacancy_id) < (%(after_rank)s::real, %(after_vacancy_id)s)"
+            params["after_rank"], params["after_vacancy_id"] = after
+        params["limit"] = limit
+
+        from_sql = "vacancies v JOIN employers e ON v.employer_id = e.employer_id"
+        if not substring:
+            from_sql += (
+                ", (SELECT to_tsquery('russian', %(tsquery)s) || to_tsquery('english', %(tsquery)s) AS query) q"
+            )
+        query = f"""
+            SELECT * FROM (
+                SELECT {_VACANCY_SELECT}, e.company AS employer_name, {rank_sql} AS rank
+                FROM {from_sql}
+                WHERE {match_sql}
+            ) ranked
+            {keyset_sql}
+            ORDER BY rank DESC, vacancy_id DESC
+            LIMIT %(limit)s
+        """
+        with self._cursor() as cursor:
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def export(self, name: str, file: Any, fmt: str = "csv", keyword: Optional[str] = None) -> int:
+        """
+        Потоковая выгрузка результата запроса через COPY ... TO STDOUT.
+
+        Строки идут с сервера прямо в файл, без создания объектов Python на каждую строку,
+        поэтому память не зависит от размера выгрузки.
+
+        :param name: Выгрузка из EXPORTS: vacancies, keyword, companies или companies_live
+        :param file: Двоичный файл или поток с методом write (например, sys.stdout.buffer)
+        :param fmt: Формат: csv (с заголовком) или ndjson (один JSON-объект на строку)
+        :param keyword: Ключевое слово для выгрузки keyword
+        :return: Число выгруженных строк
+        """
+        if name not in EXPORTS:
+            raise ValueError(f"Неизвестная выгрузка: {name}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+        params: Tuple[Any, ...] = ()
+        if name == "keyword":
+            if not keyword:
+                raise ValueError("Для выгрузки keyword нужно указать ключевое слово")
+            search_pattern = f"%{keyword.translate(_LIKE_ESCAPES)}%"
+            params = (search_pattern, search_pattern)
+        with self._cursor() as cursor:
+            # COPY не принимает параметры, поэтому они подставляются на клиенте с экранированием
+            query = cursor.mogrify(EXPORTS[name], params).decode() if params else EXPORTS[name]
+            cursor.copy_expert(EXPORT_FORMATS[fmt].format(query=query.strip()), file)
+            return max(cursor.rowcount, 0)
+
+    def compare_prepared_latency(self, runs: int = 50) -> Dict[str, Dict[str, float]]:
+        """
+        Сравнивает задержку частых запросов чтения с подготовкой и без неё.
+
+        Каждый запрос выполняется runs раз обычным execute и runs раз через EXECUTE
+        подготовленного оператора на одном соединении; кэш результатов не используется.
+
+        :param runs: Число повторов каждого варианта
+        :return: Имя запроса -> медианы unprepared_ms, prepared_ms и их отношение speedup
+        """
+        report = {}
+        with self._cursor() as cursor:
+            for name, params in _PREPARED_READS.items():
+                timings: Dict[bool, List[float]] = {False: [], True: []}
+                for prepared in (False, True):
+                    for _ in range(runs):
+                        started_at = time.perf_counter()
+                        self._execute(cursor, name, params, use_prepared=prepared)
+                        cursor.fetchall()
+                        timings[prepared].append((time.perf_counter() - started_at) * 1000)
+                unprepared_ms = statistics.median(timings[False])
+                prepared_ms = statistics.median(timings[True])
+                report[name] = {
+                    "unprepared_ms": unprepared_ms,
+                    "prepared_ms": prepared_ms,
+                    "speedup": unprepared_ms / prepared_ms if prepared_ms else 0.0,
+                }
+        return report
 
     def close(self) -> None:
-        """Закрытие соединения с базой данных"""
-        self.cursor.close()
-        self.conn.close()
+        """Закрытие всех соединений с базой данных"""
+        self.pool.closeall()
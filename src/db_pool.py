@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений с PostgreSQL.
+
+    Соединения создаются лениво, от min_connections до max_connections.
+    Если все соединения заняты, поток ждёт освобождения не дольше timeout секунд.
+    Соединение, простоявшее без дела дольше health_check_interval,
+    перед выдачей проверяется запросом SELECT 1 и при сбое пересоздаётся.
+    """
+
+    def __init__(
+        self,
+        min_connections: int = 1,
+        max_connections: int = 4,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        connect: Callable[..., Any] = psycopg2.connect,
+        **connect_kwargs: Any,
+    ):
+        """
+        :param min_connections: Число соединений, открываемых сразу и сохраняемых в пуле
+        :param max_connections: Максимальное число одновременно открытых соединений
+        :param timeout: Максимальное время ожидания свободного соединения в секундах
+        :param health_check_interval: Время простоя, после которого соединение проверяется
+        :param connect: Функция открытия соединения (по умолчанию psycopg2.connect)
+        :param connect_kwargs: Параметры connect
+        """
+        if min_connections < 0 or max_connections < 1 or min_connections > max_connections:
+            raise ValueError("Некорректные размеры пула соединений")
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.__connect_function = connect
+        self.__connect_kwargs = connect_kwargs
+        self.__condition = threading.Condition()
+        self.__idle: Deque[Tuple[Any, float]] = deque()
+        self.__in_use: Dict[int, Any] = {}
+        self.__states: Dict[int, Dict[str, Any]] = {}
+        self.__size = 0
+        self.__closed = False
+        self.__stats = {
+            "borrowed": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+        }
+        for _ in range(min_connections):
+            conn = self.__connect()
+            self.__idle.append((conn, time.monotonic()))
+            self.__size += 1
+
+    def __connect(self) -> Any:
+        """Открывает новое соединение в режиме autocommit"""
+        conn = self.__connect_function(**self.__connect_kwargs)
+        conn.autocommit = True
+        return conn
+
+    @staticmethod
+    def __is_alive(conn: Any) -> bool:
+        """Проверяет соединение запросом SELECT 1"""
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self) -> Any:
+        """
+        Берёт соединение из пула.
+
+        :return: Соединение psycopg2 в режиме autocommit
+        :raises TimeoutError: Если соединение не освободилось за timeout секунд
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.timeout
+        waited = False
+        with self.__condition:
+            while True:
+                if self.__closed:
+                    raise ConnectionError("Пул соединений закрыт")
+                if self.__idle:
+                    conn, idle_since = self.__idle.pop()
+                    break
+                if self.__size < self.max_connections:
+                    self.__size += 1
+                    conn, idle_since = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Неудачное ожидание тоже учитывается: иначе статистика занижает конкуренцию за соединения
+                    self.__record_wait(time.monotonic() - started_at)
+                    self.__stats["timeouts"] += 1
+                    raise TimeoutError(f"Нет свободного соединения с БД за {self.timeout} с")
+                waited = True
+                self.__condition.wait(remaining)
+
+            self.__stats["borrowed"] += 1
+            if waited:
+                self.__record_wait(time.monotonic() - started_at)
+
+        # Подключение и проверка выполняются вне блокировки, чтобы не задерживать другие потоки
+        try:
+            if conn is not None and (
+                conn.closed
+                or (time.monotonic() - idle_since > self.health_check_interval and not self.__is_alive(conn))
+            ):
+                with self.__condition:
+                    self.__stats["health_check_failures"] += 1
+                self.__close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self.__connect()
+        except BaseException:
+            with self.__condition:
+                self.__size -= 1
+                self.__condition.notify()
+            raise
+
+        with self.__condition:
+            self.__in_use[id(conn)] = conn
+        return conn
+
+    def __record_wait(self, wait_time: float) -> None:
+        """Учитывает ожидание свободного соединения (вызывается под блокировкой пула)"""
+        self.__stats["waits"] += 1
+        self.__stats["wait_time"] += wait_time
+        self.__stats["max_wait_time"] = max(self.__stats["max_wait_time"], wait_time)
+
+    def putconn(self, conn: Any, discard: bool = False) -> None:
+        """
+        Возвращает соединение в пул.
+
+        Незавершённая транзакция откатывается, режим autocommit восстанавливается.
+        :param conn: Соединение, ранее полученное через getconn
+        :param discard: Закрыть соединение вместо возврата в пул
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = True
+            except psycopg2.Error:
+                discard = True
+        discard = discard or bool(conn.closed)
+
+        with self.__condition:
+            self.__in_use.pop(id(conn), None)
+            if discard or self.__closed:
+                self.__size -= 1
+                if discard:
+                    self.__stats["discarded"] += 1
+            else:
+                self.__idle.append((conn, time.monotonic()))
+            self.__condition.notify()
+        if discard or self.__closed:
+            self.__close_quietly(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Контекстный менеджер: берёт соединение и гарантированно возвращает его.
+
+        Соединение, на котором произошла ошибка связи, закрывается, а не возвращается в пул.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def state(self, conn: Any) -> Dict[str, Any]:
+        """
+        Служебные данные, привязанные к соединению (например, подготовленные операторы).
+
+        Данные удаляются вместе с соединением, поэтому новое соединение после
+        переподключения всегда начинает с пустого состояния.
+        """
+        with self.__condition:
+            return self.__states.setdefault(id(conn), {})
+
+    def __close_quietly(self, conn: Any) -> None:
+        """Закрывает соединение и удаляет его служебные данные, игнорируя ошибки"""
+        with self.__condition:
+            self.__states.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула: занятые и свободные соединения, ожидания, таймауты"""
+        with self.__condition:
+            return {
+                "size": self.__size,
+                "in_use": len(self.__in_use),
+                "idle": len(self.__idle),
+                "max_connections": self.max_connections,
+                **self.__stats,
+            }
+
+    def closeall(self) -> None:
+        """Закрывает все соединения пула; занятые закрываются при возврате"""
+        with self.__condition:
+            self.__closed = True
+            idle = [conn for conn, _ in self.__idle]
+            self.__idle.clear()
+            self.__size -= len(idle)
+            self.__condition.notify_all()
+        for conn in idle:
+            self.__close_quietly(conn)
@@ -3,6 +3,8 @@ class Employer:
     Класс для представления работодателя.
     """
 
+    __slots__ = ("employer_id", "company", "description", "url")
+
     def __init__(self, employer_id: int, company: str, description: str, url: str):
         """
         Инициализация объекта Employer.
@@ -0,0 +1,32 @@
+import json
+from typing import Any, Dict
+
+
+def parse_currency_rates(data: Any) -> Dict[str, float]:
+    """
+    Извлекает курсы валют из справочника hh.ru или из простого словаря.
+
+    Поддерживаются два формата:
+    - ответ /dictionaries: {"currency": [{"code": "USD", "rate": 0.0112, ...}, ...]};
+    - словарь {"USD": 0.0112, ...}.
+    Курс — сколько единиц валюты стоит один рубль.
+
+    :param data: Разобранный JSON
+    :return: Словарь код валюты -> курс
+    """
+    if isinstance(data, dict) and isinstance(data.get("currency"), list):
+        return {item["code"]: float(item["rate"]) for item in data["currency"] if item.get("rate")}
+    if isinstance(data, dict):
+        return {str(code): float(rate) for code, rate in data.items()}
+    raise ValueError("Неизвестный формат курсов валют")
+
+
+def read_currency_rates(path: str) -> Dict[str, float]:
+    """
+    Читает курсы валют из локального JSON-файла.
+
+    :param path: Путь к файлу в одном из форматов parse_currency_rates
+    :return: Словарь код валюты -> курс
+    """
+    with open(path, encoding="utf-8") as file:
+        return parse_currency_rates(json.load(file))
@@ -1,4 +1,20 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.capture import CaptureWriter
+from src.exchange_rates import parse_currency_rates
+from src.http_cache import HTTPCache
+from src.metrics import Metrics, endpoint_label
+from src.rate_limiter import TokenBucket
+
+# Общий для всех экземпляров HeadHunterAPI ограничитель частоты запросов к hh.ru
+DEFAULT_RATE_LIMITER = TokenBucket(rate=10, capacity=10)
 
 
 class HeadHunterAPI:
@@ -9,20 +25,177 @@ class HeadHunterAPI:
 
     __BASE_URL = "https://api.hh.ru"
 
-    def __init__(self) -> None:
+    # hh.ru отдаёт не более 2000 вакансий на один поиск: 20 страниц по 100
+    __PER_PAGE = 100
+    __MAX_PAGES = 20
+
+    # Ответы, после которых запрос имеет смысл повторить
+    __RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_pages: int = __MAX_PAGES,
+        pool_size: int = 10,
+        timeout: Tuple[float, float] = (3.05, 15.0),
+        max_retries: int = 5,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        rate_limiter: Optional[TokenBucket] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[HTTPCache] = None,
+        metrics: Optional[Metrics] = None,
+        capture: Optional[CaptureWriter] = None,
+    ) -> None:
         """Инициализация объекта API.
-        Создает заголовки для запросов
+        Создает постоянную HTTP-сессию с пулом keep-alive соединений.
+
+        :param max_concurrency: Максимальное число одновременных запросов страниц вакансий.
+        :param max_pages: Максимальное число страниц вакансий на одного работодателя.
+        :param pool_size: Размер пула соединений сессии (не меньше max_concurrency).
+        :param timeout: Таймауты (подключение, чтение) в секундах.
+        :param max_retries: Число повторов при сетевых ошибках и ответах 429/5xx.
+        :param backoff_factor: Базовая задержка экспоненциального backoff в секундах.
+        :param max_backoff: Верхняя граница задержки между повторами в секундах.
+        :param rate_limiter: Ограничитель частоты запросов (по умолчанию общий DEFAULT_RATE_LIMITER).
+        :param base_url: Адрес API (по умолчанию https://api.hh.ru).
+        :param cache: Дисковый кэш ответов с условными запросами (по умолчанию не используется).
+        :param metrics: Реестр метрик: время, код и размер ответа каждого запроса (по умолчанию не используется).
+        :param capture: Запись всех полученных ответов в NDJSON-сегменты для воспроизведения (src.replay).
         """
         self.__headers = {"User-Agent": "HH-API-Student-Project"}
+        self.max_concurrency = max(1, max_concurrency)
+        self.pool_size = max(pool_size, self.max_concurrency)
+        self.max_pages = max(1, min(max_pages, self.__MAX_PAGES))
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.rate_limiter = rate_limiter or DEFAULT_RATE_LIMITER
+        self.__base_url = (base_url or self.__BASE_URL).rstrip("/")
+        self.cache = cache
+        self.metrics = metrics
+        self.capture = capture
+
+        self.__session = requests.Session()
+        self.__session.headers.update(self.__headers)
+        self.__mount_adapter()
+
+    def __enter__(self) -> "HeadHunterAPI":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Закрывает HTTP-сессию и её пул соединений"""
+        self.__session.close()
+
+    def ensure_pool_size(self, size: int) -> None:
+        """
+        Увеличивает пул соединений сессии до size, если он меньше.
+
+        Нужно, когда клиент используют несколько потоков сразу: каждый поток
+        загружает страницы вакансий в max_concurrency запросов, и при нехватке
+        соединений urllib3 открывает лишние и закрывает их, теряя keep-alive.
+        Вызывать до начала запросов: прежний пул закрывается.
+
+        :param size: Требуемое число соединений
+        """
+        if size <= self.pool_size:
+            return
+        self.pool_size = size
+        self.__mount_adapter()
+
+    def __mount_adapter(self) -> None:
+        """Подключает к сессии адаптер с пулом на pool_size соединений"""
+        previous = self.__session.adapters.get("https://")
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+        if previous is not None:
+            previous.close()
 
     def __connect(self, url: str, params: dict) -> dict:
         """
         Приватный метод подключения к API hh.ru
+
+        Полученный ответ (из сети или из кэша) дописывается в capture, если он задан.
         """
-        response = requests.get(url, headers=self.__headers, params=params)
-        if response.status_code != 200:
-            raise ConnectionError("Ошибка подключения к hh.ru")
-        return response.json()
+        body = self.__fetch(url, params)
+        if self.capture is not None:
+            self.capture.write(url, params, body)
+        return body
+
+    def __fetch(self, url: str, params: dict) -> dict:
+        """
+        Запрос к API hh.ru с повторами и кэшем
+
+        Сетевые ошибки и ответы 429/5xx повторяются с экспоненциальной
+        задержкой и случайным джиттером; заголовок Retry-After имеет приоритет.
+        При включённом кэше свежие ответы отдаются без запроса, а устаревшие
+        перепроверяются условным запросом.
+        """
+        entry = self.cache.lookup(url, params) if self.cache is not None else None
+        if entry is not None and self.cache is not None and self.cache.is_fresh(entry):
+            if self.metrics is not None:
+                self.metrics.inc("hh_http_cache_hits_total", endpoint=endpoint_label(url))
+            return self.cache.hit(entry)
+        headers = HTTPCache.validators(entry) if entry is not None else {}
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.rate_limiter.acquire()
+            started_at = time.perf_counter()
+            try:
+                response = self.__session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.__observe(url, "error", started_at, 0, waited)
+                if attempt == self.max_retries:
+                    raise ConnectionError("Ошибка подключения к hh.ru") from e
+                time.sleep(self.__backoff_delay(attempt))
+                continue
+            self.__observe(url, str(response.status_code), started_at, len(response.content), waited)
+
+            if response.status_code == 304 and entry is not None and self.cache is not None:
+                return self.cache.revalidate(entry, response.headers)
+            if response.status_code == 200:
+                body = response.json()
+                if self.cache is not None:
+                    self.cache.store(url, params, body, response.headers)
+                return body
+            if response.status_code in self.__RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self.__backoff_delay(attempt, response.headers.get("Retry-After")))
+                continue
+            raise ConnectionError(f"Ошибка подключения к hh.ru: HTTP {response.status_code}")
+        raise ConnectionError("Ошибка подключения к hh.ru")
+
+    def __observe(self, url: str, status: str, started_at: float, size: int, waited: float) -> None:
+        """Передаёт в metrics время запроса, код ответа, размер тела и ожидание ограничителя частоты"""
+        if self.metrics is None:
+            return
+        self.metrics.record_http(url, status, time.perf_counter() - started_at, size)
+        if waited:
+            self.metrics.inc("hh_http_rate_limit_wait_seconds_total", waited)
+
+    def __backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Задержка перед повтором запроса.
+
+        :param attempt: Номер неудачной попытки, начиная с 0
+        :param retry_after: Значение заголовка Retry-After (секунды или HTTP-дата)
+        :return: Задержка в секундах
+        """
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    return min(self.max_backoff, max(0.0, delay))
+                except (TypeError, ValueError):
+                    pass
+        # "Full jitter": случайная задержка в пределах экспоненциально растущего окна
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2**attempt))
 
     def get_employer_info(self, employer_id: int) -> dict:
         """
@@ -30,22 +203,56 @@ class HeadHunterAPI:
         :param employer_id: Уникальный идентификатор работодателя на hh.ru.
         :return:Словарь с данными о работодателе, как их возвращает hh.ru.
         """
-        emp_api_url = f"{self.__BASE_URL}/employers/{employer_id}"
+        emp_api_url = f"{self.__base_url}/employers/{employer_id}"
         return self.__connect(emp_api_url, {})
 
+    def get_currency_rates(self) -> Dict[str, float]:
+        """
+        Получение курсов валют из справочника hh.ru.
+        :return: Словарь код валюты -> сколько единиц валюты стоит один рубль.
+        """
+        return parse_currency_rates(self.__connect(f"{self.__base_url}/dictionaries", {}))
+
     def get_vacancies(self, employer_id: int) -> list:
         """
         Получение списка вакансий конкретного работодателя.
         :param employer_id: Уникальный идентификатор работодателя на hh.ru.
         :return: Список вакансий в формате словаря, каждая вакансия как dict.
         """
+        return self.fetch_vacancies(employer_id)[0]
+
+    def fetch_vacancies(self, employer_id: int) -> Tuple[list, bool]:
+        """
+        Получение списка вакансий работодателя с признаком полноты.
 
-        vacancies = []
+        Первая страница запрашивается сразу, из её полей pages/found
+        определяется число оставшихся страниц, которые загружаются
+        параллельно (не более max_concurrency запросов одновременно).
+        Порядок вакансий совпадает с порядком страниц.
+        :param employer_id: Уникальный идентификатор работодателя на hh.ru.
+        :return: Список вакансий и True, если получены все найденные вакансии
+            (False, если выдача обрезана ограничением max_pages или глубиной поиска hh.ru).
+        """
+        vacancies_url = f"{self.__base_url}/vacancies"
 
-        vacancies_url = f"{self.__BASE_URL}/vacancies"
+        first_page = self.__connect(vacancies_url, self.__vacancies_params(employer_id, 0))
+        vacancies = list(first_page["items"])
 
-        params = {"employer_id": employer_id, "per_page": 100}  # берем первые 100 вакансий
+        pages = min(int(first_page.get("pages", 1)), self.max_pages)
+        complete = int(first_page.get("found", len(vacancies))) <= pages * self.__PER_PAGE
+        if pages <= 1:
+            return vacancies, complete
 
-        vac_response = self.__connect(vacancies_url, params)["items"]
-        vacancies.extend(vac_response)
-        return vacancies
+        def fetch_page(page: int) -> list:
+            return self.__connect(vacancies_url, self.__vacancies_params(employer_id, page))["items"]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, pages - 1)) as executor:
+            for items in executor.map(fetch_page, range(1, pages)):
+                vacancies.extend(items)
+        return vacancies, complete
+
+    def __vacancies_params(self, employer_id: int, page: int) -> dict:
+        """
+        Параметры запроса одной страницы вакансий работодателя.
+        """
+        return {"employer_id": employer_id, "per_page": self.__PER_PAGE, "page": page}
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+
+class HTTPCache:
+    """
+    Дисковый кэш ответов API hh.ru с поддержкой условных запросов.
+
+    Ключ записи — URL вместе с параметрами запроса. Пока запись свежа
+    (не истёк TTL её эндпоинта), ответ отдаётся без обращения к сети.
+    Устаревшая запись перепроверяется через If-None-Match/If-Modified-Since:
+    на 304 тело берётся из кэша. Общий размер кэша ограничен, при
+    переполнении вытесняются давно не использованные записи (LRU).
+    """
+
+    # TTL по префиксу пути эндпоинта, в секундах
+    DEFAULT_TTL = {"/employers": 24 * 60 * 60.0, "/vacancies": 10 * 60.0, "/dictionaries": 24 * 60 * 60.0}
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        ttl: Optional[Dict[str, float]] = None,
+        default_ttl: float = 0.0,
+    ):
+        """
+        :param directory: Каталог для файлов кэша
+        :param max_bytes: Максимальный суммарный размер записей в байтах
+        :param ttl: TTL по префиксу пути эндпоинта (по умолчанию DEFAULT_TTL)
+        :param default_ttl: TTL для эндпоинтов, не указанных в ttl
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = dict(self.DEFAULT_TTL if ttl is None else ttl)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+        self.__index: "OrderedDict[str, int]" = OrderedDict()
+        self.__total_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(directory, name))
+                files.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(files):
+            self.__index[key] = size
+            self.__total_bytes += size
+
+    @staticmethod
+    def make_key(url: str, params: Mapping[str, Any]) -> str:
+        """Ключ записи: хэш URL и отсортированных параметров запроса"""
+        raw = json.dumps([url, sorted((str(k), str(v)) for k, v in params.items())], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def ttl_for(self, url: str) -> float:
+        """TTL эндпоинта по самому длинному подходящему префиксу пути"""
+        path = urlsplit(url).path
+        matches = [prefix for prefix in self.ttl if path.startswith(prefix)]
+        return self.ttl[max(matches, key=len)] if matches else self.default_ttl
+
+    def lookup(self, url: str, params: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Ищет запись в кэше.
+
+        :return: Запись (url, key, stored_at, etag, last_modified, body) или None
+        """
+        key = self.make_key(url, params)
+        with self.__lock:
+            if key not in self.__index:
+                return None
+        try:
+            with open(self.__path(key), encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.__forget(key)
+            return None
+        entry["key"] = key
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Проверяет, что TTL записи ещё не истёк"""
+        return time.time() - entry["stored_at"] < self.ttl_for(entry["url"])
+
+    @staticmethod
+    def validators(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Заголовки условного запроса для перепроверки записи"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, entry: Dict[str, Any]) -> Any:
+        """Отдаёт тело свежей записи без обращения к сети"""
+        with self.__lock:
+            self.hits += 1
+        self.__touch(entry["key"])
+        return entry["body"]
+
+    def revalidate(self, entry: Dict[str, Any], headers: Mapping[str, str]) -> Any:
+        """
+        Обрабатывает ответ 304: продлевает запись и отдаёт её тело.
+
+        :param entry: Перепроверенная запись
+        :param headers: Заголовки ответа 304
+        """
+        with self.__lock:
+            self.revalidations += 1
+        self.__write(
+            entry["key"],
+            entry["url"],
+            entry["body"],
+            headers.get("ETag") or entry.get("etag"),
+            headers.get("Last-Modified") or entry.get("last_modified"),
+        )
+        return entry["body"]
+
+    def store(self, url: str, params: Mapping[str, Any], body: Any, headers: Mapping[str, str]) -> None:
+        """
+        Сохраняет ответ 200, полученный из сети.
+
+        :param url: URL запроса
+        :param params: Параметры запроса
+        :param body: Разобранное JSON-тело ответа
+        :param headers: Заголовки ответа (ETag, Last-Modified)
+        """
+        with self.__lock:
+            self.misses += 1
+        self.__write(self.make_key(url, params), url, body, headers.get("ETag"), headers.get("Last-Modified"))
+
+    def __write(self, key: str, url: str, body: Any, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """Атомарно записывает запись на диск и применяет ограничение размера"""
+        data = json.dumps(
+            {"url": url, "stored_at": time.time(), "etag": etag, "last_modified": last_modified, "body": body},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        path = self.__path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+        with self.__lock:
+            self.__total_bytes += len(data) - self.__index.pop(key, 0)
+            self.__index[key] = len(data)
+            while self.__total_bytes > self.max_bytes and len(self.__index) > 1:
+                old_key, size = self.__index.popitem(last=False)
+                self.__total_bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self.__path(old_key))
+                except OSError:
+                    pass
+
+    def __touch(self, key: str) -> None:
+        """Отмечает запись как недавно использованную"""
+        with self.__lock:
+            if key in self.__index:
+                self.__index.move_to_end(key)
+        try:
+            os.utime(self.__path(key))
+        except OSError:
+            pass
+
+    def __forget(self, key: str) -> None:
+        """Удаляет из индекса повреждённую или пропавшую запись"""
+        with self.__lock:
+            self.__total_bytes -= self.__index.pop(key, 0)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счётчики кэша: попадания, промахи, перепроверки (304), вытеснения, размер"""
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "entries": len(self.__index),
+                "bytes": self.__total_bytes,
+            }
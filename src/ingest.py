@@ -0,0 +1,229 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from src.db_manager import DBManager
+from src.employer import Employer
+from src.hh_api import HeadHunterAPI
+from src.vacancy_batch import VacancyBatch
+
+# Маркер завершения работы стадии
+_STOP = object()
+
+# Разобранные данные работодателя: название, id, работодатель, вакансии, признак полного списка вакансий
+_ParsedEmployer = Tuple[str, int, Dict[str, Any], VacancyBatch, bool]
+
+
+class IngestPipeline:
+    """
+    Конвейер загрузки данных hh.ru в базу данных.
+
+    Стадии работают параллельно и связаны ограниченными очередями:
+    - несколько потоков загрузки получают работодателя и его вакансии из API;
+    - поток разбора превращает ответы API в словарь работодателя и колоночный VacancyBatch;
+    - стадия записи (вызывающий поток) копит пакеты и пишет их пакетными вставками DBManager.
+    Заполненная очередь приостанавливает предыдущую стадию (backpressure).
+    Ошибка при обработке одного работодателя не прерывает загрузку остальных.
+
+    В инкрементальном режиме вакансии пишутся через DBManager.sync_vacancies:
+    неизменившиеся строки не перезаписываются, а вакансии, закрытые на hh.ru,
+    удаляются (или архивируются) — только у работодателей, чей список получен полностью.
+    """
+
+    def __init__(
+        self,
+        db: DBManager,
+        hh_api: HeadHunterAPI,
+        fetch_workers: int = 4,
+        queue_size: int = 8,
+        batch_size: int = 5000,
+        incremental: bool = False,
+        archive_removed: bool = False,
+        refresh_views: bool = True,
+        crawl_id: Optional[str] = None,
+    ):
+        """
+        :param db: Менеджер базы данных (используется только стадией записи)
+        :param hh_api: Клиент API hh.ru, общий для потоков загрузки; его пул соединений
+            увеличивается до fetch_workers * max_concurrency
+        :param fetch_workers: Число потоков загрузки
+        :param queue_size: Ёмкость очередей между стадиями
+        :param batch_size: Число вакансий, после которого пакет записывается в БД
+        :param incremental: Инкрементальная синхронизация вместо полной перезаписи
+        :param archive_removed: Переносить закрытые вакансии в архив вместо удаления
+        :param refresh_views: Обновить материализованные представления аналитики после загрузки
+        :param crawl_id: Идентификатор обхода: записанные работодатели отмечаются в crawl_checkpoints
+            в той же транзакции, что и их вакансии (только в инкрементальном режиме)
+        """
+        if crawl_id is not None and not incremental:
+            raise ValueError("Контрольные точки обхода поддерживаются только в инкрементальном режиме")
+        self.db = db
+        self.hh_api = hh_api
+        self.fetch_workers = max(1, fetch_workers)
+        # Каждый поток загрузки одновременно запрашивает до max_concurrency страниц
+        hh_api.ensure_pool_size(self.fetch_workers * hh_api.max_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.incremental = incremental
+        self.archive_removed = archive_removed
+        self.refresh_views = refresh_views
+        self.crawl_id = crawl_id
+        self.__errors = 0
+        self.__errors_lock = threading.Lock()
+
+    def run(self, employers: Mapping[str, int]) -> Dict[str, Any]:
+        """
+        Загружает работодателей и их вакансии в базу данных.
+
+        :param employers: Словарь работодателей: название -> id в HH
+        :return: Итоги загрузки: число работодателей, вакансий, ошибок, время и скорость
+        """
+        self.__errors = 0
+        tasks: "queue.Queue[Any]" = queue.Queue()
+        raw: "queue.Queue[Any]" = queue.Queue(self.queue_size)
+        parsed: "queue.Queue[Any]" = queue.Queue(self.queue_size)
+
+        for item in employers.items():
+            tasks.put(item)
+        for _ in range(self.fetch_workers):
+            tasks.put(_STOP)
+
+        started_at = time.perf_counter()
+        threads = [
+            threading.Thread(target=self.__fetch_stage, args=(tasks, raw), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        threads.append(threading.Thread(target=self.__parse_stage, args=(raw, parsed), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        totals = self.__write_stage(parsed)
+        for thread in threads:
+            thread.join()
+
+        if self.refresh_views:
+            self.db.try_refresh_analytics_views()
+
+        elapsed = time.perf_counter() - started_at
+        summary = {
+            "employers": totals["employers"],
+            "vacancies": totals["vacancies"],
+            "inserted": totals["inserted"],
+            "updated": totals["updated"],
+            "unchanged": totals["unchanged"],
+            "removed": totals["removed"],
+            "errors": self.__errors,
+            "elapsed": elapsed,
+            "employers_per_sec": totals["employers"] / elapsed if elapsed else 0.0,
+            "vacancies_per_sec": totals["vacancies"] / elapsed if elapsed else 0.0,
+        }
+        print(
+            f"\nЗагружено работодателей: {summary['employers']}, вакансий: {summary['vacancies']} "
+            f"(добавлено {summary['inserted']}, обновлено {summary['updated']}, без изменений {summary['unchanged']}, "
+            f"удалено {summary['removed']}), ошибок: {summary['errors']}. "
+            f"Время: {elapsed:.2f} с, {summary['employers_per_sec']:.2f} работодателей/с, "
+            f"{summary['vacancies_per_sec']:.1f} вакансий/с"
+        )
+        return summary
+
+    def __record_error(self, employer_name: str, error: Exception) -> None:
+        """Печатает ошибку обработки работодателя и учитывает её в итогах"""
+        print(f"Ошибка при обработке работодателя {employer_name}: {error}")
+        with self.__errors_lock:
+            self.__errors += 1
+
+    def __fetch_stage(self, tasks: "queue.Queue[Any]", raw: "queue.Queue[Any]") -> None:
+        """Стадия загрузки: получает данные работодателя и его вакансии из API"""
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                raw.put(_STOP)
+                return
+            employer_name, employer_id = task
+            try:
+                employer_data = self.hh_api.get_employer_info(employer_id)
+                vacancies_data, complete = self.hh_api.fetch_vacancies(employer_id)
+            except Exception as e:
+                self.__record_error(employer_name, e)
+                continue
+            raw.put((employer_name, employer_id, employer_data, vacancies_data, complete))
+
+    def __parse_stage(self, raw: "queue.Queue[Any]", parsed: "queue.Queue[Any]") -> None:
+        """Стадия разбора: превращает ответы API в данные для пакетной записи в БД"""
+        running = self.fetch_workers
+        while running:
+            item = raw.get()
+            if item is _STOP:
+                running -= 1
+                continue
+            employer_name, employer_id, employer_data, vacancies_data, complete = item
+            try:
+                employer_dict = Employer.cast_to_object(employer_data).to_dict()
+                vacancies = VacancyBatch.from_api(vacancies_data, employer_id)
+            except Exception as e:
+                self.__record_error(employer_name, e)
+                continue
+            parsed.put((employer_name, employer_id, employer_dict, vacancies, complete))
+        parsed.put(_STOP)
+
+    def __write_stage(self, parsed: "queue.Queue[Any]") -> Dict[str, int]:
+        """Стадия записи: копит пакеты и записывает их в БД"""
+        totals = dict.fromkeys(("employers", "vacancies", "inserted", "updated", "unchanged", "removed"), 0)
+        batch: List[_ParsedEmployer] = []
+        pending = 0
+        while True:
+            item = parsed.get()
+            if item is _STOP:
+                break
+            batch.append(item)
+            pending += len(item[3])
+            if pending >= self.batch_size:
+                self.__flush(batch, totals)
+                batch, pending = [], 0
+        if batch:
+            self.__flush(batch, totals)
+        return totals
+
+    def __flush(self, batch: List[_ParsedEmployer], totals: Dict[str, int]) -> None:
+        """
+        Записывает пакет работодателей и вакансий.
+
+        Если пакет целиком записать не удалось, работодатели записываются
+        по одному, чтобы ошибка затронула только проблемного работодателя.
+        """
+        try:
+            self.__write(batch, totals)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                self.__record_error(batch[0][0], e)
+                return
+        for item in batch:
+            try:
+                self.__write([item], totals)
+            except Exception as e:
+                self.__record_error(item[0], e)
+
+    def __write(self, batch: List[_ParsedEmployer], totals: Dict[str, int]) -> None:
+        """Пакетно записывает работодателей и их вакансии"""
+        self.db.insert_employers_bulk(employer for _, _, employer, _, _ in batch)
+        vacancies = VacancyBatch.concat(employer_vacancies for _, _, _, employer_vacancies, _ in batch)
+        if self.incremental:
+            complete_ids = [employer_id for _, employer_id, _, _, complete in batch if complete]
+            result = self.db.sync_vacancies(
+                vacancies,
+                complete_ids,
+                archive=self.archive_removed,
+                crawl_id=self.crawl_id,
+                crawled_ids=[employer_id for _, employer_id, _, _, _ in batch],
+            )
+        else:
+            result = self.db.insert_vacancies_bulk(vacancies)
+        totals["employers"] += len(batch)
+        totals["vacancies"] += len(vacancies)
+        for key in ("inserted", "updated", "unchanged", "removed"):
+            totals[key] += result.get(key, 0)
+        for employer_name, _, _, employer_vacancies, complete in batch:
+            suffix = "" if complete else " (список неполный, удаление закрытых вакансий пропущено)"
+            print(f"Работодатель {employer_name}: записано вакансий {len(employer_vacancies)}{suffix}")
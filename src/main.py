@@ -1,12 +1,15 @@
+import argparse
+import contextlib
+import itertools
 import os
-import time
+import sys
+from typing import IO, Any, Callable, Dict, Iterable, Optional, Sequence
 
 from dotenv import load_dotenv
 
-from employer import Employer
-from src.db_manager import DBManager
-from src.hh_api import HeadHunterAPI
-from vacancy import Vacancy
+from src.db_manager import EXPORT_FORMATS, EXPORTS, DBManager
+from src.metrics import Metrics
+from src.query_cache import QueryCache
 
 # Словарь работодателей: название -> id в HH
 EMPLOYERS = {
@@ -22,6 +25,143 @@ EMPLOYERS = {
     "МТС": 3776,
 }
 
+# Отчёты команды query
+QUERY_REPORTS = (
+    "vacancies",
+    "higher-salary",
+    "keyword",
+    "companies",
+    "avg-salary",
+    "salary-percentiles",
+    "salary-histogram",
+    "salary-coverage",
+)
+
+# Число строк на одной странице вывода в меню
+PAGE_SIZE = 50
+
+
+def get_db_config() -> Dict[str, Any]:
+    """Параметры подключения к PostgreSQL из переменных окружения"""
+    return {
+        "dbname": f"{os.getenv("DATABASE_NAME")}",
+        "user": f"{os.getenv("DATABASE_USER")}",
+        "password": f"{os.getenv("DATABASE_PASSWORD")}",
+        "host": f"{os.getenv("DATABASE_HOST")}",
+        "port": f"{os.getenv("DATABASE_PORT")}",
+    }
+
+
+def format_freshness(db: DBManager) -> str:
+    """Строка с временем последнего обновления аналитики"""
+    refreshed_at = db.get_analytics_refreshed_at()
+    if refreshed_at is None:
+        return "(аналитика ещё не обновлялась)"
+    return f"(данные на {refreshed_at:%d.%m.%Y %H:%M})"
+
+
+def format_vacancy(v: Any) -> str:
+    """Строка вакансии для вывода (строка результата iter_* DBManager)"""
+    return (
+        f"Компания: {v.employer_name} | "
+        f"Вакансия: {v.title} | "
+        f"Зарплата: {v.salary_from} - {v.salary_to} {v.currency} | "
+        f"Ссылка: {v.url}"
+    )
+
+
+def write_lines(lines: Iterable[str]) -> None:
+    """Выводит строки одной записью в stdout вместо print на каждую строку"""
+    sys.stdout.write("".join(f"{line}\n" for line in lines))
+    sys.stdout.flush()
+
+
+def print_paged(rows: Iterable[Any], format_row: Callable[[Any], str], page_size: int = PAGE_SIZE) -> int:
+    """
+    Постраничный вывод строк: страница выводится одной записью, затем спрашивается, продолжать ли.
+
+    Если rows — генератор (например, серверный курсор DBManager.iter_*), он закрывается
+    и при досрочном выходе, чтобы курсор и соединение вернулись сразу.
+
+    :param rows: Строки результата
+    :param format_row: Преобразование строки результата в текст
+    :param page_size: Число строк на странице
+    :return: Число выведенных строк
+    """
+    shown = 0
+    try:
+        pages = itertools.batched(rows, page_size)
+        page = next(pages, None)
+        while page is not None:
+            write_lines(map(format_row, page))
+            shown += len(page)
+            page = next(pages, None)
+            if page is not None and input("\nПоказать ещё? (Enter — да, 0 — нет): ").strip() == "0":
+                break
+    finally:
+        close = getattr(rows, "close", None)
+        if close is not None:
+            close()
+    return shown
+
+
+def format_company(stat: Dict[str, Any]) -> str:
+    """Строка статистики компании для вывода"""
+    return f"Компания: {stat['company']} | Вакансий: {stat['vacancies_count']}"
+
+
+def run_export(
+    db: DBManager,
+    name: str,
+    fmt: str,
+    output: str,
+    keyword: Optional[str] = None,
+    stdout: Optional[IO[bytes]] = None,
+) -> int:
+    """
+    Выгружает результат запроса в файл через COPY TO.
+
+    :param name: Выгрузка из EXPORTS
+    :param fmt: csv или ndjson
+    :param output: Путь к файлу; "-" — stdout
+    :param keyword: Ключевое слово для выгрузки keyword
+    :param stdout: Двоичный поток для output "-" (по умолчанию sys.stdout.buffer)
+    :return: Число выгруженных строк
+    """
+    if output == "-":
+        stream = stdout or sys.stdout.buffer
+        rows = db.export(name, stream, fmt, keyword)
+        stream.flush()
+    else:
+        with open(output, "wb") as file:
+            rows = db.export(name, file, fmt, keyword)
+    print(f"Выгружено строк: {rows}")
+    return rows
+
+
+def export_metrics(metrics: Metrics, db: DBManager, ingest_summary: Optional[Dict[str, Any]]) -> None:
+    """
+    Дополняет метрики итогами загрузки и состоянием пула и кэшей и записывает их в METRICS_OUTPUT.
+
+    Файл *.json получает JSON, другой путь — текстовый формат Prometheus, "-" — вывод в консоль.
+    """
+    output = os.getenv("METRICS_OUTPUT")
+    if not output:
+        return
+    for key, value in (ingest_summary or {}).items():
+        if isinstance(value, (int, float)):
+            metrics.set(f"hh_ingest_{key}", value)
+    for key, value in db.pool_stats.items():
+        metrics.set(f"hh_db_pool_{key}", value)
+    if db.query_cache is not None:
+        for key, value in db.query_cache.stats.items():
+            metrics.set(f"hh_query_cache_{key}", value)
+    if output == "-":
+        print(metrics.to_prometheus())
+    else:
+        metrics.export(output)
+        print(f"Метрики записаны в {output}")
+
 
 def user_menu(db: DBManager) -> None:
     """Интерактивное меню для пользователя"""
@@ -33,52 +173,55 @@ def user_menu(db: DBManager) -> None:
         print("3 — Поиск вакансий по ключевому слову")
         print("4 — Показать количество вакансий по компаниям")
         print("5 — Показать среднею зарплату по всем вакансиям")
+        print("6 — Выгрузить данные в файл (CSV или NDJSON)")
         print("0 — Выход")
 
         choice = input("Ваш выбор: ").strip()
 
         if choice == "1":
-            vacancies = db.get_all_vacancies()
             print("\nВсе вакансии:\n")
-            for v in vacancies:
-                print(
-                    f"Компания: {v['employer_name']} | "
-                    f"Вакансия: {v['title']} | "
-                    f"Зарплата: {v['salary_from']} - {v['salary_to']} {v['currency']} | "
-                    f"Ссылка: {v['url']}"
-                )
+            print_paged(db.iter_all_vacancies(), format_vacancy)
 
         elif choice == "2":
-            vacancies = db.get_vacancies_with_higher_salary()
             print("\nВакансии с зарплатой выше средней:\n")
-            for v in vacancies:
-                print(
-                    f"Компания: {v['employer_name']} | "
-                    f"Вакансия: {v['title']} | "
-                    f"Зарплата: {v['salary_from']} - {v['salary_to']} {v['currency']} | "
-                    f"Ссылка: {v['url']}"
-                )
+            print_paged(db.iter_vacancies_with_higher_salary(), format_vacancy)
 
         elif choice == "3":
             keyword = input("Введите ключевое слово: ").strip()
-            vacancies = db.get_vacancies_with_keyword(keyword)
-            print(f"\nВакансии по ключевому слову «{keyword}»:\n")
-            for v in vacancies:
-                print(
+            print(f"\nВакансии по ключевому слову «{keyword}» (по релевантности):\n")
+            after = None
+            while True:
+                found = db.search_vacancies(keyword, limit=PAGE_SIZE, after=after)
+                write_lines(
                     f"Компания: {v['employer_name']} | "
                     f"Вакансия: {v['title']} | "
                     f"Зарплата: {v['salary_from']} - {v['salary_to']} {v['currency']} | "
                     f"Ссылка: {v['url']}"
+                    for v in found
                 )
+                if len(found) < PAGE_SIZE:
+                    break
+                if input("\nПоказать ещё? (Enter — да, 0 — нет): ").strip() == "0":
+                    break
+                after = (found[-1]["rank"], found[-1]["vacancy_id"])
         elif choice == "4":
             company_stats = db.get_companies_and_vacancies_count()
-            print("\nКоличество вакансий по компаниям:\n")
-            for stat in company_stats:
-                print(f"Компания: {stat['company']} | Вакансий: {stat['vacancies_count']}")
+            print(f"\nКоличество вакансий по компаниям {format_freshness(db)}:\n")
+            write_lines(map(format_company, company_stats))
 
         elif choice == "5":
             avg_salary = db.get_avg_salary()
-            print(f"\nСредняя зарплата по всем вакансиям: {avg_salary:.2f}")
+            print(f"\nСредняя зарплата по всем вакансиям: {avg_salary:.2f} руб. {format_freshness(db)}")
+
+        elif choice == "6":
+            name = input(f"Что выгрузить ({', '.join(EXPORTS)}): ").strip()
+            export_keyword = input("Введите ключевое слово: ").strip() if name == "keyword" else None
+            fmt = input("Формат (csv или ndjson, Enter — csv): ").strip() or "csv"
+            output = input("Файл: ").strip()
+            try:
+                run_export(db, name, fmt, output, export_keyword)
+            except (ValueError, OSError) as e:
+                print(f"Не удалось выгрузить данные: {e}")
 
         elif choice == "0":
             print("Выход из программы.")
@@ -88,80 +231,211 @@ def user_menu(db: DBManager) -> None:
             print("Неверный ввод, попробуйте ещё раз.")
 
 
-def main() -> None:
-    """Основная функция для заполнения базы данных"""
+def sync(db: DBManager, metrics: Metrics) -> Dict[str, Any]:
+    """
+    Загружает курсы валют, работодателей и вакансии из API hh.ru.
+
+    Клиент API, requests и конвейер загрузки импортируются только здесь,
+    чтобы режимы query и menu запускались без них.
+    """
+    from src.capture import CaptureWriter
+    from src.exchange_rates import read_currency_rates
+    from src.hh_api import HeadHunterAPI
+    from src.http_cache import HTTPCache
+    from src.ingest import IngestPipeline
+
+    # Создаем экземпляр API для работы с HeadHunter
+    print("Инициализируем API HeadHunter...")
+    # С HH_CAPTURE_DIR все ответы API записываются для последующей загрузки через python -m src.replay
+    capture_dir = os.getenv("HH_CAPTURE_DIR")
+    capture = CaptureWriter(capture_dir) if capture_dir else None
+    hh_api = HeadHunterAPI(cache=HTTPCache(os.getenv("HH_CACHE_DIR", ".hh_cache")), metrics=metrics, capture=capture)
+
+    # Загружаем курсы валют для пересчёта зарплат в рубли
+    print("Загружаем курсы валют...")
+    rates_file = os.getenv("EXCHANGE_RATES_FILE")
+    try:
+        rates = read_currency_rates(rates_file) if rates_file else hh_api.get_currency_rates()
+        db.load_exchange_rates(rates)
+    except Exception as e:
+        print(f"Не удалось загрузить курсы валют: {e}")
+
+    # Загружаем работодателей и вакансии конвейером: загрузка, разбор и запись идут параллельно.
+    # Синхронизация инкрементальная: неизменившиеся вакансии не перезаписываются, закрытые удаляются
+    ingest_summary = IngestPipeline(db, hh_api, incremental=True).run(EMPLOYERS)
+
+    hh_api.close()
+    if capture is not None:
+        capture.close()
+        print(f"Записано ответов API: {capture.records} в {capture_dir}")
+    if hh_api.cache is not None:
+        print(f"Кэш HTTP: {hh_api.cache.stats}")
+    return ingest_summary
+
+
+def run_query(db: DBManager, report: str, keyword: Optional[str] = None) -> None:
+    """
+    Однократный вывод отчёта без интерактивного меню.
+
+    :param report: Отчёт из QUERY_REPORTS
+    :param keyword: Ключевое слово для отчёта keyword
+    """
+    if report == "vacancies":
+        sys.stdout.writelines(f"{format_vacancy(v)}\n" for v in db.iter_all_vacancies())
+    elif report == "higher-salary":
+        sys.stdout.writelines(f"{format_vacancy(v)}\n" for v in db.iter_vacancies_with_higher_salary())
+    elif report == "keyword":
+        if not keyword:
+            raise ValueError("Для отчёта keyword нужно указать ключевое слово")
+        sys.stdout.writelines(f"{format_vacancy(v)}\n" for v in db.iter_vacancies_with_keyword(keyword))
+    elif report == "companies":
+        write_lines(map(format_company, db.get_companies_and_vacancies_count()))
+    elif report == "salary-percentiles":
+        write_lines(
+            f"Компания: {row['company']} | Валюта: {row['currency']} | Вакансий с зарплатой: {row['salary_count']} | "
+            + ", ".join(f"p{share * 100:g}: {value:.0f}" for share, value in row["percentiles"].items())
+            for row in db.get_salary_percentiles()
+        )
+    elif report == "salary-histogram":
+        write_lines(
+            f"{bucket['salary_from'] or 0:>12.0f} – {bucket['salary_to'] or float('inf'):>12.0f} руб. | "
+            f"{bucket['vacancies_count']}"
+            for bucket in db.get_salary_histogram()
+        )
+    elif report == "salary-coverage":
+        write_lines(
+            f"Компания: {row['company'] or 'Все компании'} | Вакансий: {row['vacancies_count']} | "
+            f"с зарплатой: {row['with_salary']} | без зарплаты: {row['without_salary']}"
+            for row in db.get_salary_coverage()
+        )
+    elif report == "avg-salary":
+        print(f"Средняя зарплата по всем вакансиям: {db.get_avg_salary():.2f} руб. {format_freshness(db)}")
+    else:
+        raise ValueError(f"Неизвестный отчёт: {report}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main", description="Вакансии работодателей hh.ru в PostgreSQL"
+    )
+    commands = parser.add_subparsers(dest="command", metavar="КОМАНДА")
+    commands.add_parser("sync", help="загрузить данные из API hh.ru и выйти")
+    query = commands.add_parser("query", help="вывести отчёт по уже загруженным данным и выйти")
+    query.add_argument("report", choices=QUERY_REPORTS)
+    query.add_argument("keyword", nargs="?", help="ключевое слово для отчёта keyword")
+    commands.add_parser("menu", help="интерактивное меню без загрузки данных")
+    export = commands.add_parser("export", help="выгрузить данные через COPY TO в CSV или NDJSON")
+    export.add_argument("name", choices=tuple(EXPORTS))
+    export.add_argument("keyword", nargs="?", help="ключевое слово для выгрузки keyword")
+    export.add_argument("--format", dest="fmt", choices=tuple(EXPORT_FORMATS), default="csv")
+    export.add_argument("--output", "-o", default="-", help="файл (по умолчанию stdout)")
+    crawl = commands.add_parser("crawl", help="обход списка работодателей с продолжением после сбоя")
+    source = crawl.add_mutually_exclusive_group()
+    source.add_argument("--file", help="файл с id работодателей (по одному в строке)")
+    source.add_argument(
+        "--table", default="crawl_targets", help="таблица с id работодателей (по умолчанию crawl_targets)"
+    )
+    crawl.add_argument("--column", default="employer_id", help="колонка таблицы с id работодателя")
+    crawl.add_argument("--crawl-id", help="идентификатор обхода (по умолчанию новый для каждого запуска)")
+    crawl.add_argument("--resume", action="store_true", help="продолжить обход --crawl-id с контрольных точек")
+    crawl.add_argument("--shards", type=int, default=4, help="процессов обхода")
+    crawl.add_argument("--workers", type=int, default=2, help="потоков загрузки в процессе")
+    crawl.add_argument("--rate", type=float, default=10.0, help="общий предел запросов к API в секунду")
+    crawl.add_argument("--batch-size", type=int, default=2000)
+    crawl.add_argument("--restart", action="store_true", help="начать обход заново")
+    replay = commands.add_parser("replay", help="загрузить записанные ответы API (HH_CAPTURE_DIR)")
+    replay.add_argument("sources", nargs="+", help="каталог с сегментами или файлы сегментов")
+    replay.add_argument("--workers", type=int, default=None, help="процессов разбора")
+    replay.add_argument("--incremental", action="store_true", help="не перезаписывать неизменившиеся вакансии")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Точка входа.
+
+    Без команды, как и раньше, данные загружаются из API и открывается меню;
+    query и menu работают с уже загруженной базой и не обращаются к API.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "query" and args.report == "keyword" and not args.keyword:
+        parser.error("для отчёта keyword нужно указать ключевое слово")
+    if args.command == "export" and args.name == "keyword" and not args.keyword:
+        parser.error("для выгрузки keyword нужно указать ключевое слово")
+    if args.command == "crawl" and args.resume and not args.crawl_id:
+        parser.error("для --resume нужно указать --crawl-id продолжаемого обхода")
+    if args.command == "export" and args.output == "-":
+        # Выгрузка идёт в stdout, поэтому сообщения о ходе работы выводятся в stderr
+        stdout = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            run(args, stdout)
+    else:
+        run(args)
+
+
+def run(args: argparse.Namespace, stdout: Optional[IO[bytes]] = None) -> None:
+    """
+    Выполняет команду args.command.
+
+    :param stdout: Двоичный поток для выгрузки export в stdout
+    """
     load_dotenv()
-    # Данные для подключения к PostgreSQL
-    DB_CONFIG = {
-        "dbname": f"{os.getenv("DATABASE_NAME")}",
-        "user": f"{os.getenv("DATABASE_USER")}",
-        "password": f"{os.getenv("DATABASE_PASSWORD")}",
-        "host": f"{os.getenv("DATABASE_HOST")}",
-        "port": f"{os.getenv("DATABASE_PORT")}",
-    }
+
+    # Время SQL и HTTP-запросов; запросы дольше SLOW_QUERY_MS попадают в журнал с планом выполнения
+    metrics = Metrics(
+        slow_query_threshold=float(os.getenv("SLOW_QUERY_MS", "500")) / 1000,
+        slow_query_log=os.getenv("SLOW_QUERY_LOG"),
+    )
+    ingest_summary = None
 
     try:
         # Создаем подключение к базе данных
         print("Подключаемся к базе данных...")
-        db = DBManager(**DB_CONFIG)
+        db = DBManager(**get_db_config(), query_cache=QueryCache(), metrics=metrics)
         # db.reset_database()
-        # Создаем таблицы
+        # Создаем таблицы (применяются только ещё не выполненные миграции)
         print("Создаем таблицы...")
-
-        # Создаем экземпляр API для работы с HeadHunter
-        print("Инициализируем API HeadHunter...")
-        hh_api = HeadHunterAPI()
-
-        total_employers = 0
-        total_vacancies = 0
-
-        # Обрабатываем каждого работодателя
-        for employer_name, employer_id in EMPLOYERS.items():
-            print(f"\n{'=' * 60}")
-            print(f"Обработка работодателя: {employer_name} (ID: {employer_id})")
-            print("=" * 60)
-
-            try:
-                # Получаем информацию о работодателе
-                print("Получаем информацию о работодателе...")
-                employer_data = hh_api.get_employer_info(employer_id)
-
-                # Преобразуем данные в объект Employer
-                employer_obj = Employer.cast_to_object(employer_data)
-                employer_dict = employer_obj.to_dict()
-
-                # Добавляем работодателя в базу данных
-                print(f"Добавляем работодателя {employer_name} в БД...")
-                db.insert_employer(employer_dict)
-                total_employers += 1
-
-                # Получаем вакансии работодателя
-                print("Получаем вакансии работодателя...")
-                vacancies_data = hh_api.get_vacancies(employer_id)
-
-                # Преобразуем данные в список объектов Vacancy
-                vacancy_objects = Vacancy.cast_to_object_list(vacancies_data)
-
-                # Добавляем вакансии в базу данных
-                vacancies_added = 0
-                for vacancy in vacancy_objects:
-                    vacancy_dict = vacancy.to_dict()
-                    # Добавляем вакансию в БД
-                    db.insert_vacancy(employer_id, vacancy_dict)
-
-                # Пауза между запросами к API, чтобы не превысить лимиты
-                time.sleep(0.1)
-
-            except Exception as e:
-                print(f"Ошибка при обработке работодателя {employer_name}: {e}")
-                continue
-
-        # Запуск пользовательского меню
-        user_menu(db)
+        db.create_tables()
+
+        if args.command in (None, "sync"):
+            ingest_summary = sync(db, metrics)
+        elif args.command == "crawl":
+            from src.crawl import read_employer_ids, run_crawl
+
+            employer_ids = read_employer_ids(args.file) if args.file else db.get_crawl_targets(args.table, args.column)
+            ingest_summary = run_crawl(
+                db,
+                get_db_config(),
+                employer_ids,
+                crawl_id=args.crawl_id,
+                resume=args.resume,
+                shards=args.shards,
+                fetch_workers=args.workers,
+                rate=args.rate,
+                batch_size=args.batch_size,
+                restart=args.restart,
+            )
+        elif args.command == "replay":
+            from src.replay import replay_capture
+
+            ingest_summary = replay_capture(db, args.sources, workers=args.workers, incremental=args.incremental)
+
+        if args.command == "query":
+            run_query(db, args.report, args.keyword)
+        elif args.command == "export":
+            run_export(db, args.name, args.fmt, args.output, args.keyword, stdout)
+        elif args.command in (None, "menu"):
+            # Запуск пользовательского меню
+            user_menu(db)
+
+        export_metrics(metrics, db, ingest_summary)
 
         # Закрываем соединение с БД
         db.close()
-        print("\nБаза данных успешно заполнена!")
+        if ingest_summary is not None:
+            print("\nБаза данных успешно заполнена!")
 
     except Exception as e:
         print(f"Критическая ошибка: {e}")
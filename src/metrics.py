@@ -0,0 +1,382 @@
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from psycopg2 import extensions
+from psycopg2.extras import NamedTupleCursor
+
+# Границы корзин гистограмм задержек, в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+# Операторы чтения, план которых можно запросить в журнале медленных запросов
+_READ_ONLY_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|FOR\s+(?:KEY\s+)?SHARE)\b", re.IGNORECASE)
+# Функции с побочными эффектами: рекомендательные блокировки, последовательности, большие объекты
+_SIDE_EFFECT_RE = re.compile(r"\b(?:pg_\w+|setval|nextval|lo_\w+|dblink\w*)\s*\(", re.IGNORECASE)
+_TARGET_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|VIEW|ON)\s+(\w+)", re.IGNORECASE)
+
+
+def statement_label(statement: str) -> str:
+    """
+    Короткая метка SQL-оператора для метрик: команда и первая таблица.
+
+    Метка не зависит от значений параметров, поэтому число рядов метрик ограничено.
+    Подготовленный оператор помечается своим именем: EXECUTE hh_avg_salary,
+    выгрузка COPY (запрос) TO — первой таблицей запроса: COPY TO vacancies.
+    """
+    words = statement.split(None, 2)
+    if not words:
+        return "EMPTY"
+    command = words[0].upper()
+    if command == "COPY" and len(words) > 1 and words[1].startswith("("):
+        target = _TARGET_RE.search(statement)
+        return f"COPY TO {target.group(1).lower()}" if target else "COPY TO"
+    if command in ("EXECUTE", "PREPARE", "DEALLOCATE", "COPY") and len(words) > 1:
+        return f"{command} {words[1].split('(')[0]}"
+    if command == "WITH":
+        return "WITH"
+    target = _TARGET_RE.search(statement)
+    return f"{command} {target.group(1).lower()}" if target else command
+
+
+def endpoint_label(url: str) -> str:
+    """Путь эндпоинта API без идентификаторов: /employers/{id}"""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?", 1)[0]
+    return re.sub(r"/\d+", "/{id}", path) or "/"
+
+
+class Metrics:
+    """
+    Потокобезопасный реестр метрик: счётчики, показатели (gauge) и гистограммы.
+
+    Экспортируется в текстовом формате Prometheus или в JSON. Кроме того, ведёт
+    журнал медленных запросов: оператор дольше slow_query_threshold секунд
+    записывается вместе с планом EXPLAIN.
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        slow_query_threshold: Optional[float] = None,
+        slow_query_log: Optional[str] = None,
+        explain_slow_queries: bool = True,
+        max_slow_queries: int = 100,
+    ):
+        """
+        :param buckets: Границы корзин гистограмм в секундах
+        :param slow_query_threshold: Порог медленного запроса в секундах (None — журнал отключён)
+        :param slow_query_log: Файл, в который медленные запросы дописываются построчно в JSON
+        :param explain_slow_queries: Получать план EXPLAIN для медленных операторов чтения
+        :param max_slow_queries: Сколько последних медленных запросов хранить в памяти
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.slow_query_threshold = slow_query_threshold
+        self.slow_query_log = slow_query_log
+        self.explain_slow_queries = explain_slow_queries
+        self.__lock = threading.Lock()
+        self.__counters: Dict[str, Dict[_Labels, float]] = {}
+        self.__gauges: Dict[str, Dict[_Labels, float]] = {}
+        self.__histograms: Dict[str, Dict[_Labels, List[float]]] = {}
+        self.__help: Dict[str, str] = {}
+        self.__slow_queries: Deque[Dict[str, Any]] = deque(maxlen=max_slow_queries)
+        self.__prepared: Dict[str, str] = {}
+        self.__analyzable: Set[str] = set()
+
+    @staticmethod
+    def __labels(labels: Dict[str, Any]) -> _Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Задаёт описание метрики (строка # HELP в Prometheus)"""
+        with self.__lock:
+            self.__help[name] = help_text
+
+    def register_prepared(self, name: str, statement: str, analyze: bool = False) -> None:
+        """
+        Запоминает текст подготовленного оператора, чтобы журнал мог получить план его EXECUTE.
+
+        :param name: Имя подготовленного оператора
+        :param statement: Текст запроса
+        :param analyze: Оператор — известное чтение, его можно повторно выполнить под EXPLAIN ANALYZE
+        """
+        with self.__lock:
+            self.__prepared[name] = statement
+            if analyze:
+                self.__analyzable.add(name)
+            else:
+                self.__analyzable.discard(name)
+
+    def is_read_only(self, statement: str) -> bool:
+        """Является ли оператор чтением без побочных эффектов (SELECT без записи, блокировок строк и pg_*-функций)"""
+        words = statement.split(None, 2)
+        if len(words) > 1 and words[0].upper() == "EXECUTE":
+            with self.__lock:
+                statement = self.__prepared.get(words[1].split("(")[0], "")
+        return (
+            bool(_READ_ONLY_RE.match(statement))
+            and not _WRITE_RE.search(statement)
+            and not _SIDE_EFFECT_RE.search(statement)
+        )
+
+    def explain_command(self, statement: str) -> Optional[str]:
+        """
+        Команда EXPLAIN для журнала медленных запросов или None, если план не запрашивается.
+
+        EXPLAIN ANALYZE выполняет запрос повторно, поэтому применяется только к EXECUTE
+        подготовленных операторов, зарегистрированных с analyze=True. Остальные операторы
+        чтения получают план без выполнения, прочие — не получают плана.
+        """
+        if not self.is_read_only(statement):
+            return None
+        words = statement.split(None, 2)
+        if words[0].upper() == "EXECUTE":
+            with self.__lock:
+                if words[1].split("(")[0] in self.__analyzable:
+                    return "EXPLAIN (ANALYZE, BUFFERS)"
+        return "EXPLAIN"
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Увеличивает счётчик"""
+        key = self.__labels(labels)
+        with self.__lock:
+            series = self.__counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """Устанавливает значение показателя"""
+        with self.__lock:
+            self.__gauges.setdefault(name, {})[self.__labels(labels)] = float(value)
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Добавляет наблюдение в гистограмму"""
+        key = self.__labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {})
+            # Счётчики корзин, затем +Inf, сумма и число наблюдений
+            histogram = series.setdefault(key, [0.0] * (len(self.buckets) + 3))
+            histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def record_query(self, statement: str, elapsed: float, rows: int, failed: bool = False) -> None:
+        """Учитывает выполненный SQL-оператор"""
+        label = statement_label(statement)
+        self.observe("hh_db_query_seconds", elapsed, statement=label)
+        self.inc("hh_db_query_rows_total", rows, statement=label)
+        if failed:
+            self.inc("hh_db_query_errors_total", statement=label)
+
+    def record_http(self, url: str, status: str, elapsed: float, size: int) -> None:
+        """Учитывает HTTP-запрос: время, код ответа и размер тела"""
+        endpoint = endpoint_label(url)
+        self.observe("hh_http_request_seconds", elapsed, endpoint=endpoint, status=status)
+        self.inc("hh_http_response_bytes_total", size, endpoint=endpoint)
+
+    def is_slow(self, elapsed: float) -> bool:
+        """Превышен ли порог медленного запроса"""
+        return self.slow_query_threshold is not None and elapsed >= self.slow_query_threshold
+
+    def log_slow_query(self, connection: Any, statement: str, elapsed: float, rows: int) -> None:
+        """
+        Записывает медленный запрос в журнал.
+
+        План запрашивается командой explain_command: с ANALYZE — только для известных
+        подготовленных чтений, без ANALYZE — для прочих операторов чтения. Внутри транзакции
+        EXPLAIN выполняется в точке сохранения, чтобы его ошибка не прервала транзакцию
+        вызывающего кода.
+        """
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(elapsed * 1000, 3),
+            "rows": rows,
+            "statement": statement,
+            "plan": None,
+        }
+        explain = self.explain_command(statement) if self.explain_slow_queries else None
+        if explain is not None:
+            entry["plan"] = self.__explain(connection, f"{explain} {statement}")
+        self.inc("hh_db_slow_queries_total", statement=statement_label(statement))
+        with self.__lock:
+            self.__slow_queries.append(entry)
+            if self.slow_query_log:
+                with open(self.slow_query_log, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def __explain(connection: Any, explain: str) -> Optional[str]:
+        """Выполняет команду EXPLAIN; план запроса или None, если его не удалось получить"""
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        in_transaction = status != extensions.TRANSACTION_STATUS_IDLE
+        with connection.cursor() as cursor:
+            try:
+                if in_transaction:
+                    cursor.execute("SAVEPOINT slow_query_explain")
+                cursor.execute(explain)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                if in_transaction:
+                    cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+                return plan
+            except Exception:
+                if in_transaction:
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                return None
+
+    @property
+    def slow_queries(self) -> List[Dict[str, Any]]:
+        """Последние медленные запросы"""
+        with self.__lock:
+            return list(self.__slow_queries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Снимок всех метрик в виде словаря для JSON"""
+        with self.__lock:
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "buckets": dict(zip([*map(str, self.buckets), "+Inf"], values[:-2])),
+                        "sum": values[-2],
+                        "count": values[-1],
+                    }
+                    for labels, values in series.items()
+                ]
+                for name, series in self.__histograms.items()
+            }
+            return {
+                "counters": {
+                    name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                    for name, series in self.__counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(labels), "value": value} for labels, value in series.items()]
+                    for name, series in self.__gauges.items()
+                },
+                "histograms": histograms,
+                "slow_queries": list(self.__slow_queries),
+            }
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+
+        def render(labels: _Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+            return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self.__lock:
+            for kind, metrics in (("counter", self.__counters), ("gauge", self.__gauges)):
+                for name, series in sorted(metrics.items()):
+                    if name in self.__help:
+                        lines.append(f"# HELP {name} {self.__help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines.extend(f"{name}{render(labels)} {value}" for labels, value in sorted(series.items()))
+            for name, histograms in sorted(self.__histograms.items()):
+                if name in self.__help:
+                    lines.append(f"# HELP {name} {self.__help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, values in sorted(histograms.items()):
+                    cumulative = 0.0
+                    for bound, count in zip([*map(str, self.buckets), "+Inf"], values[:-2]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{render(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{render(labels)} {values[-2]}")
+                    lines.append(f"{name}_count{render(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """Записывает метрики в файл: *.json — JSON, иначе текстовый формат Prometheus"""
+        if path.endswith(".json"):
+            data = json.dumps(self.to_dict(), ensure_ascii=False, indent=2, default=str)
+        else:
+            data = self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(data)
+
+
+class TimedCursorMixin:
+    """
+    Примесь к курсору psycopg2, замеряющая каждый оператор.
+
+    Время, число строк и ошибки передаются в metrics; медленные операторы
+    клиентских курсоров записываются в журнал медленных запросов. У серверного
+    (именованного) курсора замеряется только объявление, строки забираются позже.
+    """
+
+    metrics: Optional[Metrics] = None
+
+    def execute(self, query: Any, vars: Any = None) -> None:
+        if self.metrics is None:
+            return super().execute(query, vars)  # type: ignore[misc]
+        statement = query.decode("utf-8") if isinstance(query, bytes) else str(query)
+        started_at = time.perf_counter()
+        try:
+            super().execute(query, vars)  # type: ignore[misc]
+        except Exception:
+            self.metrics.record_query(statement, time.perf_counter() - started_at, 0, failed=True)
+            raise
+        elapsed = time.perf_counter() - started_at
+        rows = max(self.rowcount, 0)  # type: ignore[attr-defined]
+        self.metrics.record_query(statement, elapsed, rows)
+        if self.metrics.is_slow(elapsed) and self.name is None:  # type: ignore[attr-defined]
+            full_statement = self.mogrify(query, vars).decode("utf-8")  # type: ignore[attr-defined]
+            self.metrics.log_slow_query(self.connection, full_statement, elapsed, rows)  # type: ignore[attr-defined]
+
+    def executemany(self, query: Any, vars_list: Any) -> None:
+        if self.metrics is None:
+            return super().executemany(query, vars_list)  # type: ignore[misc]
+        statement = query.decode("utf-8") if isinstance(query, bytes) else str(query)
+        started_at = time.perf_counter()
+        try:
+            super().executemany(query, vars_list)  # type: ignore[misc]
+        except Exception:
+            self.metrics.record_query(statement, time.perf_counter() - started_at, 0, failed=True)
+            raise
+        self.metrics.record_query(statement, time.perf_counter() - started_at, max(self.rowcount, 0))  # type: ignore
+
+    def copy_expert(self, sql: Any, file: Any, size: int = 8192) -> None:
+        if self.metrics is None:
+            return super().copy_expert(sql, file, size)  # type: ignore[misc]
+        statement = sql.decode("utf-8") if isinstance(sql, bytes) else str(sql)
+        started_at = time.perf_counter()
+        try:
+            super().copy_expert(sql, file, size)  # type: ignore[misc]
+        except Exception:
+            self.metrics.record_query(statement, time.perf_counter() - started_at, 0, failed=True)
+            raise
+        self.metrics.record_query(statement, time.perf_counter() - started_at, max(self.rowcount, 0))  # type: ignore
+
+
+class TimedCursor(TimedCursorMixin, extensions.cursor):
+    """Обычный курсор psycopg2 с замером операторов"""
+
+
+class TimedNamedTupleCursor(TimedCursorMixin, NamedTupleCursor):
+    """Курсор NamedTupleCursor с замером операторов"""
+
+
+_TIMED_CURSORS: Dict[Any, Any] = {extensions.cursor: TimedCursor, NamedTupleCursor: TimedNamedTupleCursor}
+
+
+def timed_cursor_factory(cursor_factory: Any = None) -> Any:
+    """Класс курсора с замером операторов, соответствующий cursor_factory"""
+    cursor_factory = cursor_factory or extensions.cursor
+    if issubclass(cursor_factory, TimedCursorMixin):
+        return cursor_factory
+    timed = _TIMED_CURSORS.get(cursor_factory)
+    if timed is None:
+        timed = type(f"Timed{cursor_factory.__name__}", (TimedCursorMixin, cursor_factory), {})
+        _TIMED_CURSORS[cursor_factory] = timed
+    return timed
@@ -0,0 +1,379 @@
+import re
+from typing import List, Optional, Sequence
+
+# Число строк vacancies, обновляемых одной транзакцией при заполнении новых колонок
+_BACKFILL_BATCH_SIZE = 10_000
+
+
+class Migration:
+    """
+    Версионированный шаг изменения схемы базы данных.
+
+    Шаги применяются по возрастанию версии, каждая применённая версия
+    записывается в таблицу schema_migrations. Операторы шага идемпотентны
+    (IF NOT EXISTS), поэтому его можно повторить на базе, созданной вручную
+    или прерванной на середине.
+
+    Шаги, меняющие заполненную таблицу vacancies, не переписывают её целиком:
+    колонка добавляется без значения по умолчанию (только метаданные), заполняется
+    пакетами (backfill), а индекс строится через CREATE INDEX CONCURRENTLY.
+    """
+
+    __slots__ = ("version", "description", "statements", "concurrent", "optional")
+
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        statements: Sequence[str],
+        concurrent: bool = False,
+        optional: bool = False,
+    ):
+        """
+        :param version: Номер версии схемы, уникальный и возрастающий
+        :param description: Краткое описание изменения
+        :param statements: SQL-операторы шага в порядке выполнения
+        :param concurrent: Выполнять операторы вне транзакции, каждый отдельно
+            (нужно для CREATE INDEX CONCURRENTLY и пакетного заполнения колонок)
+        :param optional: Ошибка шага не прерывает миграцию; шаг повторяется при следующем запуске
+        """
+        self.version = version
+        self.description = description
+        self.statements = tuple(statements)
+        self.concurrent = concurrent
+        self.optional = optional
+
+    @property
+    def concurrent_indexes(self) -> List[str]:
+        """Имена индексов, создаваемых шагом через CREATE INDEX CONCURRENTLY"""
+        return [
+            match.group(1)
+            for statement in self.statements
+            for match in re.finditer(
+                r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", statement, re.IGNORECASE
+            )
+        ]
+
+    def __repr__(self) -> str:
+        return f"Migration({self.version}, {self.description!r})"
+
+
+def _backfill(
+    column: str, expression: str, condition: Optional[str] = None, batch_size: int = _BACKFILL_BATCH_SIZE
+) -> str:
+    """
+    Оператор пакетного заполнения колонки vacancies для шага с concurrent=True.
+
+    DO-блок идёт по vacancies в порядке vacancy_id пачками по batch_size строк
+    и фиксирует каждую пачку (COMMIT), поэтому строки блокируются ненадолго,
+    а прерванное заполнение продолжается при повторе шага.
+
+    :param column: Заполняемая колонка
+    :param expression: Значение колонки через колонки той же строки vacancies
+    :param condition: Какие строки обновлять (по умолчанию — где значение отличается)
+    :param batch_size: Число строк в одной транзакции
+    """
+    condition = condition or f"{column} IS DISTINCT FROM ({expression})"
+    return f"""
+        DO $$
+        DECLARE
+            last_id BIGINT := -1;
+            batch_last_id BIGINT;
+        BEGIN
+            LOOP
+                SELECT MAX(vacancy_id) INTO batch_last_id FROM (
+                    SELECT vacancy_id FROM vacancies
+                    WHERE vacancy_id > last_id
+                    ORDER BY vacancy_id
+                    LIMIT {int(batch_size)}
+                ) batch;
+                EXIT WHEN batch_last_id IS NULL;
+                UPDATE vacancies SET {column} = ({expression})
+                WHERE vacancy_id > last_id AND vacancy_id <= batch_last_id AND ({condition});
+                last_id := batch_last_id;
+                COMMIT;
+            END LOOP;
+        END
+        $$
+    """
+
+
+MIGRATIONS = (
+    Migration(
+        1,
+        "Таблицы работодателей и вакансий",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS employers (
+                employer_id SERIAL PRIMARY KEY,
+                company VARCHAR(255) NOT NULL,
+                url VARCHAR(255),
+                description TEXT
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS vacancies (
+                vacancy_id BIGINT PRIMARY KEY,
+                employer_id BIGINT REFERENCES employers(employer_id) ON DELETE CASCADE,
+                title VARCHAR(255) NOT NULL,
+                salary_from INTEGER,
+                salary_to INTEGER,
+                currency VARCHAR(10),
+                url VARCHAR(255) NOT NULL,
+                description TEXT
+            )
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "Хэш содержимого вакансии для инкрементальной синхронизации",
+        ["ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS content_hash CHAR(32)"],
+    ),
+    # Вакансии без зарплаты записываются с salary_from = salary_to = 0, поэтому их salary_mid равна 0,
+    # а не NULL: агрегаты по salary_mid отбирают salary_mid > 0. Правило пересчитано в шаге 14.
+    # salary_mid, salary_mid_rub и search_vector — обычные колонки, которые заполняет DBManager при записи:
+    # вычисляемая колонка (GENERATED ... STORED) при добавлении переписала бы всю таблицу под блокировкой
+    Migration(
+        3,
+        "Середина вилки зарплаты (0, если зарплата не указана)",
+        [
+            "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_mid INTEGER",
+            _backfill(
+                "salary_mid",
+                """
+                CASE
+                    WHEN salary_from IS NULL AND salary_to IS NULL THEN NULL
+                    ELSE (COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2
+                END
+                """,
+            ),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_salary_mid_idx "
+            "ON vacancies (salary_mid DESC, vacancy_id)",
+        ],
+        concurrent=True,
+    ),
+    Migration(
+        4,
+        "Курсы валют и середина вилки зарплаты в рублях",
+        [
+            # Курс — сколько единиц валюты стоит один рубль (как в справочнике hh.ru)
+            """
+            CREATE TABLE IF NOT EXISTS exchange_rates (
+                currency VARCHAR(10) PRIMARY KEY,
+                rate NUMERIC NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """,
+            "INSERT INTO exchange_rates (currency, rate) VALUES ('RUR', 1) ON CONFLICT DO NOTHING",
+            "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_mid_rub NUMERIC(14, 2)",
+            # Пока загружен только курс рубля, пересчитываются рублёвые вакансии; остальные — в load_exchange_rates
+            _backfill(
+                "salary_mid_rub",
+                """
+                round(
+                    NULLIF((COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2, 0)
+                    / NULLIF((SELECT r.rate FROM exchange_rates r WHERE r.currency = vacancies.currency), 0),
+                    2
+                )
+                """,
+            ),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_salary_mid_rub_idx "
+            "ON vacancies (salary_mid_rub DESC, vacancy_id)",
+        ],
+        concurrent=True,
+    ),
+    Migration(
+        5,
+        "Полнотекстовый поиск: русская и английская морфология, название весомее описания",
+        [
+            "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS search_vector tsvector",
+            _backfill(
+                "search_vector",
+                """
+                setweight(to_tsvector('russian'::regconfig, COALESCE(title, '')), 'A') ||
+                setweight(to_tsvector('english'::regconfig, COALESCE(title, '')), 'A') ||
+                setweight(to_tsvector('russian'::regconfig, COALESCE(description, '')), 'B') ||
+                setweight(to_tsvector('english'::regconfig, COALESCE(description, '')), 'B')
+                """,
+                condition="search_vector IS NULL",
+            ),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_search_vector_idx "
+            "ON vacancies USING GIN (search_vector)",
+        ],
+        concurrent=True,
+    ),
+    Migration(
+        6,
+        "Триграммные индексы для поиска по подстроке (расширение pg_trgm)",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_title_trgm_idx "
+            "ON vacancies USING GIN (title gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_description_trgm_idx "
+            "ON vacancies USING GIN (description gin_trgm_ops)",
+        ],
+        concurrent=True,
+        optional=True,
+    ),
+    Migration(
+        7,
+        "Время последней синхронизации вакансий по работодателям",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS employer_sync_state (
+                employer_id BIGINT PRIMARY KEY REFERENCES employers(employer_id) ON DELETE CASCADE,
+                last_synced_at TIMESTAMPTZ NOT NULL
+            )
+            """,
+        ],
+    ),
+    Migration(
+        8,
+        "Архив вакансий, закрытых на hh.ru",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS vacancies_archive (
+                vacancy_id BIGINT PRIMARY KEY,
+                employer_id BIGINT,
+                title VARCHAR(255) NOT NULL,
+                salary_from INTEGER,
+                salary_to INTEGER,
+                currency VARCHAR(10),
+                url VARCHAR(255) NOT NULL,
+                description TEXT,
+                archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """,
+        ],
+    ),
+    Migration(
+        9,
+        "Материализованные представления для аналитики меню",
+        [
+            """
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_company_vacancy_counts AS
+            SELECT e.employer_id, e.company, COUNT(v.vacancy_id) AS vacancies_count
+            FROM employers e
+            LEFT JOIN vacancies v ON e.employer_id = v.employer_id
+            GROUP BY e.employer_id, e.company
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS mv_company_vacancy_counts_key "
+            "ON mv_company_vacancy_counts (employer_id)",
+            """
+            CREATE MATERIALIZED VIEW IF NOT EXISTS mv_salary_stats AS
+            SELECT
+                e.employer_id,
+                e.company,
+                COALESCE(v.currency, '') AS currency,
+                COUNT(*) AS vacancies_count,
+                COUNT(v.salary_mid) AS salary_count,
+                MIN(v.salary_mid) AS salary_min,
+                MAX(v.salary_mid) AS salary_max,
+                AVG(v.salary_mid) AS salary_avg,
+                COUNT(v.salary_mid_rub) AS salary_rub_count,
+                SUM(v.salary_mid_rub) AS salary_rub_sum
+            FROM vacancies v
+            JOIN employers e ON v.employer_id = e.employer_id
+            GROUP BY e.employer_id, e.company, COALESCE(v.currency, '')
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS mv_salary_stats_key ON mv_salary_stats (employer_id, currency)",
+            """
+            CREATE TABLE IF NOT EXISTS analytics_refresh (
+                view_name VARCHAR(63) PRIMARY KEY,
+                refreshed_at TIMESTAMPTZ NOT NULL
+            )
+            """,
+        ],
+    ),
+    Migration(
+        10,
+        "Индекс вакансий по работодателю для соединений и подсчётов по компаниям",
+        ["CREATE INDEX CONCURRENTLY IF NOT EXISTS vacancies_employer_id_idx ON vacancies (employer_id, vacancy_id)"],
+        concurrent=True,
+    ),
+    Migration(
+        11,
+        "Список работодателей для обхода и контрольные точки обхода",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS crawl_targets (
+                employer_id BIGINT PRIMARY KEY,
+                added_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+                crawl_id VARCHAR(64) NOT NULL,
+                employer_id BIGINT NOT NULL,
+                vacancies_count INTEGER NOT NULL,
+                completed_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (crawl_id, employer_id)
+            )
+            """,
+        ],
+    ),
+    Migration(
+        12,
+        "Статистика зарплат в mv_salary_stats только по вакансиям с указанной зарплатой",
+        [
+            "DROP MATERIALIZED VIEW IF EXISTS mv_salary_stats",
+            """
+            CREATE MATERIALIZED VIEW mv_salary_stats AS
+            SELECT
+                e.employer_id,
+                e.company,
+                COALESCE(v.currency, '') AS currency,
+                COUNT(*) AS vacancies_count,
+                COUNT(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_count,
+                MIN(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_min,
+                MAX(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_max,
+                AVG(v.salary_mid) FILTER (WHERE v.salary_mid > 0) AS salary_avg,
+                COUNT(v.salary_mid_rub) FILTER (WHERE v.salary_mid_rub > 0) AS salary_rub_count,
+                SUM(v.salary_mid_rub) FILTER (WHERE v.salary_mid_rub > 0) AS salary_rub_sum
+            FROM vacancies v
+            JOIN employers e ON v.employer_id = e.employer_id
+            GROUP BY e.employer_id, e.company, COALESCE(v.currency, '')
+            """,
+            "CREATE UNIQUE INDEX mv_salary_stats_key ON mv_salary_stats (employer_id, currency)",
+        ],
+    ),
+    Migration(
+        13,
+        "salary_mid и search_vector заполняются при записи, а не вычисляются базой",
+        [
+            # В базах, где шаги 3 и 5 создали вычисляемые колонки: значения остаются, таблица не переписывается
+            "ALTER TABLE vacancies ALTER COLUMN salary_mid DROP EXPRESSION IF EXISTS",
+            "ALTER TABLE vacancies ALTER COLUMN search_vector DROP EXPRESSION IF EXISTS",
+        ],
+    ),
+    # Не указанная граница хранится как 0, и шаг 3 считал вилку «от 40000» как (40000 + 0) / 2 = 20000
+    Migration(
+        14,
+        "Середина вилки по указанным границам: одна граница без второй берётся как есть",
+        [
+            _backfill(
+                "salary_mid",
+                """
+                CASE
+                    WHEN NULLIF(salary_from, 0) IS NULL THEN NULLIF(salary_to, 0)
+                    WHEN NULLIF(salary_to, 0) IS NULL THEN salary_from
+                    ELSE (salary_from + salary_to) / 2
+                END
+                """,
+            ),
+            _backfill(
+                "salary_mid_rub",
+                """
+                round(
+                    salary_mid
+                    / NULLIF((SELECT r.rate FROM exchange_rates r WHERE r.currency = vacancies.currency), 0),
+                    2
+                )
+                """,
+            ),
+            "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_salary_stats",
+        ],
+        concurrent=True,
+    ),
+)
@@ -0,0 +1,96 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+def estimate_size(value: Any, depth: int = 3) -> int:
+    """
+    Приблизительный размер объекта в памяти, включая вложенные коллекции.
+
+    :param value: Объект (обычно список строк результата запроса)
+    :param depth: Глубина обхода вложенных коллекций
+    :return: Размер в байтах
+    """
+    size = sys.getsizeof(value)
+    if depth <= 0:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, depth - 1) + estimate_size(v, depth - 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item, depth - 1) for item in value)
+    return size
+
+
+class QueryCache:
+    """
+    Потокобезопасный LRU-кэш результатов запросов с ограничением по времени жизни и памяти.
+
+    Записи вытесняются, когда их больше max_entries или их суммарный
+    приблизительный размер превышает max_bytes. Запись старше ttl секунд считается устаревшей.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        """
+        :param max_entries: Максимальное число записей
+        :param max_bytes: Максимальный суммарный размер записей в байтах
+        :param ttl: Время жизни записи в секундах
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.__entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Ищет результат в кэше.
+
+        :return: (True, значение) при попадании, иначе (False, None)
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__stats["misses"] += 1
+                return False, None
+            value, stored_at, size = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.__entries[key]
+                self.__bytes -= size
+                self.__stats["expirations"] += 1
+                self.__stats["misses"] += 1
+                return False, None
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+            return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Сохраняет результат; слишком большие результаты не кэшируются"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__bytes -= old[2]
+            self.__entries[key] = (value, time.monotonic(), size)
+            self.__bytes += size
+            while len(self.__entries) > self.max_entries or self.__bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.__entries.popitem(last=False)
+                self.__bytes -= evicted_size
+                self.__stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Удаляет все записи"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счётчики кэша: попадания, промахи, вытеснения, устаревшие записи, размер"""
+        with self.__lock:
+            return {**self.__stats, "entries": len(self.__entries), "bytes": self.__bytes}
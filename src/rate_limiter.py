@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов по алгоритму token bucket.
+
+    Корзина вмещает capacity токенов и пополняется со скоростью rate токенов в секунду.
+    Каждый запрос забирает один токен; при пустой корзине вызывающий поток ждёт.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: Скорость пополнения, токенов в секунду
+        :param capacity: Максимальное число токенов (допустимый всплеск запросов)
+        """
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate и capacity должны быть положительными")
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Забирает токены из корзины, при необходимости ожидая их появления.
+
+        :param tokens: Сколько токенов требуется
+        :return: Время ожидания в секундах
+        """
+        waited = 0.0
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated_at) * self.rate)
+                self.__updated_at = now
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return waited
+                delay = (tokens - self.__tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
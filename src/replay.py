@@ -0,0 +1,192 @@
+"""
+Воспроизведение ответов API hh.ru, записанных CaptureWriter, в базу данных.
+
+    python -m src.replay .hh_capture --workers 4
+
+Сегменты читаются потоково, поэтому память ограничена размером пакета и числом
+одновременно разбираемых фрагментов, а не объёмом записанных данных.
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.capture import iter_lines, record_url
+from src.db_manager import DBManager
+from src.employer import Employer
+from src.exchange_rates import parse_currency_rates
+from src.vacancy_batch import VacancyBatch
+
+# Работодатели, вакансии которых разбирает процесс пула (задаются инициализатором)
+_known_employers: FrozenSet[int] = frozenset()
+
+
+def _init_worker(employer_ids: FrozenSet[int]) -> None:
+    """Инициализатор процесса пула"""
+    global _known_employers
+    _known_employers = employer_ids
+
+
+def _parse_chunk(lines: List[bytes]) -> Tuple[VacancyBatch, int, int]:
+    """
+    Разбирает фрагмент записей /vacancies в колоночный пакет.
+
+    Выполняется в процессе пула. Страницы работодателей, которых нет среди
+    записанных ответов /employers, пропускаются: вакансии без работодателя
+    нарушили бы внешний ключ.
+
+    :param lines: Строки сегментов с ответами /vacancies
+    :return: Пакет вакансий, число разобранных и пропущенных страниц
+    """
+    batch = VacancyBatch()
+    pages = skipped = 0
+    for line in lines:
+        record = json.loads(line)
+        employer_id = int(record["params"]["employer_id"])
+        if employer_id not in _known_employers:
+            skipped += 1
+            continue
+        batch.extend_from_api(record["body"].get("items", []), employer_id)
+        pages += 1
+    return batch, pages, skipped
+
+
+def _chunks(lines: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    """Группирует записи /vacancies во фрагменты по size строк"""
+    chunk: List[bytes] = []
+    for line in lines:
+        if record_url(line).endswith("/vacancies"):
+            chunk.append(line)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_capture(
+    db: DBManager,
+    sources: Union[str, Iterable[str]],
+    workers: Optional[int] = None,
+    batch_size: int = 5000,
+    chunk_pages: int = 50,
+    max_in_flight: Optional[int] = None,
+    incremental: bool = False,
+    refresh_views: bool = True,
+) -> Dict[str, Any]:
+    """
+    Загружает записанные ответы API в базу данных.
+
+    Первый проход разбирает только ответы /employers и /dictionaries и записывает
+    работодателей и курсы валют. Второй проход передаёт сырые строки /vacancies
+    фрагментами в пул процессов; в работе не больше max_in_flight фрагментов,
+    результаты забираются по порядку и пишутся пакетами по batch_size вакансий.
+
+    :param db: Менеджер базы данных
+    :param sources: Каталог с сегментами, файл сегмента или их список
+    :param workers: Число процессов разбора (по умолчанию — число ядер)
+    :param batch_size: Число вакансий, после которого пакет записывается в БД
+    :param chunk_pages: Число страниц /vacancies в одном фрагменте для процесса пула
+    :param max_in_flight: Предел фрагментов в работе (по умолчанию — удвоенное число процессов)
+    :param incremental: Писать через sync_vacancies (неизменившиеся вакансии не перезаписываются)
+    :param refresh_views: Обновить материализованные представления аналитики после загрузки
+    :return: Итоги: число работодателей, вакансий, страниц, время и скорость
+    """
+    sources = [sources] if isinstance(sources, str) else list(sources)
+    started_at = time.perf_counter()
+
+    employers: Dict[int, Dict[str, Any]] = {}
+    rates: Optional[Dict[str, float]] = None
+    for line in iter_lines(sources):
+        url = record_url(line)
+        if "/employers/" in url:
+            employer = Employer.cast_to_object(json.loads(line)["body"]).to_dict()
+            employers[int(employer["employer_id"])] = employer
+        elif url.endswith("/dictionaries"):
+            rates = parse_currency_rates(json.loads(line)["body"])
+    if rates:
+        db.load_exchange_rates(rates)
+    if employers:
+        db.insert_employers_bulk(employers.values())
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(1, max_in_flight or workers * 2)
+    totals = dict.fromkeys(("vacancies", "pages", "skipped_pages", "inserted", "updated", "unchanged"), 0)
+    pending = VacancyBatch()
+
+    def flush() -> None:
+        nonlocal pending
+        if not len(pending):
+            return
+        result = db.sync_vacancies(pending, []) if incremental else db.insert_vacancies_bulk(pending)
+        totals["vacancies"] += len(pending)
+        for key in ("inserted", "updated", "unchanged"):
+            totals[key] += result.get(key, 0)
+        pending = VacancyBatch()
+
+    def collect(future: "Future[Tuple[VacancyBatch, int, int]]") -> None:
+        batch, pages, skipped = future.result()
+        totals["pages"] += pages
+        totals["skipped_pages"] += skipped
+        pending.extend(batch)
+        if len(pending) >= batch_size:
+            flush()
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(frozenset(employers),)) as pool:
+        in_flight: Deque["Future[Tuple[VacancyBatch, int, int]]"] = deque()
+        for chunk in _chunks(iter_lines(sources), max(1, chunk_pages)):
+            in_flight.append(pool.submit(_parse_chunk, chunk))
+            if len(in_flight) >= max_in_flight:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+    flush()
+
+    if refresh_views:
+        db.try_refresh_analytics_views()
+
+    elapsed = time.perf_counter() - started_at
+    summary: Dict[str, Any] = {
+        "employers": len(employers),
+        **totals,
+        "elapsed": elapsed,
+        "vacancies_per_sec": totals["vacancies"] / elapsed if elapsed else 0.0,
+    }
+    print(
+        f"\nВоспроизведено работодателей: {summary['employers']}, вакансий: {summary['vacancies']} "
+        f"(добавлено {summary['inserted']}, обновлено {summary['updated']}, без изменений {summary['unchanged']}), "
+        f"страниц: {summary['pages']}, пропущено страниц без работодателя: {summary['skipped_pages']}. "
+        f"Время: {elapsed:.2f} с, {summary['vacancies_per_sec']:.1f} вакансий/с"
+    )
+    return summary
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from src.main import get_db_config
+
+    parser = argparse.ArgumentParser(description="Загрузка записанных ответов API hh.ru в базу данных")
+    parser.add_argument("sources", nargs="+", help="каталог с сегментами или файлы сегментов")
+    parser.add_argument("--workers", type=int, default=None, help="процессов разбора")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--incremental", action="store_true", help="не перезаписывать неизменившиеся вакансии")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = DBManager(**get_db_config())
+    try:
+        db.create_tables()
+        replay_capture(
+            db, args.sources, workers=args.workers, batch_size=args.batch_size, incremental=args.incremental
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,29 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
+
+
+def validate_salary(value: Any) -> int:
+    """
+    Валидирует значение зарплаты.
+
+    Если значение не является целым числом,
+    возвращается 0 (зарплата не указана).
+
+    :param value: Значение зарплаты
+    :return: корректное значение зарплаты
+    """
+    return value if isinstance(value, int) else 0
+
+
+def validate_currency(currency: Optional[str], salary_from: int, salary_to: int) -> Optional[str]:
+    """
+    Валюта вакансии: при отсутствии данных о зарплате валюта не устанавливается.
+
+    :param currency: Валюта из данных API
+    :param salary_from: Провалидированная нижняя граница зарплаты
+    :param salary_to: Провалидированная верхняя граница зарплаты
+    :return: Валюта или пустая строка
+    """
+    return currency if salary_from or salary_to else ""
 
 
 class Vacancy:
@@ -41,21 +66,18 @@ class Vacancy:
         self.url = url
         self.salary_from = self.__validate_salary(salary_from)
         self.salary_to = self.__validate_salary(salary_to)
-        self.currency = currency if self.salary_from or self.salary_to else ""
+        self.currency = validate_currency(currency, self.salary_from, self.salary_to)
         self.description = description
 
     @staticmethod
     def __validate_salary(value: Optional[int]) -> int:
         """
-        Валидирует значение зарплаты.
-
-        Если значение не является целым числом,
-        возвращается 0 (зарплата не указана).
+        Валидирует значение зарплаты (см. validate_salary).
 
         :param value: Значение зарплаты
         :return: корректное значение зарплаты
         """
-        return value if isinstance(value, int) else 0
+        return validate_salary(value)
 
     def __lt__(self, other: "Vacancy") -> bool:
         """
@@ -0,0 +1,127 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.vacancy import Vacancy, validate_currency, validate_salary
+
+
+class VacancyBatch:
+    """
+    Пакет вакансий в колоночном виде.
+
+    Данные хранятся параллельными массивами: числовые колонки — в array,
+    строковые — в списках. Пакет заполняется прямо из элементов ответа API
+    с теми же правилами валидации зарплаты и валюты, что и у Vacancy, и отдаёт
+    строки для COPY без промежуточных объектов и словарей. Объекты Vacancy
+    создаются только при обращении к элементам пакета.
+    """
+
+    __slots__ = (
+        "vacancy_ids",
+        "employer_ids",
+        "titles",
+        "salaries_from",
+        "salaries_to",
+        "currencies",
+        "urls",
+        "descriptions",
+    )
+
+    def __init__(self) -> None:
+        """Создаёт пустой пакет"""
+        self.vacancy_ids = array("q")
+        # 0 — работодатель не указан (берётся из аргумента employer_id при записи)
+        self.employer_ids = array("q")
+        self.titles: List[str] = []
+        self.salaries_from = array("q")
+        self.salaries_to = array("q")
+        self.currencies: List[Optional[str]] = []
+        self.urls: List[str] = []
+        self.descriptions: List[Optional[str]] = []
+
+    @classmethod
+    def from_api(cls, items: Iterable[Dict[str, Any]], employer_id: Optional[int] = None) -> "VacancyBatch":
+        """
+        Создаёт пакет из элементов items ответа /vacancies API hh.ru.
+
+        :param items: Вакансии в формате API
+        :param employer_id: id работодателя вакансий
+        :return: Пакет вакансий
+        """
+        batch = cls()
+        batch.extend_from_api(items, employer_id)
+        return batch
+
+    def extend_from_api(self, items: Iterable[Dict[str, Any]], employer_id: Optional[int] = None) -> None:
+        """
+        Добавляет в пакет вакансии в формате API (как Vacancy.cast_to_object_list).
+
+        :param items: Вакансии в формате API
+        :param employer_id: id работодателя вакансий
+        """
+        employer = int(employer_id or 0)
+        for item in items:
+            salary = item.get("salary") or {}
+            salary_from = validate_salary(salary.get("from"))
+            salary_to = validate_salary(salary.get("to"))
+            self.vacancy_ids.append(int(item["id"]))
+            self.employer_ids.append(employer)
+            self.titles.append(item["name"])
+            self.salaries_from.append(salary_from)
+            self.salaries_to.append(salary_to)
+            self.currencies.append(validate_currency(salary.get("currency"), salary_from, salary_to))
+            self.urls.append(item["alternate_url"])
+            self.descriptions.append(item.get("snippet", {}).get("requirement", ""))
+
+    def extend(self, other: "VacancyBatch") -> None:
+        """Добавляет в пакет все вакансии другого пакета"""
+        for column in self.__slots__:
+            getattr(self, column).extend(getattr(other, column))
+
+    @classmethod
+    def concat(cls, batches: Iterable["VacancyBatch"]) -> "VacancyBatch":
+        """Объединяет несколько пакетов в один"""
+        result = cls()
+        for batch in batches:
+            result.extend(batch)
+        return result
+
+    def rows(self, employer_id: Optional[int] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Строки для COPY в порядке VACANCY_COLUMNS DBManager.
+
+        :param employer_id: id работодателя для вакансий, у которых он не указан
+        """
+        for vacancy_id, employer, title, salary_from, salary_to, currency, url, description in zip(
+            self.vacancy_ids,
+            self.employer_ids,
+            self.titles,
+            self.salaries_from,
+            self.salaries_to,
+            self.currencies,
+            self.urls,
+            self.descriptions,
+        ):
+            if not employer:
+                if employer_id is None:
+                    raise ValueError(f"Не указан работодатель вакансии {vacancy_id}")
+                employer = employer_id
+            yield vacancy_id, employer, title, salary_from, salary_to, currency, url, description
+
+    def __len__(self) -> int:
+        return len(self.vacancy_ids)
+
+    def __getitem__(self, index: int) -> Vacancy:
+        """Создаёт объект Vacancy для вакансии с номером index"""
+        return Vacancy(
+            vacancy_id=self.vacancy_ids[index],
+            title=self.titles[index],
+            url=self.urls[index],
+            salary_from=self.salaries_from[index],
+            salary_to=self.salaries_to[index],
+            currency=self.currencies[index],
+            description=self.descriptions[index] or "",
+        )
+
+    def __iter__(self) -> Iterator[Vacancy]:
+        """Лениво создаёт объекты Vacancy по одному"""
+        return (self[index] for index in range(len(self)))
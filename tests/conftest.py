@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from benchmarks.postgres import DisposablePostgres
+from src.db_manager import DBManager
+
+# Ответ заглушки: код, заголовки и тело (None — без тела)
+Reply = Tuple[int, Dict[str, str], Optional[Any]]
+# Обработчик пути: параметры запроса -> ответ
+Route = Callable[[Dict[str, str]], Reply]
+
+
+class ScriptedServer:
+    """
+    Локальный HTTP-сервер, отдающий заранее заданные ответы.
+
+    Ответы для пути выдаются по очереди, последний повторяется; для ответа,
+    зависящего от параметров запроса, пути назначается обработчик (route).
+    Каждый запрос запоминается вместе с параметрами, заголовками и временем получения.
+    """
+
+    def __init__(self) -> None:
+        self.replies: Dict[str, List[Reply]] = {}
+        self.routes: Dict[str, Route] = {}
+        self.requests: List[Dict[str, Any]] = []
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler_class())
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.__server.server_port}"
+
+    def reply(self, path: str, *replies: Reply) -> None:
+        """Задаёт ответы на запросы к path"""
+        with self.__lock:
+            self.replies[path] = list(replies)
+
+    def route(self, path: str, handler: Route) -> None:
+        """Отвечает на запросы к path обработчиком; он вызывается вне блокировки сервера"""
+        with self.__lock:
+            self.routes[path] = handler
+
+    def times(self, path: str) -> List[float]:
+        """Моменты получения запросов к path"""
+        with self.__lock:
+            return [request["time"] for request in self.requests if request["path"] == path]
+
+    def start(self) -> None:
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def _next_reply(self, path: str, params: Dict[str, str], headers: Dict[str, str]) -> Reply:
+        with self.__lock:
+            self.requests.append({"path": path, "params": params, "headers": headers, "time": time.monotonic()})
+            handler = self.routes.get(path)
+            replies = self.replies.get(path)
+        if handler is not None:
+            return handler(params)
+        with self.__lock:
+            if not replies:
+                return 404, {}, {"errors": [{"type": "not_found"}]}
+            return replies.pop(0) if len(replies) > 1 else replies[0]
+
+    def __handler_class(self) -> Any:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                status, headers, body = server._next_reply(
+                    parts.path, dict(parse_qsl(parts.query)), dict(self.headers)
+                )
+                payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if body is not None:
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                """Не засоряет вывод тестов журналом запросов"""
+
+        return Handler
+
+
+@pytest.fixture
+def server() -> Iterator[ScriptedServer]:
+    server = ScriptedServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def postgres() -> Iterator[Dict[str, Any]]:
+    """
+    Параметры подключения к PostgreSQL для тестов с базой данных.
+
+    База берётся из BENCH_DSN (её таблицы удаляются) или поднимается временный кластер
+    (initdb и pg_ctl в PATH или PG_BIN). Без PostgreSQL такие тесты пропускаются.
+    """
+    cluster = DisposablePostgres(dbname="hh_test")
+    try:
+        cluster.start()
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+    yield cluster.config
+    cluster.stop()
+
+
+@pytest.fixture
+def db(postgres: Dict[str, Any]) -> Iterator[DBManager]:
+    """DBManager на пустой базе с применёнными миграциями"""
+    manager = DBManager(**postgres)
+    manager.reset_database()
+    yield manager
+    manager.close()
@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import pytest
+
+from benchmarks.stub_server import StubHHServer
+from benchmarks.synthetic import CURRENCY_RATES, SyntheticHH
+from src.capture import CaptureWriter, iter_lines, record_url, segment_paths
+from src.hh_api import HeadHunterAPI
+from src.rate_limiter import TokenBucket
+from src.replay import replay_capture
+from src.vacancy_batch import VacancyBatch
+
+
+class RecordingDB:
+    """Вместо DBManager: запоминает всё, что replay_capture записывает в базу"""
+
+    def __init__(self) -> None:
+        self.rates: Optional[Dict[str, float]] = None
+        self.employers: List[Dict[str, Any]] = []
+        self.rows: List[tuple] = []
+        self.writes: List[str] = []
+        self.refreshed = False
+
+    def load_exchange_rates(self, rates: Dict[str, float]) -> None:
+        self.rates = rates
+
+    def insert_employers_bulk(self, employers: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        self.employers.extend(employers)
+        return {"inserted": len(self.employers), "updated": 0}
+
+    def insert_vacancies_bulk(self, batch: VacancyBatch) -> Dict[str, int]:
+        self.writes.append("insert")
+        self.rows.extend(batch.rows())
+        return {"inserted": len(batch), "updated": 0}
+
+    def sync_vacancies(self, batch: VacancyBatch, employer_ids: List[int]) -> Dict[str, int]:
+        self.writes.append("sync")
+        self.rows.extend(batch.rows())
+        return {"inserted": 0, "updated": 0, "unchanged": len(batch)}
+
+    def try_refresh_analytics_views(self) -> bool:
+        self.refreshed = True
+        return True
+
+
+@pytest.fixture
+def data() -> SyntheticHH:
+    # Три работодателя: 200, 200 и 50 вакансий
+    return SyntheticHH(vacancies=450, per_employer=200)
+
+
+@pytest.fixture
+def capture_dir(data: SyntheticHH, tmp_path: Any) -> Iterator[str]:
+    """Каталог с ответами, записанными во время загрузки со StubHHServer"""
+    directory = str(tmp_path / "capture")
+    employer_ids = list(data.employer_ids().values())
+    with StubHHServer(data) as server, CaptureWriter(directory, max_segment_bytes=32 * 1024) as capture:
+        with HeadHunterAPI(
+            base_url=server.base_url, rate_limiter=TokenBucket(rate=1000, capacity=1000), capture=capture
+        ) as hh_api:
+            hh_api.get_currency_rates()
+            # У последнего работодателя записываются только вакансии
+            for employer_id in employer_ids[:-1]:
+                hh_api.get_employer_info(employer_id)
+            for employer_id in employer_ids:
+                hh_api.get_vacancies(employer_id)
+    yield directory
+
+
+def expected_rows(data: SyntheticHH, employer_ids: List[int]) -> List[tuple]:
+    rows: List[tuple] = []
+    for employer_id in employer_ids:
+        for page in range(-(-data.vacancy_count(employer_id) // 100)):
+            items = data.vacancies_page(employer_id, page)["items"]
+            rows.extend(VacancyBatch.from_api(items, employer_id).rows())
+    return rows
+
+
+def test_capture_writes_segments(capture_dir: str) -> None:
+    paths = segment_paths(capture_dir)
+    assert len(paths) > 1
+    lines = list(iter_lines(capture_dir))
+    # Справочник, 2 работодателя и 2 + 2 + 1 страниц вакансий
+    assert len(lines) == 8
+    for line in lines:
+        record = json.loads(line)
+        assert record_url(line) == record["url"]
+        assert set(record) == {"url", "params", "ts", "body"}
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_replay_round_trip(data: SyntheticHH, capture_dir: str, incremental: bool) -> None:
+    db = RecordingDB()
+    employer_ids = list(data.employer_ids().values())
+
+    summary = replay_capture(
+        db,  # type: ignore[arg-type]
+        capture_dir,
+        workers=2,
+        batch_size=150,
+        chunk_pages=1,
+        max_in_flight=2,
+        incremental=incremental,
+    )
+
+    assert db.rates == CURRENCY_RATES
+    assert [int(employer["employer_id"]) for employer in db.employers] == employer_ids[:-1]
+    assert db.rows == expected_rows(data, employer_ids[:-1])
+    assert set(db.writes) == {"sync" if incremental else "insert"}
+    assert len(db.writes) > 1
+    assert db.refreshed
+    assert summary["employers"] == 2
+    assert summary["vacancies"] == 400
+    assert summary["pages"] == 4
+    assert summary["skipped_pages"] == 1
+
+
+def test_truncated_segment_is_read_up_to_break(tmp_path: Any) -> None:
+    directory = str(tmp_path)
+    with CaptureWriter(directory) as capture:
+        for page in range(50):
+            capture.write("https://api.hh.ru/vacancies", {"page": page}, {"items": [{"id": str(page)}] * 20})
+    (path,) = segment_paths(directory)
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(data[: len(data) // 2])
+
+    lines = list(iter_lines(directory))
+
+    assert 0 < len(lines) < 50
+    assert [json.loads(line)["params"]["page"] for line in lines] == list(range(len(lines)))
+
+
+def test_record_url_falls_back_to_json() -> None:
+    line = json.dumps({"params": {}, "url": "https://api.hh.ru/dictionaries"}).encode("utf-8")
+    assert record_url(line) == "https://api.hh.ru/dictionaries"
+
+
+def test_segment_paths_accepts_files_and_directories(tmp_path: Any) -> None:
+    for name in ("capture-2.ndjson.gz", "capture-1.ndjson.gz", "notes.txt"):
+        with gzip.open(tmp_path / name, "wb"):
+            pass
+    explicit = os.path.join(str(tmp_path), "notes.txt")
+
+    assert [os.path.basename(path) for path in segment_paths([str(tmp_path), explicit])] == [
+        "capture-1.ndjson.gz",
+        "capture-2.ndjson.gz",
+        "notes.txt",
+    ]
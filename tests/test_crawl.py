@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Sequence
+
+import pytest
+
+from src.crawl import read_employer_ids, run_crawl
+from src.db_manager import DBManager
+from src.main import main
+from tests.conftest import Reply, ScriptedServer
+
+# Шарды обхода запускаются через fork, пока в процессе тестов работает поток ScriptedServer
+pytestmark = pytest.mark.filterwarnings("ignore:This process .* is multi-threaded:DeprecationWarning")
+
+
+def serve_employers(server: ScriptedServer, employer_ids: List[int], missing: Sequence[int] = ()) -> None:
+    """Работодатели employer_ids с одной вакансией у каждого; работодатели missing отвечают 404"""
+    for employer_id in employer_ids:
+        employer = {"id": str(employer_id), "name": f"Компания {employer_id}", "description": "", "alternate_url": ""}
+        reply: Reply = (404, {}, None) if employer_id in missing else (200, {}, employer)
+        server.reply(f"/employers/{employer_id}", reply)
+
+    def vacancies(params: Dict[str, str]) -> Reply:
+        vacancy_id = int(params["employer_id"]) * 10
+        item = {"id": str(vacancy_id), "name": "Python-разработчик", "alternate_url": "", "salary": None}
+        return 200, {}, {"items": [item], "found": 1, "pages": 1, "page": 0}
+
+    server.route("/vacancies", vacancies)
+
+
+def crawled(server: ScriptedServer) -> List[int]:
+    """Работодатели, запрошенные у API"""
+    return sorted(
+        int(request["path"].rsplit("/", 1)[1]) for request in server.requests if "/employers/" in request["path"]
+    )
+
+
+def crawl(db: DBManager, postgres: Dict[str, Any], server: ScriptedServer, **options: Any) -> Dict[str, Any]:
+    return run_crawl(db, postgres, [1, 2, 3], shards=2, rate=1000, batch_size=1, base_url=server.base_url, **options)
+
+
+def test_reads_ids_skipping_comments_and_duplicates(tmp_path: Any) -> None:
+    path = tmp_path / "employers.txt"
+    path.write_text(
+        "# Работодатели для ночного обхода\n"
+        "1740\n"
+        "\n"
+        "  3529  \n"
+        "78638,Тинькофф\n"
+        "15478 VK\n"
+        "1740\n"
+        "   # отключён: 999\n",
+        encoding="utf-8",
+    )
+
+    assert read_employer_ids(str(path)) == [1740, 3529, 78638, 15478]
+
+
+def test_empty_file(tmp_path: Any) -> None:
+    path = tmp_path / "employers.txt"
+    path.write_text("# пусто\n\n", encoding="utf-8")
+
+    assert read_employer_ids(str(path)) == []
+
+
+def test_invalid_line_reports_its_number(tmp_path: Any) -> None:
+    path = tmp_path / "employers.txt"
+    path.write_text("1740\nЯндекс\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Строка 2"):
+        read_employer_ids(str(path))
+
+
+def test_interrupted_crawl_resumes_from_checkpoints(
+    db: DBManager, postgres: Dict[str, Any], server: ScriptedServer
+) -> None:
+    serve_employers(server, [1, 2, 3], missing=[3])
+    summary = crawl(db, postgres, server, crawl_id="nightly")
+
+    assert (summary["employers"], summary["errors"], summary["remaining"]) == (2, 1, 1)
+    assert db.get_crawl_checkpoints("nightly") == {1, 2}
+
+    server.requests.clear()
+    serve_employers(server, [1, 2, 3])
+    summary = crawl(db, postgres, server, crawl_id="nightly", resume=True)
+
+    # Повторно запрашивается только работодатель без контрольной точки
+    assert crawled(server) == [3]
+    assert (summary["employers_skipped"], summary["employers"], summary["remaining"]) == (2, 1, 0)
+    assert db.get_crawl_checkpoints("nightly") == {1, 2, 3}
+    rows = db._fetch_tuples("SELECT vacancy_id FROM vacancies ORDER BY vacancy_id")
+    assert [row.vacancy_id for row in rows] == [10, 20, 30]
+
+
+def test_started_crawl_is_not_resumed_implicitly(
+    db: DBManager, postgres: Dict[str, Any], server: ScriptedServer
+) -> None:
+    serve_employers(server, [1, 2, 3])
+    crawl(db, postgres, server, crawl_id="nightly")
+
+    with pytest.raises(ValueError, match="уже начат"):
+        crawl(db, postgres, server, crawl_id="nightly")
+
+    # restart удаляет контрольные точки и обходит всех заново
+    server.requests.clear()
+    summary = crawl(db, postgres, server, crawl_id="nightly", restart=True)
+    assert crawled(server) == [1, 2, 3]
+    assert summary["employers"] == 3
+
+
+def test_each_run_starts_a_new_crawl(db: DBManager, postgres: Dict[str, Any], server: ScriptedServer) -> None:
+    serve_employers(server, [1, 2, 3])
+    first = crawl(db, postgres, server)
+    second = crawl(db, postgres, server)
+
+    assert first["crawl_id"] != second["crawl_id"]
+    assert (first["employers"], second["employers"]) == (3, 3)
+    assert db.get_crawl_checkpoints(second["crawl_id"]) == {1, 2, 3}
+
+
+def test_resume_requires_crawl_id(capsys: Any) -> None:
+    with pytest.raises(SystemExit) as error:
+        main(["crawl", "--resume"])
+
+    assert error.value.code == 2
+    assert "--crawl-id" in capsys.readouterr().err
@@ -0,0 +1,555 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+import psycopg2
+import pytest
+
+from src.db_manager import DBManager
+from src.query_cache import QueryCache
+from src.vacancy_batch import VacancyBatch
+
+EMPLOYERS = [
+    {"employer_id": 1, "company": "Альфа", "description": "Банк", "url": "https://hh.ru/employer/1"},
+    {"employer_id": 2, "company": "Бета", "description": "Ритейл", "url": "https://hh.ru/employer/2"},
+]
+
+
+def vacancy(vacancy_id: int, employer_id: int = 1, **fields: Any) -> Dict[str, Any]:
+    """Вакансия в формате Vacancy.to_dict с ключом employer_id"""
+    data = {
+        "vacancy_id": vacancy_id,
+        "employer_id": employer_id,
+        "title": f"Вакансия {vacancy_id}",
+        "url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "salary_from": 100000,
+        "salary_to": 200000,
+        "currency": "RUR",
+        "description": "Python",
+    }
+    data.update(fields)
+    return data
+
+
+def fetch(db: DBManager, query: str, *params: Any) -> List[Any]:
+    return db._fetch_tuples(query, params)
+
+
+def test_employers_bulk_counts_inserts_and_updates(db: DBManager) -> None:
+    assert db.insert_employers_bulk(EMPLOYERS) == {"inserted": 2, "updated": 0}
+
+    renamed = {**EMPLOYERS[0], "company": "Альфа-Банк"}
+    assert db.insert_employers_bulk([renamed, {**EMPLOYERS[1], "employer_id": 3}]) == {"inserted": 1, "updated": 1}
+
+    rows = fetch(db, "SELECT employer_id, company FROM employers ORDER BY employer_id")
+    assert [(row.employer_id, row.company) for row in rows] == [(1, "Альфа-Банк"), (2, "Бета"), (3, "Бета")]
+
+
+def test_employers_bulk_keeps_last_duplicate(db: DBManager) -> None:
+    batch = [EMPLOYERS[0], {**EMPLOYERS[0], "company": "Первая"}, {**EMPLOYERS[0], "company": "Последняя"}]
+
+    assert db.insert_employers_bulk(batch) == {"inserted": 1, "updated": 0}
+    assert fetch(db, "SELECT company FROM employers")[0].company == "Последняя"
+
+
+def test_vacancies_bulk_counts_inserts_and_updates(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+
+    assert db.insert_vacancies_bulk([vacancy(1), vacancy(2)]) == {"inserted": 2, "updated": 0}
+    # Полная перезапись обновляет и неизменившиеся строки
+    assert db.insert_vacancies_bulk([vacancy(2), vacancy(3, 2)]) == {"inserted": 1, "updated": 1}
+
+    rows = fetch(db, "SELECT vacancy_id, employer_id FROM vacancies ORDER BY vacancy_id")
+    assert [(row.vacancy_id, row.employer_id) for row in rows] == [(1, 1), (2, 1), (3, 2)]
+
+
+def test_vacancies_bulk_keeps_last_duplicate(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    batch = [vacancy(1, title="Первая"), vacancy(2), vacancy(1, title="Последняя")]
+
+    assert db.insert_vacancies_bulk(batch) == {"inserted": 2, "updated": 0}
+    assert fetch(db, "SELECT title FROM vacancies WHERE vacancy_id = 1")[0].title == "Последняя"
+
+
+def test_copy_round_trips_special_characters_and_nulls(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    description = "Табуляция\\tи \\\\N\tперевод\nстроки\r\\конец"
+
+    db.insert_vacancies_bulk([vacancy(1, description=description, salary_from=None, currency=None)])
+
+    row = fetch(db, "SELECT description, salary_from, salary_to, currency FROM vacancies")[0]
+    assert row.description == description
+    assert row.salary_from is None
+    assert row.salary_to == 200000
+    assert row.currency is None
+
+
+def test_vacancies_bulk_accepts_batch_and_employer_argument(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    items = [
+        {
+            "id": "10",
+            "name": "Аналитик",
+            "alternate_url": "https://hh.ru/vacancy/10",
+            "salary": {"from": 50000, "to": 70000, "currency": "RUR"},
+            "snippet": {"requirement": "SQL"},
+        }
+    ]
+    without_employer = {key: value for key, value in vacancy(11).items() if key != "employer_id"}
+
+    assert db.insert_vacancies_bulk(VacancyBatch.from_api(items, 2)) == {"inserted": 1, "updated": 0}
+    assert db.insert_vacancies_bulk([without_employer], employer_id=1) == {"inserted": 1, "updated": 0}
+
+    rows = fetch(db, "SELECT vacancy_id, employer_id, salary_mid_rub FROM vacancies ORDER BY vacancy_id")
+    assert [(row.vacancy_id, row.employer_id, float(row.salary_mid_rub)) for row in rows] == [
+        (10, 2, 60000.0),
+        (11, 1, 150000.0),
+    ]
+
+
+def test_vacancies_bulk_without_employer_fails_atomically(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    without_employer = {key: value for key, value in vacancy(2).items() if key != "employer_id"}
+
+    with pytest.raises(ValueError, match="Не указан работодатель"):
+        db.insert_vacancies_bulk([vacancy(1), without_employer])
+    assert fetch(db, "SELECT COUNT(*) AS count FROM vacancies")[0].count == 0
+
+
+def test_bulk_write_invalidates_query_cache(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    before = db.write_generation
+
+    db.insert_vacancies_bulk([vacancy(1)])
+
+    assert db.write_generation == before + 1
+
+
+def vacancy_ids(db: DBManager, table: str = "vacancies") -> List[int]:
+    return [row.vacancy_id for row in fetch(db, f"SELECT vacancy_id FROM {table} ORDER BY vacancy_id")]
+
+
+def test_sync_counts_inserted_updated_and_unchanged(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    batch = [vacancy(1), vacancy(2), vacancy(3)]
+
+    assert db.sync_vacancies(batch, [1]) == {"inserted": 3, "updated": 0, "unchanged": 0, "removed": 0}
+    assert db.sync_vacancies(batch, [1]) == {"inserted": 0, "updated": 0, "unchanged": 3, "removed": 0}
+
+    changed = [vacancy(1), vacancy(2, salary_to=250000), vacancy(3), vacancy(4)]
+    assert db.sync_vacancies(changed, [1]) == {"inserted": 1, "updated": 1, "unchanged": 2, "removed": 0}
+    assert fetch(db, "SELECT salary_to FROM vacancies WHERE vacancy_id = 2")[0].salary_to == 250000
+
+
+def test_sync_removes_only_closed_vacancies_of_listed_employers(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.sync_vacancies([vacancy(1), vacancy(2), vacancy(3, 2)], [1, 2])
+
+    result = db.sync_vacancies([vacancy(1)], [1])
+
+    assert result["removed"] == 1
+    # Вакансии работодателя 2 не трогаются: его список в пакет не входил
+    assert vacancy_ids(db) == [1, 3]
+    assert vacancy_ids(db, "vacancies_archive") == []
+    synced = fetch(db, "SELECT employer_id FROM employer_sync_state ORDER BY employer_id")
+    assert [row.employer_id for row in synced] == [1, 2]
+
+
+def test_sync_archives_closed_vacancies(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.sync_vacancies([vacancy(1), vacancy(2, title="Закрытая")], [1])
+
+    assert db.sync_vacancies([vacancy(1)], [1], archive=True)["removed"] == 1
+
+    assert vacancy_ids(db) == [1]
+    archived = fetch(db, "SELECT vacancy_id, employer_id, title FROM vacancies_archive")
+    assert [(row.vacancy_id, row.employer_id, row.title) for row in archived] == [(2, 1, "Закрытая")]
+
+
+def test_sync_without_complete_lists_never_deletes(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.sync_vacancies([vacancy(1), vacancy(2), vacancy(3)], [1])
+
+    result = db.sync_vacancies([vacancy(1, title="Новое название")], [])
+
+    assert result == {"inserted": 0, "updated": 1, "unchanged": 0, "removed": 0}
+    assert vacancy_ids(db) == [1, 2, 3]
+
+
+def test_sync_failure_rolls_back_removal(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.sync_vacancies([vacancy(1), vacancy(2)], [1])
+    without_employer = {key: value for key, value in vacancy(3).items() if key != "employer_id"}
+
+    with pytest.raises(ValueError):
+        db.sync_vacancies([vacancy(1), without_employer], [1])
+
+    assert vacancy_ids(db) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "salary_from, salary_to, salary_mid",
+    [(40000, 0, 40000), (0, 60000, 60000), (40000, 60000, 50000), (0, 0, None), (None, 30000, 30000)],
+)
+def test_salary_mid_uses_specified_bounds(
+    db: DBManager, salary_from: Optional[int], salary_to: Optional[int], salary_mid: Optional[int]
+) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk([vacancy(1, salary_from=salary_from, salary_to=salary_to)])
+    db.insert_vacancy(1, vacancy(2, salary_from=salary_from, salary_to=salary_to))
+
+    rows = fetch(db, "SELECT salary_mid, salary_mid_rub FROM vacancies ORDER BY vacancy_id")
+    assert [(row.salary_mid, row.salary_mid_rub) for row in rows] == [(salary_mid, salary_mid)] * 2
+
+
+def test_one_sided_ranges_in_salary_analytics(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.load_exchange_rates({"RUR": 1, "USD": 0.01})
+    db.insert_vacancies_bulk(
+        [
+            vacancy(1, salary_from=40000, salary_to=0),
+            vacancy(2, salary_from=0, salary_to=120000),
+            vacancy(3, salary_from=0, salary_to=0, currency=""),
+            vacancy(4, salary_from=500, salary_to=0, currency="USD"),
+        ]
+    )
+    db.refresh_analytics_views()
+
+    assert db.get_avg_salary() == db.get_avg_salary(live=True) == 70000.0
+    assert db.get_salary_histogram(buckets=2)[0]["salary_from"] == 40000.0
+    stats = {row["currency"]: row for row in db.get_salary_stats()}
+    assert (stats["RUR"]["salary_min"], stats["RUR"]["salary_max"]) == (40000, 120000)
+    assert [v["vacancy_id"] for v in db.get_vacancies_with_higher_salary()] == [2]
+
+
+def search_all_pages(db: DBManager, text: str, limit: int, **options: Any) -> List[Dict[str, Any]]:
+    """Все страницы search_vacancies, полученные по ключу (rank, vacancy_id) последней вакансии"""
+    found: List[Dict[str, Any]] = []
+    after = None
+    while True:
+        page = db.search_vacancies(text, limit=limit, after=after, **options)
+        found.extend(page)
+        if len(page) < limit:
+            return found
+        after = (page[-1]["rank"], page[-1]["vacancy_id"])
+
+
+def test_search_ranks_title_above_description_and_pages_by_keyset(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk(
+        [vacancy(i, title="Python developer", description="Django") for i in range(1, 6)]
+        + [vacancy(i, title="Analyst", description="Python scripts") for i in range(6, 9)]
+        + [vacancy(9, title="Java developer", description="Spring")]
+    )
+
+    full = db.search_vacancies("python", limit=100)
+    assert [v["vacancy_id"] for v in full] == [5, 4, 3, 2, 1, 8, 7, 6]
+    assert full[0]["rank"] > full[-1]["rank"]
+    assert full[0]["employer_name"] == "Альфа"
+
+    # Страницы по 3 пересекают группы с равным rank без пропусков и повторов
+    assert search_all_pages(db, "python", limit=3) == full
+
+
+def test_search_requires_all_words_and_matches_prefixes(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk(
+        [
+            vacancy(1, title="Python developer", description=""),
+            vacancy(2, title="Python analyst", description=""),
+            vacancy(3, title="Developers team lead", description=""),
+        ]
+    )
+
+    assert {v["vacancy_id"] for v in db.search_vacancies("dev")} == {1, 3}
+    assert [v["vacancy_id"] for v in db.search_vacancies("python dev")] == [1]
+    assert db.search_vacancies("dev", prefix=False) == []
+    assert db.search_vacancies("!!! ???") == []
+
+
+def test_substring_search_escapes_like_wildcards(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk(
+        [
+            vacancy(1, title="Бонус 50% от оклада", description=""),
+            vacancy(2, title="Бонус 500 рублей", description=""),
+            vacancy(3, title="Оклад", description="Бонус 50% по итогам года"),
+        ]
+    )
+
+    found = search_all_pages(db, "50%", limit=1, substring=True)
+
+    # Совпадение в названии ранжируется выше совпадения в описании
+    assert [v["vacancy_id"] for v in found] == [1, 3]
+
+
+def test_analytics_views_change_only_on_refresh(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk([vacancy(1), vacancy(2, salary_from=0, salary_to=0, currency=""), vacancy(3, 2)])
+    assert db.get_analytics_refreshed_at() is None
+
+    db.refresh_analytics_views()
+
+    refreshed_at = db.get_analytics_refreshed_at()
+    assert refreshed_at is not None
+    assert db.get_companies_and_vacancies_count() == db.get_companies_and_vacancies_count(live=True)
+    assert db.get_salary_stats() == db.get_salary_stats(live=True)
+    assert db.get_avg_salary() == db.get_avg_salary(live=True) == 150000.0
+
+    db.insert_vacancies_bulk([vacancy(4, 2, salary_from=300000, salary_to=300000)])
+    # Представления отстают от таблиц до следующего обновления
+    assert db.get_avg_salary() == 150000.0
+    assert {row["company"]: row["vacancies_count"] for row in db.get_companies_and_vacancies_count()} == {
+        "Альфа": 2,
+        "Бета": 1,
+    }
+
+    db.refresh_analytics_views()
+
+    assert db.get_avg_salary() == db.get_avg_salary(live=True) == 200000.0
+    assert db.get_companies_and_vacancies_count() == db.get_companies_and_vacancies_count(live=True)
+    assert db.get_salary_stats() == db.get_salary_stats(live=True)
+    later = db.get_analytics_refreshed_at()
+    assert later is not None and later > refreshed_at
+
+
+def test_failed_refresh_after_load_is_reported(db: DBManager, monkeypatch: pytest.MonkeyPatch, capsys: Any) -> None:
+    assert db.try_refresh_analytics_views() is True
+    assert db.get_analytics_refreshed_at() is not None
+
+    def fail() -> None:
+        raise psycopg2.OperationalError("соединение потеряно")
+
+    monkeypatch.setattr(db, "refresh_analytics_views", fail)
+    assert db.try_refresh_analytics_views() is False
+    assert "Не удалось обновить представления аналитики: соединение потеряно" in capsys.readouterr().out
+
+
+def prepared_statements(db: DBManager) -> List[str]:
+    rows = fetch(db, "SELECT name FROM pg_prepared_statements ORDER BY name")
+    return [row.name for row in rows]
+
+
+@pytest.fixture
+def single_connection_db(postgres: Dict[str, Any], db: DBManager) -> Iterator[DBManager]:
+    """DBManager с одним соединением: все вызовы идут через одну серверную сессию"""
+    manager = DBManager(**postgres, min_connections=1, max_connections=1, health_check_interval=0)
+    manager.insert_employers_bulk(EMPLOYERS)
+    manager.insert_vacancies_bulk([vacancy(1), vacancy(2, 2, salary_from=300000, salary_to=300000)])
+    yield manager
+    manager.close()
+
+
+def test_statement_is_prepared_once_per_connection(single_connection_db: DBManager) -> None:
+    db = single_connection_db
+    assert db.get_avg_salary(live=True) == 225000.0
+    assert db.get_avg_salary(live=True) == 225000.0
+
+    assert prepared_statements(db) == ["hh_avg_salary_live"]
+
+
+def test_statement_is_prepared_again_after_deallocate_all(single_connection_db: DBManager) -> None:
+    db = single_connection_db
+    db.get_avg_salary(live=True)
+    with db._cursor() as cursor:
+        cursor.execute("DEALLOCATE ALL")
+
+    assert db.get_avg_salary(live=True) == 225000.0
+    assert prepared_statements(db) == ["hh_avg_salary_live"]
+
+
+def test_plan_is_prepared_again_after_schema_change_by_another_client(
+    single_connection_db: DBManager, postgres: Dict[str, Any]
+) -> None:
+    db = single_connection_db
+    before = db.get_vacancies_with_higher_salary()
+    other = psycopg2.connect(**postgres)
+    try:
+        with other, other.cursor() as cursor:
+            # Тип колонки результата меняется: «cached plan must not change result type»
+            cursor.execute("ALTER TABLE vacancies ALTER COLUMN title TYPE TEXT")
+    finally:
+        other.close()
+
+    assert db.get_vacancies_with_higher_salary() == before
+
+
+def test_statement_is_prepared_on_new_connection_after_disconnect(
+    single_connection_db: DBManager, postgres: Dict[str, Any]
+) -> None:
+    db = single_connection_db
+    db.get_avg_salary(live=True)
+    with db._cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        (pid,) = cursor.fetchone()
+    other = psycopg2.connect(**postgres)
+    try:
+        other.autocommit = True
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", (pid,))
+    finally:
+        other.close()
+
+    assert db.get_avg_salary(live=True) == 225000.0
+    assert db.pool_stats["health_check_failures"] == 1
+
+
+def test_compare_prepared_latency_keeps_setting(single_connection_db: DBManager) -> None:
+    db = single_connection_db
+    db.refresh_analytics_views()
+
+    report = db.compare_prepared_latency(runs=2)
+
+    assert set(report) == {
+        "hh_company_counts",
+        "hh_company_counts_live",
+        "hh_avg_salary",
+        "hh_avg_salary_live",
+        "hh_higher_salary",
+    }
+    assert all(timing["prepared_ms"] > 0 and timing["unprepared_ms"] > 0 for timing in report.values())
+    assert db.use_prepared
+
+
+def test_export_csv_and_ndjson(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    tricky = 'Инженер "QA", ночные смены\nи выходные \\ 50%'
+    db.insert_vacancies_bulk([vacancy(1, title=tricky), vacancy(2, 2, title="Аналитик")])
+
+    csv_file = io.BytesIO()
+    assert db.export("vacancies", csv_file) == 2
+    rows = list(csv.DictReader(io.StringIO(csv_file.getvalue().decode("utf-8"))))
+    assert [row["title"] for row in sorted(rows, key=lambda row: row["vacancy_id"])] == [tricky, "Аналитик"]
+    assert rows[0].keys() == {"vacancy_id", "title", "salary_from", "salary_to", "currency", "url", "employer_name"}
+
+    ndjson_file = io.BytesIO()
+    assert db.export("vacancies", ndjson_file, fmt="ndjson") == 2
+    records = [json.loads(line) for line in ndjson_file.getvalue().decode("utf-8").splitlines()]
+    assert sorted((record["vacancy_id"], record["title"]) for record in records) == [(1, tricky), (2, "Аналитик")]
+
+
+def test_export_keyword_and_companies(db: DBManager) -> None:
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk(
+        [vacancy(1, title="Бонус 50%"), vacancy(2, title="Бонус 500"), vacancy(3, 2, description="Бонус 50%")]
+    )
+    db.refresh_analytics_views()
+
+    keyword_file = io.BytesIO()
+    assert db.export("keyword", keyword_file, fmt="ndjson", keyword="50%") == 2
+    ids = sorted(json.loads(line)["vacancy_id"] for line in keyword_file.getvalue().splitlines())
+    assert ids == [1, 3]
+
+    for name in ("companies", "companies_live"):
+        companies_file = io.BytesIO()
+        assert db.export(name, companies_file) == 2
+        assert companies_file.getvalue().decode("utf-8").splitlines() == [
+            "company,vacancies_count",
+            "Альфа,2",
+            "Бета,1",
+        ]
+
+
+@pytest.mark.parametrize(
+    "name, fmt, keyword, message",
+    [
+        ("unknown", "csv", None, "Неизвестная выгрузка"),
+        ("vacancies", "xml", None, "Неизвестный формат"),
+        ("keyword", "csv", None, "ключевое слово"),
+    ],
+)
+def test_export_rejects_invalid_arguments(
+    db: DBManager, name: str, fmt: str, keyword: Optional[str], message: str
+) -> None:
+    with pytest.raises(ValueError, match=message):
+        db.export(name, io.BytesIO(), fmt=fmt, keyword=keyword)
+
+
+@pytest.fixture
+def salaries_db(db: DBManager) -> DBManager:
+    """Альфа: рублёвые зарплаты 10000..100000 и вакансия без зарплаты; Бета: одна вакансия в USD"""
+    db.insert_employers_bulk(EMPLOYERS)
+    db.insert_vacancies_bulk(
+        [vacancy(i, salary_from=i * 10000, salary_to=i * 10000) for i in range(1, 11)]
+        + [
+            vacancy(11, salary_from=0, salary_to=0, currency=""),
+            vacancy(12, 2, salary_from=1000, salary_to=0, currency="USD"),
+        ]
+    )
+    return db
+
+
+def test_salary_percentiles(salaries_db: DBManager) -> None:
+    rows = salaries_db.get_salary_percentiles((0.5, 0.9))
+
+    assert [(row["company"], row["currency"], row["salary_count"]) for row in rows] == [
+        ("Альфа", "RUR", 10),
+        ("Бета", "USD", 1),
+    ]
+    assert rows[0]["percentiles"] == {0.5: 55000.0, 0.9: 91000.0}
+    assert [row["currency"] for row in salaries_db.get_salary_percentiles(min_count=2)] == ["RUR"]
+    for percentiles in ((), (1.5,)):
+        with pytest.raises(ValueError):
+            salaries_db.get_salary_percentiles(percentiles)
+
+
+def test_cached_salary_percentiles_accept_list(postgres: Dict[str, Any], salaries_db: DBManager) -> None:
+    cache = QueryCache()
+    manager = DBManager(**postgres, query_cache=cache)
+    try:
+        first = manager.get_salary_percentiles([0.5, 0.9])  # type: ignore[arg-type]
+        assert manager.get_salary_percentiles([0.5, 0.9]) == first  # type: ignore[arg-type]
+    finally:
+        manager.close()
+
+    assert first[0]["percentiles"] == {0.5: 55000.0, 0.9: 91000.0}
+    assert cache.stats["hits"] == 1
+
+
+def test_salary_histogram_from_data_bounds(salaries_db: DBManager) -> None:
+    histogram = salaries_db.get_salary_histogram(buckets=3)
+
+    assert [(row["salary_from"], row["salary_to"], row["vacancies_count"]) for row in histogram] == [
+        (10000.0, 40000.0, 3),
+        (40000.0, 70000.0, 3),
+        (70000.0, 100000.0, 4),
+    ]
+
+
+def test_salary_histogram_open_buckets(salaries_db: DBManager) -> None:
+    histogram = salaries_db.get_salary_histogram(buckets=2, low=20000, high=80000)
+
+    assert [(row["bucket"], row["salary_from"], row["salary_to"], row["vacancies_count"]) for row in histogram] == [
+        (0, None, 20000.0, 1),
+        (1, 20000.0, 50000.0, 3),
+        (2, 50000.0, 80000.0, 4),
+        (3, 80000.0, None, 2),
+    ]
+
+
+def test_salary_histogram_edge_cases(salaries_db: DBManager) -> None:
+    # Все зарплаты в USD равны: одна корзина нулевой ширины
+    usd = salaries_db.get_salary_histogram(buckets=2, currency="USD")
+    assert [(row["salary_from"], row["salary_to"], row["vacancies_count"]) for row in usd] == [
+        (1000.0, 1000.0, 1),
+        (1000.0, 1000.0, 0),
+    ]
+    # Одна граница по другую сторону от всех зарплат
+    assert salaries_db.get_salary_histogram(low=200000) == []
+    assert salaries_db.get_salary_histogram(high=5000) == []
+    assert salaries_db.get_salary_histogram(currency="EUR") == []
+    with pytest.raises(ValueError):
+        salaries_db.get_salary_histogram(buckets=0)
+    with pytest.raises(ValueError):
+        salaries_db.get_salary_histogram(low=10, high=10)
+
+
+def test_salary_coverage(salaries_db: DBManager) -> None:
+    rows = salaries_db.get_salary_coverage()
+
+    assert rows == [
+        {"company": None, "vacancies_count": 12, "with_salary": 11, "without_salary": 1},
+        {"company": "Альфа", "vacancies_count": 11, "with_salary": 10, "without_salary": 1},
+        {"company": "Бета", "vacancies_count": 1, "with_salary": 1, "without_salary": 0},
+    ]
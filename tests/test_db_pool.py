@@ -0,0 +1,222 @@
+import threading
+import time
+from typing import Any, List
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from src.db_pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn: "FakeConnection"):
+        self.conn = conn
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def execute(self, query: str) -> None:
+        if not self.conn.alive:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.queries.append(query)
+
+
+class FakeConnection:
+    """Соединение psycopg2 с управляемой «живостью» и статусом транзакции"""
+
+    def __init__(self) -> None:
+        self.alive = True
+        self.closed = 0
+        self.autocommit = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.queries: List[str] = []
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def get_transaction_status(self) -> int:
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+class FakeFactory:
+    """Фабрика соединений вместо psycopg2.connect"""
+
+    def __init__(self) -> None:
+        self.connections: List[FakeConnection] = []
+        self.kwargs: List[dict] = []
+
+    def __call__(self, **kwargs: Any) -> FakeConnection:
+        conn = FakeConnection()
+        self.connections.append(conn)
+        self.kwargs.append(kwargs)
+        return conn
+
+
+def make_pool(factory: FakeFactory, **options: Any) -> ConnectionPool:
+    return ConnectionPool(connect=factory, dbname="hh", **options)
+
+
+def test_opens_min_connections_eagerly() -> None:
+    factory = FakeFactory()
+    pool = make_pool(factory, min_connections=2, max_connections=3)
+
+    assert len(factory.connections) == 2
+    assert all(conn.autocommit for conn in factory.connections)
+    assert factory.kwargs[0] == {"dbname": "hh"}
+    assert pool.stats["size"] == 2
+    assert pool.stats["idle"] == 2
+
+
+@pytest.mark.parametrize("min_connections, max_connections", [(-1, 1), (0, 0), (3, 2)])
+def test_rejects_invalid_sizes(min_connections: int, max_connections: int) -> None:
+    with pytest.raises(ValueError):
+        ConnectionPool(min_connections, max_connections, connect=FakeFactory())
+
+
+def test_exhausted_pool_times_out_and_records_the_wait() -> None:
+    pool = make_pool(FakeFactory(), min_connections=0, max_connections=1, timeout=0.1)
+    pool.getconn()
+
+    with pytest.raises(TimeoutError):
+        pool.getconn()
+
+    stats = pool.stats
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 1
+    assert stats["wait_time"] >= 0.1
+    assert stats["max_wait_time"] >= 0.1
+    assert stats["in_use"] == 1
+
+
+def test_waiting_thread_gets_released_connection() -> None:
+    pool = make_pool(FakeFactory(), min_connections=0, max_connections=1, timeout=5)
+    conn = pool.getconn()
+    borrowed: List[Any] = []
+
+    waiter = threading.Thread(target=lambda: borrowed.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.1)
+    pool.putconn(conn)
+    waiter.join()
+
+    assert borrowed == [conn]
+    stats = pool.stats
+    assert stats["waits"] == 1
+    assert stats["max_wait_time"] >= 0.1
+    assert stats["borrowed"] == 2
+    assert stats["timeouts"] == 0
+
+
+def test_dead_idle_connection_is_replaced() -> None:
+    factory = FakeFactory()
+    pool = make_pool(factory, min_connections=1, health_check_interval=0)
+    dead = factory.connections[0]
+    pool.state(dead)["prepared"] = {"hh_avg_salary"}
+    dead.alive = False
+
+    conn = pool.getconn()
+
+    assert conn is factory.connections[1]
+    assert dead.closed
+    assert pool.state(conn) == {}
+    assert pool.stats["health_check_failures"] == 1
+    assert pool.stats["size"] == 1
+
+
+def test_recently_used_connection_is_not_checked() -> None:
+    factory = FakeFactory()
+    pool = make_pool(factory, min_connections=1, health_check_interval=60)
+
+    conn = pool.getconn()
+
+    assert conn is factory.connections[0]
+    assert conn.queries == []
+
+
+def test_closed_connection_is_replaced_without_check() -> None:
+    factory = FakeFactory()
+    pool = make_pool(factory, min_connections=1)
+    factory.connections[0].closed = 1
+
+    assert pool.getconn() is factory.connections[1]
+    assert pool.stats["health_check_failures"] == 1
+
+
+def test_failed_connect_releases_the_slot() -> None:
+    def refuse(**kwargs: Any) -> Any:
+        raise psycopg2.OperationalError("connection refused")
+
+    pool = ConnectionPool(0, 1, connect=refuse)
+
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats["size"] == 0
+
+
+def test_putconn_rolls_back_open_transaction() -> None:
+    pool = make_pool(FakeFactory())
+    conn = pool.getconn()
+    conn.autocommit = False
+    conn.in_transaction = True
+
+    pool.putconn(conn)
+
+    assert conn.rollbacks == 1
+    assert conn.autocommit
+    assert pool.stats["idle"] == 1
+
+
+def test_discard_closes_connection() -> None:
+    pool = make_pool(FakeFactory(), max_connections=2)
+    conn = pool.getconn()
+
+    pool.putconn(conn, discard=True)
+
+    assert conn.closed
+    stats = pool.stats
+    assert (stats["size"], stats["idle"], stats["in_use"], stats["discarded"]) == (0, 0, 0, 1)
+
+
+def test_connection_error_in_block_discards_connection() -> None:
+    pool = make_pool(FakeFactory())
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("terminating connection")
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("ошибка приложения")
+
+    assert conn.closed
+    assert pool.stats["discarded"] == 1
+    assert pool.stats["idle"] == 1
+
+
+def test_closeall_closes_idle_and_returned_connections() -> None:
+    pool = make_pool(FakeFactory(), min_connections=1, max_connections=2)
+    idle = pool.getconn()
+    in_use = pool.getconn()
+    pool.putconn(idle)
+
+    pool.closeall()
+    assert idle.closed and not in_use.closed
+    pool.putconn(in_use)
+
+    assert in_use.closed
+    assert pool.stats["size"] == 0
+    with pytest.raises(ConnectionError):
+        pool.getconn()
@@ -0,0 +1,217 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pytest
+
+from src.hh_api import HeadHunterAPI
+from src.ingest import IngestPipeline
+from src.rate_limiter import TokenBucket
+from tests.conftest import Reply, ScriptedServer
+
+EMPLOYER = {"id": "1", "name": "Компания", "alternate_url": "https://hh.ru/employer/1", "open_vacancies": 0}
+
+
+class PagedVacancies:
+    """
+    Обработчик /vacancies: found вакансий по 100 на странице, выдача обрезана на 20 страницах,
+    как у hh.ru. Страница page отвечает с задержкой delays[page] и запоминает пик параллельных запросов.
+    """
+
+    def __init__(self, found: int, delays: Optional[Dict[int, float]] = None) -> None:
+        self.found = found
+        self.pages = min(-(-found // 100), 20)
+        self.delays = delays or {}
+        self.active = 0
+        self.peak = 0
+        self.__lock = threading.Lock()
+
+    def __call__(self, params: Dict[str, str]) -> Reply:
+        page = int(params["page"])
+        with self.__lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delays.get(page, 0))
+        with self.__lock:
+            self.active -= 1
+        count = min(100, self.found - page * 100)
+        items = [{"id": str(page * 100 + i)} for i in range(count)]
+        return 200, {}, {"items": items, "found": self.found, "pages": self.pages, "page": page}
+
+
+def requested_pages(server: ScriptedServer) -> List[int]:
+    return sorted(int(request["params"]["page"]) for request in server.requests if request["path"] == "/vacancies")
+
+
+def make_api(server: ScriptedServer, **kwargs: object) -> HeadHunterAPI:
+    """HeadHunterAPI с собственным ограничителем, не ждущий общий DEFAULT_RATE_LIMITER"""
+    options: dict = {"rate_limiter": TokenBucket(rate=1000, capacity=1000), "backoff_factor": 0.01}
+    options.update(kwargs)
+    return HeadHunterAPI(base_url=server.base_url, **options)
+
+
+def test_retries_server_errors(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (503, {}, None), (502, {}, None), (200, {}, EMPLOYER))
+
+    with make_api(server) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+    assert len(server.times("/employers/1")) == 3
+
+
+def test_retry_after_takes_precedence_over_backoff(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (429, {"Retry-After": "0.3"}, None), (200, {}, EMPLOYER))
+
+    # Без Retry-After задержка была бы случайной в пределах backoff_factor (до 0.01 с)
+    with make_api(server) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+    first, second = server.times("/employers/1")
+    assert second - first >= 0.3
+
+
+def test_retry_after_is_capped_by_max_backoff(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (429, {"Retry-After": "3600"}, None), (200, {}, EMPLOYER))
+
+    started_at = time.monotonic()
+    with make_api(server, max_backoff=0.2) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+    assert time.monotonic() - started_at < 2
+
+
+def test_gives_up_after_max_retries(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (500, {}, None))
+
+    with make_api(server, max_retries=2) as hh_api:
+        with pytest.raises(ConnectionError, match="HTTP 500"):
+            hh_api.get_employer_info(1)
+    assert len(server.times("/employers/1")) == 3
+
+
+def test_client_errors_are_not_retried(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (404, {}, {"errors": []}))
+
+    with make_api(server) as hh_api:
+        with pytest.raises(ConnectionError, match="HTTP 404"):
+            hh_api.get_employer_info(1)
+    assert len(server.times("/employers/1")) == 1
+
+
+def test_connection_errors_are_retried() -> None:
+    hh_api = HeadHunterAPI(
+        base_url="http://127.0.0.1:9",
+        rate_limiter=TokenBucket(rate=1000, capacity=1000),
+        max_retries=1,
+        backoff_factor=0.01,
+        timeout=(0.5, 0.5),
+    )
+    with hh_api, pytest.raises(ConnectionError, match="Ошибка подключения к hh.ru"):
+        hh_api.get_employer_info(1)
+
+
+def test_rate_limiter_paces_requests(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (200, {}, EMPLOYER))
+
+    # Корзина на 1 токен и 10 токенов в секунду: 6 запросов занимают не меньше 0.5 с
+    with make_api(server, rate_limiter=TokenBucket(rate=10, capacity=1)) as hh_api:
+        for _ in range(6):
+            hh_api.get_employer_info(1)
+    times = server.times("/employers/1")
+    assert times[-1] - times[0] >= 0.45
+
+
+def test_rate_limiter_is_shared_between_instances(server: ScriptedServer) -> None:
+    server.reply("/employers/1", (200, {}, EMPLOYER))
+    rate_limiter = TokenBucket(rate=20, capacity=1)
+    apis = [make_api(server, rate_limiter=rate_limiter) for _ in range(3)]
+
+    threads = [threading.Thread(target=lambda api=api: [api.get_employer_info(1) for _ in range(4)]) for api in apis]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for api in apis:
+        api.close()
+
+    # 12 запросов из трёх экземпляров при 20 токенах в секунду — не меньше 0.55 с
+    times = sorted(server.times("/employers/1"))
+    assert len(times) == 12
+    assert times[-1] - times[0] >= 0.5
+
+
+def test_pipeline_sizes_pool_for_all_fetch_workers(server: ScriptedServer) -> None:
+    with make_api(server, max_concurrency=4, pool_size=10) as hh_api:
+        IngestPipeline(None, hh_api, fetch_workers=4)  # type: ignore[arg-type]
+        assert hh_api.pool_size == 16
+
+        # Пул не уменьшается, если он уже достаточен
+        IngestPipeline(None, hh_api, fetch_workers=2)  # type: ignore[arg-type]
+        assert hh_api.pool_size == 16
+
+        server.reply("/employers/1", (200, {}, EMPLOYER))
+        assert hh_api.get_employer_info(1) == EMPLOYER
+
+
+def test_fetch_vacancies_keeps_page_order(server: ScriptedServer) -> None:
+    # Первые страницы отвечают дольше последних, но порядок вакансий — по страницам
+    handler = PagedVacancies(found=550, delays={1: 0.2, 2: 0.1})
+    server.route("/vacancies", handler)
+
+    with make_api(server, max_concurrency=3) as hh_api:
+        vacancies, complete = hh_api.fetch_vacancies(1)
+
+    assert [int(vacancy["id"]) for vacancy in vacancies] == list(range(550))
+    assert complete is True
+    assert 1 < handler.peak <= 3
+    assert server.requests[0]["params"] == {"employer_id": "1", "per_page": "100", "page": "0"}
+
+
+def test_fetch_vacancies_single_page_is_complete(server: ScriptedServer) -> None:
+    server.route("/vacancies", PagedVacancies(found=40))
+
+    with make_api(server) as hh_api:
+        vacancies, complete = hh_api.fetch_vacancies(1)
+
+    assert len(vacancies) == 40
+    assert complete is True
+    assert requested_pages(server) == [0]
+
+
+def test_fetch_vacancies_respects_max_pages(server: ScriptedServer) -> None:
+    server.route("/vacancies", PagedVacancies(found=550))
+
+    with make_api(server, max_pages=3) as hh_api:
+        vacancies, complete = hh_api.fetch_vacancies(1)
+
+    assert len(vacancies) == 300
+    assert complete is False
+    assert requested_pages(server) == [0, 1, 2]
+
+
+def test_fetch_vacancies_is_incomplete_beyond_search_depth(server: ScriptedServer) -> None:
+    # hh.ru отдаёт не больше 20 страниц; max_pages больше этого предела не поднимает
+    server.route("/vacancies", PagedVacancies(found=2500))
+
+    with make_api(server, max_pages=50, max_concurrency=4) as hh_api:
+        assert hh_api.max_pages == 20
+        vacancies, complete = hh_api.fetch_vacancies(1)
+
+    assert len(vacancies) == 2000
+    assert complete is False
+    assert requested_pages(server) == list(range(20))
+
+
+def test_token_bucket_allows_burst_then_waits() -> None:
+    bucket = TokenBucket(rate=10, capacity=5)
+
+    started_at = time.monotonic()
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits == [0.0] * 5
+    assert time.monotonic() - started_at < 0.05
+
+    assert bucket.acquire() > 0
+    assert time.monotonic() - started_at >= 0.09
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 1), (1, 0), (-1, 1)])
+def test_token_bucket_rejects_non_positive_values(rate: float, capacity: float) -> None:
+    with pytest.raises(ValueError):
+        TokenBucket(rate=rate, capacity=capacity)
@@ -0,0 +1,106 @@
+import os
+from typing import Any
+
+from src.hh_api import HeadHunterAPI
+from src.http_cache import HTTPCache
+from src.rate_limiter import TokenBucket
+from tests.conftest import ScriptedServer
+
+EMPLOYER = {"id": "1", "name": "Компания", "alternate_url": "https://hh.ru/employer/1", "open_vacancies": 3}
+
+
+def make_api(server: ScriptedServer, cache: HTTPCache) -> HeadHunterAPI:
+    return HeadHunterAPI(base_url=server.base_url, cache=cache, rate_limiter=TokenBucket(rate=1000, capacity=1000))
+
+
+def test_ttl_by_longest_prefix(tmp_path: Any) -> None:
+    cache = HTTPCache(str(tmp_path), ttl={"/employers": 100.0, "/employers/1/": 5.0}, default_ttl=1.0)
+
+    assert cache.ttl_for("https://api.hh.ru/employers/2") == 100.0
+    assert cache.ttl_for("https://api.hh.ru/employers/1/departments") == 5.0
+    assert cache.ttl_for("https://api.hh.ru/areas") == 1.0
+
+
+def test_fresh_entry_is_served_without_request(server: ScriptedServer, tmp_path: Any) -> None:
+    server.reply("/employers/1", (200, {"ETag": '"v1"'}, EMPLOYER))
+    cache = HTTPCache(str(tmp_path))
+
+    with make_api(server, cache) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+        assert hh_api.get_employer_info(1) == EMPLOYER
+
+    assert len(server.times("/employers/1")) == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_expired_entry_is_revalidated_with_304(server: ScriptedServer, tmp_path: Any) -> None:
+    last_modified = "Mon, 12 Oct 2026 10:00:00 GMT"
+    server.reply(
+        "/employers/1",
+        (200, {"ETag": '"v1"', "Last-Modified": last_modified}, EMPLOYER),
+        (304, {"ETag": '"v1"'}, None),
+    )
+    cache = HTTPCache(str(tmp_path), ttl={"/employers": 0.0})
+
+    with make_api(server, cache) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+        assert hh_api.get_employer_info(1) == EMPLOYER
+
+    first, second = [request["headers"] for request in server.requests]
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == '"v1"'
+    assert second["If-Modified-Since"] == last_modified
+    assert cache.stats["revalidations"] == 1
+    assert cache.stats["hits"] == 0
+
+
+def test_expired_entry_is_replaced_by_new_response(server: ScriptedServer, tmp_path: Any) -> None:
+    updated = {**EMPLOYER, "open_vacancies": 4}
+    server.reply("/employers/1", (200, {"ETag": '"v1"'}, EMPLOYER), (200, {"ETag": '"v2"'}, updated))
+    cache = HTTPCache(str(tmp_path), ttl={"/employers": 0.0})
+
+    with make_api(server, cache) as hh_api:
+        assert hh_api.get_employer_info(1) == EMPLOYER
+        assert hh_api.get_employer_info(1) == updated
+
+    entry = cache.lookup(f"{server.base_url}/employers/1", {})
+    assert entry is not None
+    assert entry["etag"] == '"v2"'
+    assert entry["body"] == updated
+    assert cache.stats["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path: Any) -> None:
+    cache = HTTPCache(str(tmp_path))
+    urls = [f"https://api.hh.ru/employers/{employer_id}" for employer_id in range(1, 5)]
+    for url in urls[:3]:
+        cache.store(url, {}, {"items": [url]}, {})
+    # Предел на три записи; запас меньше записи покрывает разницу в длине stored_at
+    cache.max_bytes = cache.stats["bytes"] + 32
+
+    first = cache.lookup(urls[0], {})
+    assert first is not None
+    cache.hit(first)
+    cache.store(urls[3], {}, {"items": [urls[3]]}, {})
+
+    assert cache.lookup(urls[1], {}) is None
+    assert not os.path.exists(tmp_path / f"{HTTPCache.make_key(urls[1], {})}.json")
+    assert all(cache.lookup(url, {}) is not None for url in (urls[0], urls[2], urls[3]))
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["entries"] == 3
+    assert cache.stats["bytes"] <= cache.max_bytes
+
+
+def test_index_is_restored_from_disk(tmp_path: Any) -> None:
+    cache = HTTPCache(str(tmp_path))
+    cache.store("https://api.hh.ru/employers/1", {}, EMPLOYER, {"ETag": '"v1"'})
+    cache.store("https://api.hh.ru/vacancies", {"employer_id": 1, "page": 0}, {"items": []}, {})
+
+    restored = HTTPCache(str(tmp_path))
+
+    assert restored.stats["entries"] == 2
+    assert restored.stats["bytes"] == cache.stats["bytes"]
+    entry = restored.lookup("https://api.hh.ru/vacancies", {"page": 0, "employer_id": 1})
+    assert entry is not None
+    assert entry["body"] == {"items": []}
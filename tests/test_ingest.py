@@ -0,0 +1,140 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.db_manager import DBManager
+from src.ingest import IngestPipeline
+from src.vacancy_batch import VacancyBatch
+
+
+def api_vacancy(vacancy_id: int, title: str = "Python-разработчик") -> Dict[str, Any]:
+    """Вакансия в формате ответа API hh.ru"""
+    return {
+        "id": str(vacancy_id),
+        "name": title,
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "salary": {"from": 100000, "to": 150000, "currency": "RUR"},
+        "snippet": {"requirement": "PostgreSQL"},
+    }
+
+
+class StubAPI:
+    """Вместо HeadHunterAPI: отдаёт заданные вакансии и признак полноты списка или выбрасывает заданную ошибку"""
+
+    max_concurrency = 1
+
+    def __init__(self, vacancies: Dict[int, Union[Tuple[List[Dict[str, Any]], bool], Exception]]):
+        self.vacancies = vacancies
+
+    def ensure_pool_size(self, size: int) -> None:
+        pass
+
+    def get_employer_info(self, employer_id: int) -> Dict[str, Any]:
+        return {"id": str(employer_id), "name": f"Компания {employer_id}", "description": "", "alternate_url": ""}
+
+    def fetch_vacancies(self, employer_id: int) -> Tuple[List[Dict[str, Any]], bool]:
+        result = self.vacancies[employer_id]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class StubDB:
+    """
+    Вместо DBManager: запоминает пакеты записи (id работодателей каждого пакета)
+    и отклоняет пакеты с вакансиями работодателей из failing.
+    """
+
+    def __init__(self, failing: Iterable[int] = (), result: Optional[Dict[str, int]] = None):
+        self.failing = set(failing)
+        self.result = result or {}
+        self.attempts: List[List[int]] = []
+        self.written: List[int] = []
+        self.complete_ids: List[int] = []
+
+    def insert_employers_bulk(self, employers: Iterable[Dict[str, Any]]) -> int:
+        return len(list(employers))
+
+    def insert_vacancies_bulk(self, vacancies: VacancyBatch) -> Dict[str, int]:
+        employer_ids = sorted(set(vacancies.employer_ids))
+        self.attempts.append(employer_ids)
+        if self.failing & set(employer_ids):
+            raise ValueError("нарушено ограничение")
+        self.written.extend(employer_ids)
+        return {"inserted": len(vacancies), "updated": 0}
+
+    def sync_vacancies(self, vacancies: VacancyBatch, complete_ids: List[int], **options: Any) -> Dict[str, int]:
+        self.complete_ids.extend(complete_ids)
+        return dict(self.result)
+
+
+def run(db: Any, api: StubAPI, **options: Any) -> Dict[str, Any]:
+    pipeline = IngestPipeline(db, api, fetch_workers=2, refresh_views=False, **options)  # type: ignore[arg-type]
+    return pipeline.run({f"Компания {employer_id}": employer_id for employer_id in api.vacancies})
+
+
+def test_incomplete_list_never_deletes(db: DBManager) -> None:
+    full = [api_vacancy(vacancy_id) for vacancy_id in (1, 2, 3)]
+    run(db, StubAPI({10: (full, True), 20: ([api_vacancy(4)], True)}), incremental=True)
+
+    # Список работодателя 10 обрезан (например, ограничением max_pages): вакансии 2 и 3 не удаляются
+    summary = run(db, StubAPI({10: (full[:1], False), 20: ([], True)}), incremental=True)
+
+    assert summary["removed"] == 1
+    rows = db._fetch_tuples("SELECT vacancy_id FROM vacancies ORDER BY vacancy_id")
+    assert [row.vacancy_id for row in rows] == [1, 2, 3]
+
+
+def test_failed_employer_does_not_stop_others() -> None:
+    db = StubDB()
+    api = StubAPI(
+        {
+            10: ([api_vacancy(1), api_vacancy(2)], True),
+            20: ConnectionError("hh.ru недоступен"),
+            30: ([api_vacancy(3)], True),
+        }
+    )
+
+    summary = run(db, api)
+
+    assert sorted(db.written) == [10, 30]
+    assert (summary["employers"], summary["vacancies"], summary["errors"]) == (2, 3, 1)
+
+
+def test_failed_batch_falls_back_to_single_employers() -> None:
+    db = StubDB(failing=[20])
+    api = StubAPI({employer_id: ([api_vacancy(employer_id + 1)], True) for employer_id in (10, 20, 30)})
+
+    summary = run(db, api, batch_size=100)
+
+    # Общий пакет отклонён, затем каждый работодатель записан отдельно — не записан только проблемный
+    assert db.attempts[0] == [10, 20, 30]
+    assert sorted(db.attempts[1:]) == [[10], [20], [30]]
+    assert sorted(db.written) == [10, 30]
+    assert (summary["employers"], summary["vacancies"], summary["inserted"], summary["errors"]) == (2, 2, 2, 1)
+
+
+def test_summary_sums_counts_of_all_batches() -> None:
+    db = StubDB(result={"inserted": 3, "updated": 2, "unchanged": 1, "removed": 4})
+    api = StubAPI(
+        {
+            10: ([api_vacancy(1), api_vacancy(2)], True),
+            20: ([api_vacancy(3)], False),
+            30: ([api_vacancy(4), api_vacancy(5), api_vacancy(6)], True),
+        }
+    )
+
+    summary = run(db, api, batch_size=1, incremental=True)
+
+    # batch_size=1: каждый работодатель — отдельный пакет, удаление закрытых — только у полных списков
+    assert sorted(db.complete_ids) == [10, 30]
+    assert {key: summary[key] for key in ("employers", "vacancies", "errors")} == {
+        "employers": 3,
+        "vacancies": 6,
+        "errors": 0,
+    }
+    assert {key: summary[key] for key in ("inserted", "updated", "unchanged", "removed")} == {
+        "inserted": 9,
+        "updated": 6,
+        "unchanged": 3,
+        "removed": 12,
+    }
+    assert summary["vacancies_per_sec"] > 0
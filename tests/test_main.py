@@ -0,0 +1,23 @@
+from typing import Any, List
+
+import pytest
+
+from src.main import main
+
+
+@pytest.mark.parametrize(
+    "argv, message",
+    [
+        (["query", "keyword"], "для отчёта keyword нужно указать ключевое слово"),
+        (["export", "keyword"], "для выгрузки keyword нужно указать ключевое слово"),
+    ],
+)
+def test_keyword_is_required_before_connecting(argv: List[str], message: str, capsys: Any) -> None:
+    # Ошибка аргументов выводится argparse без трассировки и до подключения к базе данных
+    with pytest.raises(SystemExit) as error:
+        main(argv)
+
+    assert error.value.code == 2
+    output = capsys.readouterr()
+    assert message in output.err
+    assert "Подключаемся" not in output.out
@@ -0,0 +1,168 @@
+import json
+from typing import Any, List
+
+import pytest
+from psycopg2 import extensions
+
+from src.metrics import Metrics, statement_label
+
+
+class FakeCursor:
+    """Курсор, запоминающий выполненные команды"""
+
+    def __init__(self, executed: List[str]):
+        self.executed = executed
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def execute(self, statement: str) -> None:
+        self.executed.append(statement)
+
+    def fetchall(self) -> List[Any]:
+        return [("Seq Scan on vacancies",)]
+
+
+class FakeConnection:
+    """Соединение без открытой транзакции"""
+
+    def __init__(self) -> None:
+        self.executed: List[str] = []
+
+    def get_transaction_status(self) -> int:
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.executed)
+
+
+@pytest.fixture
+def metrics() -> Metrics:
+    metrics = Metrics(slow_query_threshold=0.1)
+    metrics.register_prepared("hh_avg_salary", "SELECT AVG(salary_mid) FROM mv_salary_stats", analyze=True)
+    metrics.register_prepared("hh_company_report", "SELECT name FROM employers")
+    metrics.register_prepared("hh_insert_vacancy", "INSERT INTO vacancies VALUES ($1)")
+    return metrics
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "SELECT title FROM vacancies WHERE salary_mid > 0",
+        "WITH s AS (SELECT 1) SELECT * FROM s",
+        "EXECUTE hh_avg_salary",
+        "EXECUTE hh_company_report",
+    ],
+)
+def test_read_only_statements(metrics: Metrics, statement: str) -> None:
+    assert metrics.is_read_only(statement)
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "SELECT pg_advisory_lock(42)",
+        "SELECT pg_try_advisory_lock(42)",
+        "select pg_advisory_unlock(42)",
+        "SELECT setval('vacancies_id_seq', 1)",
+        "SELECT nextval('vacancies_id_seq')",
+        "SELECT * FROM vacancies FOR UPDATE",
+        "SELECT * FROM vacancies FOR SHARE",
+        "WITH d AS (DELETE FROM vacancies RETURNING *) SELECT * FROM d",
+        "INSERT INTO vacancies VALUES (1)",
+        "EXECUTE hh_insert_vacancy(1)",
+        "EXECUTE hh_unknown",
+        "REFRESH MATERIALIZED VIEW mv_salary_stats",
+    ],
+)
+def test_statements_with_side_effects(metrics: Metrics, statement: str) -> None:
+    assert not metrics.is_read_only(statement)
+    assert metrics.explain_command(statement) is None
+
+
+def test_explain_analyze_only_for_registered_reads(metrics: Metrics) -> None:
+    assert metrics.explain_command("EXECUTE hh_avg_salary") == "EXPLAIN (ANALYZE, BUFFERS)"
+    assert metrics.explain_command("EXECUTE hh_company_report") == "EXPLAIN"
+    assert metrics.explain_command("SELECT title FROM vacancies") == "EXPLAIN"
+
+
+def test_slow_advisory_lock_is_not_explained(metrics: Metrics) -> None:
+    connection = FakeConnection()
+    metrics.log_slow_query(connection, "SELECT pg_advisory_lock(42)", 1.0, 1)
+    metrics.log_slow_query(connection, "SELECT title FROM vacancies", 1.0, 3)
+
+    assert connection.executed == ["EXPLAIN SELECT title FROM vacancies"]
+    first, second = metrics.slow_queries
+    assert first["plan"] is None
+    assert second["plan"] == "Seq Scan on vacancies"
+
+
+def test_statement_label() -> None:
+    assert statement_label("SELECT * FROM vacancies WHERE vacancy_id = 1") == "SELECT vacancies"
+    assert statement_label("EXECUTE hh_avg_salary") == "EXECUTE hh_avg_salary"
+    assert statement_label("COPY (SELECT * FROM employers) TO STDOUT") == "COPY TO employers"
+
+
+def test_prometheus_export() -> None:
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.describe("hh_db_query_seconds", "Время SQL-операторов")
+    metrics.inc("hh_http_requests_total", endpoint="/vacancies")
+    metrics.inc("hh_http_requests_total", 2, endpoint="/vacancies")
+    metrics.set("hh_db_pool_in_use", 3)
+    metrics.record_query("SELECT * FROM vacancies", 0.05, 10)
+    metrics.record_query("SELECT * FROM vacancies", 0.5, 20)
+    metrics.record_query("SELECT * FROM vacancies", 5.0, 0, failed=True)
+
+    lines = metrics.to_prometheus().splitlines()
+
+    assert "# TYPE hh_http_requests_total counter" in lines
+    assert 'hh_http_requests_total{endpoint="/vacancies"} 3.0' in lines
+    assert "# TYPE hh_db_pool_in_use gauge" in lines
+    assert "hh_db_pool_in_use 3.0" in lines
+    assert 'hh_db_query_rows_total{statement="SELECT vacancies"} 30.0' in lines
+    assert 'hh_db_query_errors_total{statement="SELECT vacancies"} 1.0' in lines
+    assert "# HELP hh_db_query_seconds Время SQL-операторов" in lines
+    assert "# TYPE hh_db_query_seconds histogram" in lines
+    # Корзины кумулятивные, +Inf равна числу наблюдений
+    assert 'hh_db_query_seconds_bucket{statement="SELECT vacancies",le="0.1"} 1.0' in lines
+    assert 'hh_db_query_seconds_bucket{statement="SELECT vacancies",le="1.0"} 2.0' in lines
+    assert 'hh_db_query_seconds_bucket{statement="SELECT vacancies",le="+Inf"} 3.0' in lines
+    assert 'hh_db_query_seconds_sum{statement="SELECT vacancies"} 5.55' in lines
+    assert 'hh_db_query_seconds_count{statement="SELECT vacancies"} 3.0' in lines
+
+
+def test_prometheus_label_escaping() -> None:
+    metrics = Metrics()
+    metrics.inc("hh_events_total", title='say "hi"\\\n')
+
+    assert 'hh_events_total{title="say \\"hi\\"\\\\\\n"} 1.0' in metrics.to_prometheus().splitlines()
+
+
+def test_json_export(tmp_path: Any) -> None:
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.inc("hh_http_cache_hits_total", endpoint="/employers/{id}")
+    metrics.set("hh_ingest_vacancies", 120)
+    metrics.observe("hh_http_request_seconds", 0.5, endpoint="/vacancies", status="200")
+
+    json_path = tmp_path / "metrics.json"
+    metrics.export(str(json_path))
+    data = json.loads(json_path.read_text(encoding="utf-8"))
+
+    assert data["counters"]["hh_http_cache_hits_total"] == [{"labels": {"endpoint": "/employers/{id}"}, "value": 1.0}]
+    assert data["gauges"]["hh_ingest_vacancies"] == [{"labels": {}, "value": 120.0}]
+    assert data["histograms"]["hh_http_request_seconds"] == [
+        {
+            "labels": {"endpoint": "/vacancies", "status": "200"},
+            "buckets": {"0.1": 0.0, "1.0": 1.0, "+Inf": 0.0},
+            "sum": 0.5,
+            "count": 1.0,
+        }
+    ]
+    assert data["slow_queries"] == []
+
+    prometheus_path = tmp_path / "metrics.prom"
+    metrics.export(str(prometheus_path))
+    assert prometheus_path.read_text(encoding="utf-8") == metrics.to_prometheus()
@@ -0,0 +1,155 @@
+import threading
+from typing import Any, Dict, List
+
+import psycopg2
+import pytest
+
+from src.db_manager import _MIGRATION_LOCK_ID, DBManager
+from src.migrations import MIGRATIONS, Migration, _backfill
+
+# Данные базы, созданной исходной версией проекта (только миграция 1)
+BASELINE_VACANCIES = [
+    (1, 1, "Python-разработчик", 100000, 200000, "RUR", "Django и PostgreSQL"),
+    (2, 1, "Аналитик", 0, 0, "", "SQL"),
+    (3, 2, "Data Engineer", 3000, 4000, "USD", "Spark"),
+    (4, 2, "Тестировщик", 80000, 0, "RUR", "Selenium"),
+]
+
+
+def recreate_schema(db: DBManager) -> None:
+    with db._cursor() as cursor:
+        cursor.execute("DROP SCHEMA public CASCADE")
+        cursor.execute("CREATE SCHEMA public")
+    db._bump_schema_epoch()
+
+
+def populate_baseline(db: DBManager) -> None:
+    recreate_schema(db)
+    db.migrate(MIGRATIONS[:1])
+    with db._cursor() as cursor:
+        cursor.execute("INSERT INTO employers (employer_id, company) VALUES (1, 'Альфа'), (2, 'Бета')")
+        cursor.executemany(
+            """
+            INSERT INTO vacancies (vacancy_id, employer_id, title, salary_from, salary_to, currency, url, description)
+            VALUES (%s, %s, %s, %s, %s, %s, 'https://hh.ru/vacancy', %s)
+            """,
+            BASELINE_VACANCIES,
+        )
+
+
+def invalid_indexes(db: DBManager) -> List[str]:
+    rows = db._fetch_tuples("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'vacancies'::regclass AND NOT i.indisvalid
+    """)
+    return [row.relname for row in rows]
+
+
+def test_upgrade_of_populated_database_backfills_columns(db: DBManager) -> None:
+    populate_baseline(db)
+
+    applied = db.migrate()
+
+    assert applied[:4] == [2, 3, 4, 5]
+    rows = db._fetch_tuples("SELECT vacancy_id, salary_mid, salary_mid_rub FROM vacancies ORDER BY vacancy_id")
+    assert [row.salary_mid for row in rows] == [150000, None, 3500, 80000]
+    # До загрузки курсов в рублях пересчитаны только рублёвые вакансии
+    assert [row.salary_mid_rub for row in rows] == [150000, None, None, 80000]
+    assert db.get_avg_salary(live=True) == 115000.0
+    assert [v["vacancy_id"] for v in db.search_vacancies("postgres")] == [1]
+    assert invalid_indexes(db) == []
+
+
+def test_writes_fill_derived_columns_after_upgrade(db: DBManager) -> None:
+    populate_baseline(db)
+    db.migrate()
+
+    db.insert_vacancies_bulk([{"vacancy_id": 5, "employer_id": 1, "title": "Courier", "url": "u"}])
+
+    assert db._fetch_tuples("SELECT salary_mid FROM vacancies WHERE vacancy_id = 5")[0].salary_mid is None
+    assert [v["vacancy_id"] for v in db.search_vacancies("courier")] == [5]
+
+
+def test_generated_columns_of_earlier_schema_become_writable(db: DBManager) -> None:
+    recreate_schema(db)
+    db.migrate(MIGRATIONS[:2])
+    with db._cursor() as cursor:
+        cursor.execute("""
+            ALTER TABLE vacancies ADD COLUMN salary_mid INTEGER
+            GENERATED ALWAYS AS ((COALESCE(salary_from, 0) + COALESCE(salary_to, 0)) / 2) STORED
+        """)
+        cursor.execute("""
+            ALTER TABLE vacancies ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('russian'::regconfig, title)) STORED
+        """)
+
+    db.migrate()
+    db.insert_employers_bulk([{"employer_id": 1, "company": "Альфа"}])
+    db.insert_vacancies_bulk(
+        [{"vacancy_id": 1, "employer_id": 1, "title": "Аналитик", "url": "u", "salary_from": 10, "salary_to": 30}]
+    )
+
+    assert db._fetch_tuples("SELECT salary_mid FROM vacancies")[0].salary_mid == 20
+
+
+def test_backfill_commits_in_batches(db: DBManager) -> None:
+    db.insert_employers_bulk([{"employer_id": 1, "company": "Альфа"}])
+    db.insert_vacancies_bulk(
+        [{"vacancy_id": i, "employer_id": 1, "title": "T", "url": "u", "salary_from": i} for i in range(1, 8)]
+    )
+    step = Migration(
+        1000, "Тест пакетного заполнения", [_backfill("salary_mid", "salary_from * 10", batch_size=2)], concurrent=True
+    )
+
+    assert db.migrate([step]) == [1000]
+    rows = db._fetch_tuples("SELECT salary_mid FROM vacancies ORDER BY vacancy_id")
+    assert [row.salary_mid for row in rows] == [i * 10 for i in range(1, 8)]
+
+
+def test_migrate_is_idempotent(db: DBManager) -> None:
+    assert db.migrate() == []
+
+
+def test_migrate_waits_for_lock_and_times_out(db: DBManager, postgres: Dict[str, Any]) -> None:
+    holder = psycopg2.connect(**postgres)
+    holder.autocommit = True
+    try:
+        with holder.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (_MIGRATION_LOCK_ID,))
+        with pytest.raises(TimeoutError, match="Блокировка миграций"):
+            db.migrate(lock_timeout=0.2)
+
+        # Ожидающий migrate продолжает, как только блокировку отпустили
+        result: List[Any] = []
+        waiter = threading.Thread(target=lambda: result.append(db.migrate(lock_timeout=10)))
+        waiter.start()
+        with holder.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (_MIGRATION_LOCK_ID,))
+        waiter.join()
+        assert result == [[]]
+    finally:
+        holder.close()
+
+
+def test_invalid_index_is_rebuilt(db: DBManager) -> None:
+    # Так выглядит индекс, CREATE INDEX CONCURRENTLY которого прервали
+    with db._cursor() as cursor:
+        cursor.execute(
+            "UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'vacancies_employer_id_idx'::regclass"
+        )
+        cursor.execute("DELETE FROM schema_migrations WHERE version = 10")
+    assert invalid_indexes(db) == ["vacancies_employer_id_idx"]
+
+    assert db.migrate() == [10]
+    assert invalid_indexes(db) == []
+
+
+def test_salary_mid_of_one_sided_ranges_is_recomputed(db: DBManager) -> None:
+    populate_baseline(db)
+    db.migrate([migration for migration in MIGRATIONS if migration.version < 14])
+    rows = db._fetch_tuples("SELECT salary_mid FROM vacancies WHERE vacancy_id = 4")
+    assert rows[0].salary_mid == 40000
+
+    assert db.migrate() == [14]
+    rows = db._fetch_tuples("SELECT salary_mid, salary_mid_rub FROM vacancies WHERE vacancy_id = 4")
+    assert (rows[0].salary_mid, rows[0].salary_mid_rub) == (80000, 80000)
@@ -0,0 +1,181 @@
+import threading
+from typing import Any, Iterator, List, Optional
+
+import pytest
+
+from src.db_manager import _cached, _writes
+from src.query_cache import QueryCache, estimate_size
+
+
+class FakeManager:
+    """Минимальный владелец кэша с тем же протоколом, что у DBManager"""
+
+    def __init__(self, query_cache: Optional[QueryCache]):
+        self.query_cache = query_cache
+        self.write_generation = 0
+        self.calls: List[str] = []
+        self.rows = ["a"]
+        self.__generation_lock = threading.Lock()
+
+    def _bump_write_generation(self) -> None:
+        with self.__generation_lock:
+            self.write_generation += 1
+
+    @_cached
+    def read(self, keyword: str = "") -> List[str]:
+        self.calls.append(keyword)
+        return [row for row in self.rows if keyword in row]
+
+    @_cached
+    def read_many(self, keywords: Any) -> List[str]:
+        self.calls.append(",".join(keywords))
+        return [row for row in self.rows if any(keyword in row for keyword in keywords)]
+
+    @_writes
+    def write(self, row: str) -> None:
+        self.rows.append(row)
+
+    @_writes
+    def failing_write(self) -> None:
+        raise RuntimeError("ошибка записи")
+
+
+def test_hit_and_miss() -> None:
+    cache = QueryCache()
+    assert cache.get("k") == (False, None)
+    cache.put("k", [1, 2])
+    assert cache.get("k") == (True, [1, 2])
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["entries"] == 1
+
+
+def test_evicts_least_recently_used_entry() -> None:
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats["evictions"] == 1
+
+
+def test_evicts_by_size() -> None:
+    size = estimate_size(["x" * 100])
+    cache = QueryCache(max_bytes=size * 2)
+    for key in "abc":
+        cache.put(key, ["x" * 100])
+
+    assert cache.stats["entries"] == 2
+    assert cache.stats["bytes"] == size * 2
+    assert cache.get("a") == (False, None)
+
+
+def test_oversized_result_is_not_cached() -> None:
+    cache = QueryCache(max_bytes=100)
+    cache.put("k", ["x" * 1000])
+    assert cache.get("k") == (False, None)
+    assert cache.stats["bytes"] == 0
+
+
+def test_replacing_entry_keeps_size_consistent() -> None:
+    cache = QueryCache()
+    cache.put("k", ["x" * 1000])
+    cache.put("k", [])
+    assert cache.stats["bytes"] == estimate_size([])
+    assert cache.stats["entries"] == 1
+
+
+def test_expired_entry_is_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("src.query_cache.time.monotonic", lambda: now[0])
+    cache = QueryCache(ttl=10)
+    cache.put("k", 1)
+    now[0] += 5
+    assert cache.get("k") == (True, 1)
+    now[0] += 6
+    assert cache.get("k") == (False, None)
+    assert cache.stats["expirations"] == 1
+    assert cache.stats["entries"] == 0
+
+
+def test_cached_reads_reuse_result() -> None:
+    manager = FakeManager(QueryCache())
+    assert manager.read("a") == ["a"]
+    assert manager.read("a") == ["a"]
+    assert manager.read(keyword="a") == ["a"]
+    # Позиционный и именованный вызовы — разные ключи
+    assert manager.calls == ["a", "a"]
+
+
+def test_list_arguments_are_cached_as_tuples() -> None:
+    manager = FakeManager(QueryCache())
+    assert manager.read_many(["a", "b"]) == ["a"]
+    assert manager.read_many(["a", "b"]) == ["a"]
+    assert manager.read_many(("a", "b")) == ["a"]
+    assert manager.read_many(["b"]) == []
+    assert manager.calls == ["a,b", "b"]
+
+
+class Keywords:
+    """Нехешируемый набор ключевых слов"""
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __init__(self, *keywords: str):
+        self.keywords = keywords
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keywords)
+
+
+def test_unhashable_arguments_bypass_cache() -> None:
+    manager = FakeManager(QueryCache())
+    assert manager.read_many(Keywords("a")) == ["a"]
+    assert manager.read_many(Keywords("a")) == ["a"]
+    assert manager.calls == ["a", "a"]
+    assert manager.query_cache is not None and manager.query_cache.stats["entries"] == 0
+
+
+def test_write_invalidates_cached_reads() -> None:
+    manager = FakeManager(QueryCache())
+    assert manager.read() == ["a"]
+    manager.write("b")
+    assert manager.write_generation == 1
+    assert manager.read() == ["a", "b"]
+    assert manager.calls == ["", ""]
+
+
+def test_failed_write_still_invalidates() -> None:
+    manager = FakeManager(QueryCache())
+    manager.read()
+    with pytest.raises(RuntimeError):
+        manager.failing_write()
+    manager.read()
+    assert manager.write_generation == 1
+    assert manager.calls == ["", ""]
+
+
+def test_without_cache_every_read_runs() -> None:
+    manager = FakeManager(None)
+    manager.read()
+    manager.read()
+    assert manager.calls == ["", ""]
+
+
+def test_concurrent_writes_bump_generation_once_each() -> None:
+    manager = FakeManager(QueryCache())
+
+    def write_many() -> None:
+        for _ in range(500):
+            manager.write("x")
+
+    threads = [threading.Thread(target=write_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert manager.write_generation == 2000
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from src.db_manager import DBManager
+from src.vacancy import Vacancy
+from src.vacancy_batch import VacancyBatch
+
+ITEMS: List[Dict[str, Any]] = [
+    {
+        "id": "101",
+        "name": "Python-разработчик",
+        "alternate_url": "https://hh.ru/vacancy/101",
+        "salary": {"from": 150000, "to": 250000, "currency": "RUR"},
+        "snippet": {"requirement": "Опыт работы с <highlighttext>PostgreSQL</highlighttext>"},
+    },
+    {
+        "id": "102",
+        "name": "Аналитик",
+        "alternate_url": "https://hh.ru/vacancy/102",
+        "salary": {"from": None, "to": 3000, "currency": "USD"},
+        "snippet": {"requirement": None},
+    },
+    {
+        "id": "103",
+        "name": "Стажёр",
+        "alternate_url": "https://hh.ru/vacancy/103",
+        "salary": None,
+        "snippet": {},
+    },
+    {
+        "id": "104",
+        "name": "Тестировщик\tQA",
+        "alternate_url": "https://hh.ru/vacancy/104",
+        "salary": {"from": "договорная", "to": None, "currency": "RUR"},
+    },
+    {
+        "id": "105",
+        "name": "Data Engineer",
+        "alternate_url": "https://hh.ru/vacancy/105",
+        "salary": {"from": 4000, "to": None, "currency": "EUR"},
+        "snippet": {"requirement": "Spark\nAirflow"},
+    },
+]
+
+
+def vacancy_rows(items: List[Dict[str, Any]], employer_id: int) -> List[tuple]:
+    """Строки COPY прежнего пути: Vacancy -> to_dict -> DBManager._vacancy_rows"""
+    return list(DBManager._vacancy_rows([v.to_dict() for v in Vacancy.cast_to_object_list(items)], employer_id))
+
+
+def test_rows_match_vacancy_path() -> None:
+    batch = VacancyBatch.from_api(ITEMS, 7)
+
+    assert len(batch) == len(ITEMS)
+    assert list(batch.rows()) == vacancy_rows(ITEMS, 7)
+    assert list(DBManager._vacancy_rows(batch)) == vacancy_rows(ITEMS, 7)
+
+
+def test_items_match_vacancy_objects() -> None:
+    batch = VacancyBatch.from_api(ITEMS, 7)
+
+    for from_batch, vacancy in zip(batch, Vacancy.cast_to_object_list(ITEMS), strict=True):
+        expected = vacancy.to_dict()
+        expected["vacancy_id"] = int(expected["vacancy_id"])
+        expected["description"] = expected["description"] or ""
+        assert from_batch.to_dict() == expected
+
+
+def test_employer_id_is_taken_from_rows_argument() -> None:
+    batch = VacancyBatch.from_api(ITEMS)
+
+    assert list(batch.rows(7)) == vacancy_rows(ITEMS, 7)
+    with pytest.raises(ValueError, match="Не указан работодатель"):
+        list(batch.rows())
+
+
+def test_extend_and_concat_keep_order() -> None:
+    first = VacancyBatch.from_api(ITEMS[:2], 7)
+    second = VacancyBatch.from_api(ITEMS[2:], 8)
+
+    combined = VacancyBatch.concat([first, second])
+    first.extend(second)
+
+    expected = vacancy_rows(ITEMS[:2], 7) + vacancy_rows(ITEMS[2:], 8)
+    assert list(combined.rows()) == expected
+    assert list(first.rows()) == expected